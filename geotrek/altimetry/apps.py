@@ -5,3 +5,8 @@ from django.utils.translation import gettext_lazy as _
 class AltimetryConfig(AppConfig):
     name = 'geotrek.altimetry'
     verbose_name = _("Altimetry")
+
+    def ready(self):
+        from .signals import connect_elevation_store_signals
+
+        connect_elevation_store_signals()
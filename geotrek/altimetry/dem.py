@@ -0,0 +1,78 @@
+from django.contrib.gis.geos import Polygon
+
+from .models import Dem
+
+
+class DemSampler:
+    """
+    In-process DEM sampling.
+
+    Tiles of ``altimetry_dem`` intersecting the requested extent are read at once
+    and mosaicked into a single array, which is then sampled with bilinear interpolation.
+    Requires NumPy (used by GDAL bands to expose their data).
+    """
+
+    def __init__(self, xmin, ymin, xmax, ymax, srid):
+        import numpy as np
+
+        self.np = np
+        extent = Polygon.from_bbox((xmin, ymin, xmax, ymax))
+        extent.srid = srid
+        rasters = [dem.rast for dem in Dem.objects.filter(rast__intersects=extent)]
+        self.values = None
+        if not rasters:
+            return
+
+        # Tiles produced by raster2pgsql share the same grid
+        self.scale_x, self.scale_y = rasters[0].scale.x, rasters[0].scale.y
+        self.origin_x = min(rast.origin.x for rast in rasters)
+        self.origin_y = max(rast.origin.y for rast in rasters)
+        width = max(self._col(rast.origin.x) + rast.width for rast in rasters)
+        height = max(self._row(rast.origin.y) + rast.height for rast in rasters)
+        self.values = np.full((height, width), np.nan)
+        for rast in rasters:
+            band = rast.bands[0]
+            data = band.data().astype(float)
+            if band.nodata_value is not None:
+                data[data == band.nodata_value] = np.nan
+            col, row = self._col(rast.origin.x), self._row(rast.origin.y)
+            self.values[row:row + rast.height, col:col + rast.width] = data
+
+    def _col(self, x):
+        return int(round((x - self.origin_x) / self.scale_x))
+
+    def _row(self, y):
+        return int(round((y - self.origin_y) / self.scale_y))
+
+    def sample(self, xs, ys):
+        """
+        Return elevations at points (xs, ys), interpolated between the 4 surrounding pixel centers.
+        Points outside the DEM or on nodata pixels get NaN.
+        """
+        np = self.np
+        xs, ys = np.asarray(xs, dtype=float), np.asarray(ys, dtype=float)
+        if self.values is None:
+            return np.full(xs.shape, np.nan)
+        height, width = self.values.shape
+        # Fractional pixel coordinates, relative to pixel centers
+        cols = (xs - self.origin_x) / self.scale_x
+        rows = (ys - self.origin_y) / self.scale_y
+        inside = (cols >= 0) & (cols <= width) & (rows >= 0) & (rows <= height)
+        cols, rows = cols - 0.5, rows - 0.5
+        col0, row0 = np.floor(cols).astype(int), np.floor(rows).astype(int)
+        dcol, drow = cols - col0, rows - row0
+
+        total = np.zeros(xs.shape)
+        weights = np.zeros(xs.shape)
+        for row_offset, row_weight in ((0, 1 - drow), (1, drow)):
+            for col_offset, col_weight in ((0, 1 - dcol), (1, dcol)):
+                r = np.clip(row0 + row_offset, 0, height - 1)
+                c = np.clip(col0 + col_offset, 0, width - 1)
+                value = self.values[r, c]
+                weight = np.where(np.isnan(value), 0, row_weight * col_weight)
+                total += np.where(np.isnan(value), 0, value) * weight
+                weights += weight
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result = total / weights
+        result[~inside | (weights == 0)] = np.nan
+        return result
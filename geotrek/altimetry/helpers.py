@@ -1,9 +1,10 @@
 import logging
+import math
 
 from django.contrib.gis.geos import GEOSGeometry
 from django.utils import translation
 from django.utils.translation import gettext as _
-from django.contrib.gis.geos import LineString
+from django.contrib.gis.geos import LineString, Polygon
 from django.conf import settings
 from django.db import connection
 
@@ -13,6 +14,19 @@ from pygal.style import LightSolarizedStyle
 logger = logging.getLogger(__name__)
 
 
+def line_measures(coords, offset=0):
+    """ Cumulated 2D distance from origin of each vertex, as ``ST_AddMeasure`` does """
+    measures = []
+    distance = offset
+    previous = None
+    for x, y, *z in coords:
+        if previous is not None:
+            distance += math.hypot(x - previous[0], y - previous[1])
+        measures.append(distance)
+        previous = (x, y)
+    return measures
+
+
 class AltimetryHelper:
     @classmethod
     def elevation_profile(cls, geometry3d, precision=None, offset=0):
@@ -34,6 +48,12 @@ class AltimetryHelper:
                 profile.extend(subprofile)
             return profile
 
+        if settings.ALTIMETRIC_DEM_IN_PROCESS:
+            # Get distance from origin for each vertex without database round-trip
+            geom3dapi = geometry3d.transform(settings.API_SRID, clone=True)
+            measures = line_measures(geometry3d.coords, offset)
+            return [[m] + list(v) for m, v in zip(measures, geom3dapi.coords)]
+
         # Add measure to 2D version of geometry3d
         # Get distance from origin for each vertex
         sql = """
@@ -139,6 +159,12 @@ class AltimetryHelper:
         if height < precision or width < precision:
             precision = min([height, width])
 
+        if settings.ALTIMETRIC_DEM_IN_PROCESS:
+            try:
+                return cls._elevation_area_in_process(xmin, ymin, xmax, ymax, precision)
+            except ImportError:
+                logger.warning("NumPy is required to sample DEM in process, falling back to PostGIS")
+
         sql = """
             -- Author: Celian Garcia
             WITH columns AS (
@@ -208,6 +234,38 @@ class AltimetryHelper:
             row.append(elevation)
         altitudes.append(row)
 
+        return cls._area(envelop_native, envelop, center_z, min_z, max_z, resolution_w, resolution_h, precision,
+                         altitudes)
+
+    @classmethod
+    def _elevation_area_in_process(cls, xmin, ymin, xmax, ymax, precision):
+        """ Same as ``elevation_area`` SQL, with the DEM grid sampled in process """
+        import numpy as np
+
+        from .dem import DemSampler
+
+        xs = np.arange(xmin, xmax + 1, precision)
+        ys = np.arange(ymin, ymax + 1, precision)
+        grid_x, grid_y = np.meshgrid(xs, ys)
+        sampler = DemSampler(xmin, ymin, xmax, ymax, settings.SRID)
+        values = sampler.sample(grid_x, grid_y)
+        if np.isnan(values).all():
+            logger.warning("No DEM present")
+            return {}
+        values = np.rint(values)
+        min_z, max_z = int(np.nanmin(values)), int(np.nanmax(values))
+        center_z = float(np.nanmean(values))
+        altitudes = (np.nan_to_num(values, nan=0.0) - min_z).astype(int).tolist()
+
+        # Vertices ordered as ST_Envelope does
+        x0, y0, x1, y1 = float(xs[0]), float(ys[0]), float(xs[-1]), float(ys[-1])
+        envelop_native = Polygon(((x0, y0), (x0, y1), (x1, y1), (x1, y0), (x0, y0)), srid=settings.SRID)
+        envelop = envelop_native.transform(4326, clone=True)
+        return cls._area(envelop_native, envelop, center_z, min_z, max_z, len(xs), len(ys), precision, altitudes)
+
+    @classmethod
+    def _area(cls, envelop_native, envelop, center_z, min_z, max_z, resolution_w, resolution_h, precision,
+              altitudes):
         area = {
             'center': {
                 'x': envelop_native.centroid.x,
@@ -1,16 +1,40 @@
-from django.apps import apps
 from django.contrib.gis.gdal.error import GDALException
 from django.core.management.base import BaseCommand, CommandError
-from django.db import connection
-from django.db.models import F
+from django.db import connection, transaction
 from django.conf import settings
 from django.contrib.gis.gdal import GDALRaster
+from django.contrib.gis.geos import Polygon
 import os.path
-from subprocess import call, PIPE
+from subprocess import call, run, PIPE, STDOUT
 import tempfile
 
-from geotrek.altimetry.models import AltimetryMixin, Dem
-from geotrek.core.models import Topology
+from geotrek.altimetry.models import Dem, ElevationStore
+from geotrek.altimetry.refresh import update_altimetry
+from geotrek.altimetry.tasks import refresh_elevation
+
+SPATIAL_INDEXES_SQL = """
+    SELECT i.indexrelid::regclass::text, pg_get_indexdef(i.indexrelid)
+    FROM pg_index i
+    JOIN pg_class c ON c.oid = i.indexrelid
+    JOIN pg_am am ON am.oid = c.relam
+    WHERE i.indrelid = %s::regclass AND am.amname = 'gist'
+"""
+
+
+class CopyRows:
+    """ File-like object reading rows of a COPY statement of raster2pgsql output, until its end marker """
+
+    def __init__(self, lines):
+        self.lines = lines
+
+    def read(self, size=-1):
+        for line in self.lines:
+            if line.rstrip(b'\r\n') == b'\\.':
+                break
+            return line
+        return b''
+
+    readline = read
 
 
 class Command(BaseCommand):
@@ -24,6 +48,8 @@ class Command(BaseCommand):
         parser.add_argument('--replace', action='store_true', default=False, help='Replace existing DEM if any.')
         parser.add_argument('--update-altimetry', action='store_true', default=False,
                             help='Update altimetry of all 3D geometries, /!\\ This option takes lot of time to perform')
+        parser.add_argument('--only-dem-extent', action='store_true', default=False,
+                            help='Only update altimetry of 3D geometries intersecting the loaded DEM')
 
     def handle(self, *args, **options):
 
@@ -76,7 +102,9 @@ class Command(BaseCommand):
             self.stdout.write('Everything looks fine, we can start loading DEM\n')
 
         output = tempfile.NamedTemporaryFile()  # SQL code for raster creation
-        cmd = 'raster2pgsql -a -M -t 100x100 %s altimetry_dem %s' % (
+        # Tiles are dumped as rows of a COPY statement (-Y) instead of one INSERT each, if supported
+        cmd = 'raster2pgsql -a %s-t 100x100 %s altimetry_dem %s' % (
+            '-Y ' if self.copy_supported() else '',
             rst.name,
             '' if verbose else '2>/dev/null'
         )
@@ -99,10 +127,24 @@ class Command(BaseCommand):
         # Step 3: Dump SQL code into database
         if verbose:
             self.stdout.write('\n-- Loading DEM into database -----------\n')
-        with connection.cursor() as cur:
+        with transaction.atomic(), connection.cursor() as cur:
+            # Spatial index is built once, after all tiles are loaded
+            cur.execute(SPATIAL_INDEXES_SQL, [Dem._meta.db_table])
+            indexes = cur.fetchall()
+            for name, definition in indexes:
+                cur.execute('DROP INDEX {}'.format(name))
             output.file.seek(0)
             for sql_line in output.file:
-                cur.execute(sql_line)
+                if sql_line.startswith(b'COPY '):
+                    cur.copy_expert(sql_line.decode(), CopyRows(output.file))
+                elif sql_line.strip() not in (b'', b'BEGIN;', b'END;', b'COMMIT;'):
+                    # Transaction is managed here
+                    cur.execute(sql_line)
+            for name, definition in indexes:
+                cur.execute(definition)
+        with connection.cursor() as cur:
+            # Refresh planner statistics
+            cur.execute('ANALYZE {}'.format(connection.ops.quote_name(Dem._meta.db_table)))
 
         output.close()
         if verbose:
@@ -110,15 +152,25 @@ class Command(BaseCommand):
         if update_altimetry_paths:
             if verbose:
                 self.stdout.write('Updating 3d geometries.\n')
-            for model in apps.get_models():
-                if 'geom' in [field.name for field in model._meta.get_fields()] and issubclass(model, AltimetryMixin):
-                    if settings.TREKKING_TOPOLOGY_ENABLED:
-                        if not issubclass(model, Topology):
-                            model.objects.all().update(geom=F('geom'))
-                    else:
-                        model.objects.all().update(geom=F('geom'))
+            extent = None
+            if options['only_dem_extent']:
+                extent = Polygon.from_bbox(rst.extent)
+                extent.srid = settings.SRID
+            update_altimetry(extent, progress=self.progress if options['verbosity'] >= 2 else None)
+        # DEM areas (and profiles if 3d geometries were updated) are outdated
+        ElevationStore.objects.all().delete()
+        if settings.ALTIMETRIC_PRECOMPUTE:
+            refresh_elevation.delay()
         return
 
+    def progress(self, current, total):
+        self.stdout.write('{}/{} chunks of 3d geometries updated'.format(current, total))
+
+    def copy_supported(self):
+        """ raster2pgsql outputs COPY statements since PostGIS 3.3 """
+        usage = run('raster2pgsql -?', shell=True, stdout=PIPE, stderr=STDOUT).stdout
+        return b' -Y ' in usage
+
     def call_command_system(self, cmd, **kwargs):
         return_code = call(cmd, **kwargs)
         return return_code
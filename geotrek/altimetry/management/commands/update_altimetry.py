@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.contrib.gis.geos import Polygon
+from django.core.management.base import BaseCommand
+
+from geotrek.altimetry.refresh import update_altimetry
+
+
+class Command(BaseCommand):
+    help = "Update altimetry of 3D geometries, by chunks committed one by one"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--resume', action='store_true', default=False,
+                            help="Skip chunks already updated by an interrupted run")
+        parser.add_argument('--extent', nargs=4, type=float, metavar=('XMIN', 'YMIN', 'XMAX', 'YMAX'),
+                            help="Only update geometries intersecting this extent (in SRID setting projection)")
+
+    def handle(self, *args, **options):
+        extent = None
+        if options['extent']:
+            extent = Polygon.from_bbox(options['extent'])
+            extent.srid = settings.SRID
+        progress = self.progress if options['verbosity'] >= 2 else None
+        count = update_altimetry(extent, resume=options['resume'], progress=progress)
+        if options['verbosity'] >= 1:
+            self.stdout.write("{} objects updated".format(count))
+
+    def progress(self, current, total):
+        self.stdout.write('{}/{} chunks of 3d geometries updated'.format(current, total))
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.16 on 2026-10-18 10:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('altimetry', '0002_import_mnt_data'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ElevationStore',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveIntegerField()),
+                ('profile_key', models.CharField(blank=True, default='', max_length=32)),
+                ('profile', models.BinaryField(null=True)),
+                ('area_key', models.CharField(blank=True, default='', max_length=32)),
+                ('area', models.JSONField(null=True)),
+                ('altitudes', models.BinaryField(null=True)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+            ],
+            options={
+                'unique_together': {('content_type', 'object_id')},
+            },
+        ),
+    ]
@@ -1,7 +1,11 @@
+import hashlib
 import os
+from array import array
 
 import cairosvg
 from django.conf import settings
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
 from django.contrib.gis.db import models
 from django.urls import reverse
 from django.utils.translation import get_language, gettext_lazy as _
@@ -46,10 +50,18 @@ class AltimetryMixin(models.Model):
         return self
 
     def get_elevation_profile(self):
-        return AltimetryHelper.elevation_profile(self.geom_3d)
+        if self.pk is None or self.geom_3d is None:
+            return AltimetryHelper.elevation_profile(self.geom_3d)
+        return ElevationStore.for_object(self).get_profile(self)
 
     def get_elevation_area(self):
-        return AltimetryHelper.elevation_area(self.geom)
+        if self.pk is None or self.geom is None:
+            return AltimetryHelper.elevation_area(self.geom)
+        return ElevationStore.for_object(self).get_area(self)
+
+    def get_elevation_dependants(self):
+        """ Other altimetry objects whose 3D geometry is computed from this one """
+        return []
 
     def get_elevation_limits(self):
         return AltimetryHelper.altimetry_limits(self.get_elevation_profile())
@@ -108,10 +120,106 @@ class AltimetryMixin(models.Model):
         # Do nothing if image is up-to-date
         if is_file_uptodate(path, self.date_update):
             return False
-        cairosvg.svg2png(bytestring=bytes(self.get_elevation_profile_svg(language)), write_to=path)
+        # Written aside then renamed, since several processes may render the same chart
+        tmp_path = '%s.%s.tmp' % (path, os.getpid())
+        cairosvg.svg2png(bytestring=bytes(self.get_elevation_profile_svg(language)), write_to=tmp_path)
+        os.replace(tmp_path, path)
         return True
 
 
 class Dem(models.Model):
     id = models.AutoField(primary_key=True, db_column='rid')  # rid is id column name used by raster2pgsql
     rast = models.RasterField(srid=settings.SRID)
+
+
+def elevation_key(geom, *values):
+    """ Fingerprint of a geometry and of the settings used to compute elevation data from it """
+    digest = hashlib.md5(bytes(geom.ewkb))
+    for value in values:
+        digest.update(repr(value).encode())
+    return digest.hexdigest()
+
+
+class ElevationStore(models.Model):
+    """
+    Elevation profile and DEM area precomputed for an altimetry object.
+
+    Profiles are stored as packed float64 rows (distance, lng, lat, z), DEM areas as
+    float32 grids of altitudes. Each one is kept along with the fingerprint of the geometry
+    it was computed from, so that it is recomputed only when geometry or settings change.
+    """
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    content_object = GenericForeignKey('content_type', 'object_id')
+    profile_key = models.CharField(max_length=32, blank=True, default='')
+    profile = models.BinaryField(null=True)
+    area_key = models.CharField(max_length=32, blank=True, default='')
+    area = models.JSONField(null=True)
+    altitudes = models.BinaryField(null=True)
+
+    class Meta:
+        unique_together = ('content_type', 'object_id')
+
+    @classmethod
+    def content_type_of(cls, obj):
+        """ Objects inheriting from a concrete model (e.g. topologies) share the store of their root model """
+        parents = obj._meta.get_parent_list()
+        model = parents[-1] if parents else obj._meta.concrete_model
+        return ContentType.objects.get_for_model(model)
+
+    @classmethod
+    def for_object(cls, obj):
+        content_type = cls.content_type_of(obj)
+        store = cls.objects.filter(content_type=content_type, object_id=obj.pk).first()
+        return store or cls(content_type=content_type, object_id=obj.pk)
+
+    @classmethod
+    def profile_key_of(cls, obj):
+        return elevation_key(obj.geom_3d, settings.API_SRID)
+
+    @classmethod
+    def area_key_of(cls, obj):
+        return elevation_key(obj.geom, settings.SRID, settings.ALTIMETRIC_PROFILE_PRECISION,
+                             settings.ALTIMETRIC_AREA_MAX_RESOLUTION, settings.ALTIMETRIC_AREA_MARGIN)
+
+    def _store(self, **fields):
+        for name, value in fields.items():
+            setattr(self, name, value)
+        # Concurrent requests may compute the same object
+        ElevationStore.objects.update_or_create(content_type=self.content_type, object_id=self.object_id,
+                                                defaults=fields)
+
+    def get_profile(self, obj):
+        key = self.profile_key_of(obj)
+        if self.profile is None or self.profile_key != key:
+            profile = AltimetryHelper.elevation_profile(obj.geom_3d)
+            values = array('d', [value for step in profile for value in step])
+            self._store(profile_key=key, profile=values.tobytes())
+            return profile
+        values = array('d')
+        values.frombytes(bytes(self.profile))
+        return [values[i:i + 4].tolist() for i in range(0, len(values), 4)]
+
+    def get_area(self, obj):
+        key = self.area_key_of(obj)
+        if self.area is None or self.area_key != key:
+            area = AltimetryHelper.elevation_area(obj.geom)
+            area_data = {name: value for name, value in area.items() if name != 'altitudes'}
+            altitudes = array('f', [altitude for row in area.get('altitudes', []) for altitude in row])
+            self._store(area_key=key, area=area_data, altitudes=altitudes.tobytes())
+            return area
+        area = dict(self.area)
+        if area:
+            values = array('f')
+            values.frombytes(bytes(self.altitudes))
+            width = area['resolution']['x']
+            area['altitudes'] = [[int(altitude) for altitude in values[i:i + width]]
+                                 for i in range(0, len(values), width)]
+        return area
+
+    def refresh(self, obj):
+        """ Compute missing or outdated elevation data of obj """
+        if obj.geom_3d is not None:
+            self.get_profile(obj)
+        if obj.geom is not None:
+            self.get_area(obj)
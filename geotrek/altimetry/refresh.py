@@ -0,0 +1,129 @@
+"""
+Update of 3D geometries and elevation indicators after DEM has changed.
+
+Geometries are rewritten by chunks of primary keys so that database triggers drape them again,
+each chunk in its own transaction, by a pool of ``ALTIMETRY_UPDATE_WORKERS`` threads.
+Updated chunks are saved in a checkpoint file, so that an interrupted update can be resumed.
+"""
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.apps import apps
+from django.conf import settings
+from django.db import OperationalError, connection
+from django.db.models import F
+
+from geotrek.altimetry.models import AltimetryMixin
+from geotrek.core.deferred import deferred_topologies_update
+from geotrek.core.models import Path, Topology
+
+logger = logging.getLogger(__name__)
+
+# Chunks sharing topologies may deadlock when updated concurrently, one of them is retried
+RETRIES = 3
+
+
+def checkpoint_path():
+    return os.path.join(settings.TMP_DIR, 'altimetry_update.json')
+
+
+def altimetry_models():
+    """ Models with 3D geometries, child models are updated with their parent table """
+    models = []
+    for model in apps.get_models():
+        if not issubclass(model, AltimetryMixin) or model._meta.get_parent_list():
+            continue
+        if 'geom' not in [field.name for field in model._meta.get_fields()]:
+            continue
+        # With dynamic segmentation, topologies are draped when their paths are updated
+        if settings.TREKKING_TOPOLOGY_ENABLED and issubclass(model, Topology):
+            continue
+        models.append(model)
+    return models
+
+
+def get_queryset(model, extent=None):
+    qs = model._base_manager.all()
+    if extent is not None:
+        qs = qs.filter(geom__intersects=extent)
+    return qs
+
+
+def get_chunks(model, extent=None):
+    """ Ranges (first, last) of primary keys of ``ALTIMETRY_UPDATE_CHUNK_SIZE`` objects to update """
+    size = settings.ALTIMETRY_UPDATE_CHUNK_SIZE
+    pks = list(get_queryset(model, extent).order_by('pk').values_list('pk', flat=True))
+    return [(pks[i], pks[min(i + size, len(pks)) - 1]) for i in range(0, len(pks), size)]
+
+
+def update_chunk(model, first, last, extent=None):
+    """ Rewrite geometries of a chunk, so that triggers drape them again. Returns the number of objects updated """
+    qs = get_queryset(model, extent).filter(pk__gte=first, pk__lte=last)
+    for attempt in range(RETRIES):
+        try:
+            if not issubclass(model, Path):
+                # A single statement, committed on its own
+                return qs.update(geom=F('geom'))
+            # Topologies of the chunk paths are updated once each, when chunk is committed
+            with deferred_topologies_update('commit'):
+                return qs.update(geom=F('geom'))
+        except OperationalError:
+            if attempt == RETRIES - 1:
+                raise
+            logger.warning("Retry altimetry update of %s from %s to %s", model._meta.label, first, last)
+
+
+def _update_chunk(model, first, last, extent):
+    try:
+        return update_chunk(model, first, last, extent)
+    finally:
+        # Each thread has its own database connection
+        connection.close()
+
+
+def update_altimetry(extent=None, resume=False, progress=None):
+    """
+    Update altimetry of all 3D geometries, or only of those intersecting ``extent``.
+    With ``resume``, chunks updated by an interrupted run are skipped.
+    ``progress`` is called with the numbers of chunks updated and to update, after each chunk.
+    Returns the number of objects updated.
+    """
+    path = checkpoint_path()
+    done = {}
+    if resume and os.path.exists(path):
+        with open(path) as f:
+            done = json.load(f)
+
+    chunks = []
+    for model in altimetry_models():
+        updated_chunks = {tuple(chunk) for chunk in done.setdefault(model._meta.label_lower, [])}
+        chunks += [(model, first, last) for first, last in get_chunks(model, extent)
+                   if (first, last) not in updated_chunks]
+
+    def save(index, model, first, last):
+        done[model._meta.label_lower].append([first, last])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(done, f)
+        if progress:
+            progress(index, len(chunks))
+
+    count = 0
+    workers = min(settings.ALTIMETRY_UPDATE_WORKERS, len(chunks))
+    if workers <= 1:
+        for index, (model, first, last) in enumerate(chunks, 1):
+            count += update_chunk(model, first, last, extent)
+            save(index, model, first, last)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_update_chunk, model, first, last, extent): (model, first, last)
+                       for model, first, last in chunks}
+            for index, future in enumerate(as_completed(futures), 1):
+                count += future.result()
+                save(index, *futures[future])
+
+    if os.path.exists(path):
+        os.remove(path)
+    return count
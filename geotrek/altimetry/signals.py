@@ -0,0 +1,33 @@
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .models import AltimetryMixin, ElevationStore
+
+
+def compute_elevation_store(sender, instance, *args, **kwargs):
+    """ after each creation / edition, precompute elevation profile and area in background """
+    if not settings.ALTIMETRIC_PRECOMPUTE:
+        return
+    from .tasks import compute_elevation
+
+    objects = {}
+    for obj in [instance] + list(instance.get_elevation_dependants()):
+        objects.setdefault(ElevationStore.content_type_of(obj).pk, []).append(obj.pk)
+    for content_type_id, pks in objects.items():
+        transaction.on_commit(lambda content_type_id=content_type_id, pks=pks:
+                              compute_elevation.delay(content_type_id, pks))
+
+
+def delete_elevation_store(sender, instance, *args, **kwargs):
+    ElevationStore.objects.filter(content_type=ElevationStore.content_type_of(instance),
+                                  object_id=instance.pk).delete()
+
+
+def connect_elevation_store_signals():
+    for model in apps.get_models():
+        if issubclass(model, AltimetryMixin):
+            post_save.connect(compute_elevation_store, sender=model)
+            if not model._meta.get_parent_list():
+                post_delete.connect(delete_elevation_store, sender=model)
@@ -0,0 +1,47 @@
+from celery import current_task, shared_task
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+
+from .models import AltimetryMixin, ElevationStore
+
+
+@shared_task(name='geotrek.altimetry.compute-elevation')
+def compute_elevation(content_type_id, pks):
+    """
+    celery shared task - fill elevation store of given objects
+    """
+    model = ContentType.objects.get_for_id(content_type_id).model_class()
+    stores = {store.object_id: store
+              for store in ElevationStore.objects.filter(content_type_id=content_type_id, object_id__in=pks)}
+    for obj in model._base_manager.filter(pk__in=pks).iterator():
+        store = stores.get(obj.pk) or ElevationStore(content_type_id=content_type_id, object_id=obj.pk)
+        store.refresh(obj)
+
+
+@shared_task(name='geotrek.altimetry.refresh-elevation')
+def refresh_elevation():
+    """
+    celery shared task - fill elevation store of all objects, after DEM has changed
+    """
+    for model in apps.get_models():
+        if issubclass(model, AltimetryMixin) and not model._meta.get_parent_list():
+            content_type = ContentType.objects.get_for_model(model)
+            pks = list(model._base_manager.values_list('pk', flat=True))
+            compute_elevation(content_type.pk, pks)
+
+
+@shared_task(name='geotrek.altimetry.update-altimetry')
+def update_altimetry_task(resume=False):
+    """
+    celery shared task - update 3D geometries after DEM has changed, reporting progress
+    """
+    from .refresh import update_altimetry
+
+    def progress(current, total):
+        current_task.update_state(state='PROGRESS', meta={
+            'name': current_task.name,
+            'current': current,
+            'total': total,
+        })
+
+    return update_altimetry(resume=resume, progress=progress)
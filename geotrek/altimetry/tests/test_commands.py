@@ -1,13 +1,17 @@
+import json
 import os
+import tempfile
 from io import StringIO
 from unittest import mock, skipIf
 
 from django.conf import settings
 from django.contrib.gis.geos import Point
 from django.core.management import call_command, CommandError
-from django.test import TransactionTestCase
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
 
 from geotrek.altimetry.functions import RasterValue
+from geotrek.altimetry.management.commands.loaddem import SPATIAL_INDEXES_SQL, Command
 from geotrek.altimetry.models import Dem
 
 from geotrek.core.models import Path
@@ -53,7 +57,7 @@ class CommandLoadDemTest(TransactionTestCase):
         filename = os.path.join(os.path.dirname(__file__), 'data', 'elevation.tif')
         self.path = PathFactory.create(geom=LineString((605600, 6650000), (605900, 6650010), srid=2154))
         trek = TrekFactory.create(paths=[self.path], published=False)
-        with self.assertNumQueries(8):  # 5 for loaddem initial + path + outdoor (2)
+        with self.assertNumQueries(12):  # 5 for loaddem initial + path (pks + 3 for chunk) + outdoor (2) + elevation store
             call_command('loaddem', filename, update_altimetry=True, verbosity=2, stdout=output_stdout)
         self.assertIn('DEM successfully loaded.', output_stdout.getvalue())
         self.assertIn('Everything looks fine, we can start loading DEM', output_stdout.getvalue())
@@ -71,7 +75,7 @@ class CommandLoadDemTest(TransactionTestCase):
         output_stdout = StringIO()
         filename = os.path.join(os.path.dirname(__file__), 'data', 'elevation.tif')
         self.trek = TrekFactory.create(geom=LineString((605600, 6650000), (605900, 6650010), srid=2154))
-        with self.assertNumQueries(22):  # 5 for loaddem initial + 17 with selects and update geom
+        with self.assertNumQueries(11):  # 5 for loaddem initial + path + topology (pks + chunk) + outdoor (2) + elevation store
             call_command('loaddem', filename, update_altimetry=True, verbosity=2, stdout=output_stdout)
         self.assertIn('DEM successfully loaded.', output_stdout.getvalue())
         self.assertIn('Everything looks fine, we can start loading DEM', output_stdout.getvalue())
@@ -82,6 +86,36 @@ class CommandLoadDemTest(TransactionTestCase):
         trek = Trek.objects.get(pk=self.trek.pk)
         self.assertAlmostEqual(trek.geom_3d.coords[-1][-1], 188)
 
+    @mock.patch('geotrek.altimetry.management.commands.loaddem.Command.copy_supported', return_value=False)
+    def test_success_with_insert_statements(self, copy_supported):
+        filename = os.path.join(os.path.dirname(__file__), 'data', 'elevation.tif')
+        with mock.patch('geotrek.altimetry.management.commands.loaddem.Command.call_command_system',
+                        autospec=True, side_effect=Command.call_command_system) as call_command_system:
+            call_command('loaddem', filename, verbosity=0)
+        self.assertIn('raster2pgsql -a -t 100x100', call_command_system.call_args[0][1])
+        dems = Dem.objects.all().annotate(int=RasterValue('rast', Point(x=605600, y=6650000, srid=2154)))
+        self.assertAlmostEqual(dems.first().int, 343.600006103516)
+
+    def test_success_with_copy_statements(self):
+        if not Command().copy_supported():
+            self.skipTest('raster2pgsql does not output COPY statements before PostGIS 3.3')
+        filename = os.path.join(os.path.dirname(__file__), 'data', 'elevation.tif')
+        with mock.patch('geotrek.altimetry.management.commands.loaddem.Command.call_command_system',
+                        autospec=True, side_effect=Command.call_command_system) as call_command_system:
+            call_command('loaddem', filename, verbosity=0)
+        self.assertIn('raster2pgsql -a -Y -t 100x100', call_command_system.call_args[0][1])
+        dems = Dem.objects.all().annotate(int=RasterValue('rast', Point(x=605600, y=6650000, srid=2154)))
+        self.assertAlmostEqual(dems.first().int, 343.600006103516)
+
+    def test_spatial_index_rebuilt(self):
+        filename = os.path.join(os.path.dirname(__file__), 'data', 'elevation.tif')
+        call_command('loaddem', filename, verbosity=0)
+        call_command('loaddem', filename, '--replace', verbosity=0)
+        self.assertTrue(Dem.objects.exists())
+        with connection.cursor() as cursor:
+            cursor.execute(SPATIAL_INDEXES_SQL, [Dem._meta.db_table])
+            self.assertEqual(len(cursor.fetchall()), 1)
+
     def test_fail_table_altimetry_dem(self):
         """ DEM data already exist """
         filename = os.path.join(os.path.dirname(__file__), 'data', 'elevation.tif')
@@ -113,7 +147,7 @@ class CommandLoadDemTest(TransactionTestCase):
     @mock.patch('geotrek.altimetry.management.commands.loaddem.Command.call_command_system')
     def test_fail_raster2pgsql_second(self, sp):
         def command_fail_raster(cmd, **kwargs):
-            if 'raster2pgsql -a -M -t' in cmd:
+            if 'raster2pgsql -a' in cmd:
                 return 1
             return 0
         sp.side_effect = command_fail_raster
@@ -139,3 +173,36 @@ class CommandLoadDemTest(TransactionTestCase):
         dems = Dem.objects.all().annotate(int=RasterValue('rast', Point(x=605600, y=6650000, srid=2154)))
         value = dems.first()
         self.assertAlmostEqual(value.int, 343.600006103516)
+
+
+@override_settings(ALTIMETRY_UPDATE_WORKERS=2, ALTIMETRY_UPDATE_CHUNK_SIZE=1)
+class CommandUpdateAltimetryTest(TransactionTestCase):
+    def setUp(self):
+        self.paths = [
+            PathFactory.create(geom=LineString((605600, 6650000 + 100 * i), (605900, 6650010 + 100 * i), srid=2154))
+            for i in range(3)
+        ]
+        filename = os.path.join(os.path.dirname(__file__), 'data', 'elevation.tif')
+        call_command('loaddem', filename, verbosity=0)
+
+    def test_update_by_chunks(self):
+        output = StringIO()
+        call_command('update_altimetry', verbosity=2, stdout=output)
+        self.assertIn('3/3 chunks of 3d geometries updated', output.getvalue())
+        self.assertIn('3 objects updated', output.getvalue())
+        path = Path.objects.get(pk=self.paths[0].pk)
+        self.assertAlmostEqual(path.geom_3d.coords[-1][-1], 188)
+
+    def test_update_extent(self):
+        output = StringIO()
+        call_command('update_altimetry', '--extent', '605500', '6649900', '606000', '6650050', stdout=output)
+        self.assertIn('1 objects updated', output.getvalue())
+
+    def test_resume(self):
+        with tempfile.TemporaryDirectory() as tmp_dir, override_settings(TMP_DIR=tmp_dir):
+            with open(os.path.join(tmp_dir, 'altimetry_update.json'), 'w') as f:
+                json.dump({'core.path': [[path.pk, path.pk] for path in self.paths[:2]]}, f)
+            output = StringIO()
+            call_command('update_altimetry', '--resume', stdout=output)
+            self.assertIn('1 objects updated', output.getvalue())
+            self.assertFalse(os.path.exists(os.path.join(tmp_dir, 'altimetry_update.json')))
@@ -1,5 +1,5 @@
 from django.conf import settings
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from unittest import SkipTest, skipIf
 
 from django.db import connection
@@ -8,6 +8,7 @@ from django.utils import translation
 
 from geotrek.core.models import Path, Topology
 from geotrek.core.tests.factories import TopologyFactory
+from geotrek.altimetry.dem import DemSampler
 from geotrek.altimetry.helpers import AltimetryHelper
 
 
@@ -281,6 +282,62 @@ class ElevationRightOrderAreaTest(TestCase):
                                                [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]])
 
 
+class DemSamplerTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        fill_raster_order()
+        cls.sampler = DemSampler(0, 0, 250, 250, settings.SRID)
+
+    def test_sample_pixel_centers(self):
+        values = self.sampler.sample([12.5, 37.5, 12.5], [237.5, 237.5, 212.5])
+        self.assertEqual(list(values), [0, 1, 2])
+
+    def test_sample_bilinear(self):
+        values = self.sampler.sample([25, 25], [225, 237.5])
+        self.assertEqual(list(values), [1.5, 0.5])
+
+    def test_sample_outside_dem(self):
+        values = self.sampler.sample([-10, 100], [100, 300])
+        self.assertTrue(all(value != value for value in values))
+
+    def test_sample_without_dem(self):
+        values = DemSampler(1000, 1000, 2000, 2000, settings.SRID).sample([1500], [1500])
+        self.assertNotEqual(values[0], values[0])
+
+
+@override_settings(ALTIMETRIC_DEM_IN_PROCESS=True)
+class ElevationInProcessTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        fill_raster_order()
+
+    def test_area_same_shape_as_postgis(self):
+        geom = LineString((125, 240), (125, 50), srid=settings.SRID)
+        area = AltimetryHelper.elevation_area(geom)
+        with override_settings(ALTIMETRIC_DEM_IN_PROCESS=False):
+            expected = AltimetryHelper.elevation_area(geom)
+        self.assertEqual(area['resolution'], expected['resolution'])
+        self.assertEqual(area['size'], expected['size'])
+        self.assertEqual(area['extent']['southwest'], expected['extent']['southwest'])
+        self.assertEqual(area['extent']['northeast'], expected['extent']['northeast'])
+        self.assertEqual(len(area['altitudes']), len(expected['altitudes']))
+        self.assertEqual(len(area['altitudes'][0]), len(expected['altitudes'][0]))
+
+    def test_area_without_dem(self):
+        geom = LineString((10000, 10000), (11000, 10000), srid=settings.SRID)
+        self.assertEqual(AltimetryHelper.elevation_area(geom), {})
+
+    def test_profile_same_as_postgis(self):
+        geom = LineString((1.5, 2.5, 8), (2.5, 2.5, 10), (2.5, 0, 7), srid=settings.SRID)
+        profile = AltimetryHelper.elevation_profile(geom)
+        with override_settings(ALTIMETRIC_DEM_IN_PROCESS=False):
+            expected = AltimetryHelper.elevation_profile(geom)
+        self.assertEqual(len(profile), len(expected))
+        for step, expected_step in zip(profile, expected):
+            for value, expected_value in zip(step, expected_step):
+                self.assertAlmostEqual(value, expected_value)
+
+
 @skipIf(settings.TREKKING_TOPOLOGY_ENABLED, 'Test without dynamic segmentation only')
 class LengthTest(TestCase):
     @classmethod
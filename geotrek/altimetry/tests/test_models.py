@@ -1,9 +1,16 @@
 import os
+from unittest import mock, skipIf
 
-from django.test import TestCase
+from django.contrib.gis.geos import LineString
+from django.test import TestCase, override_settings
 from django.conf import settings
 from django.utils.translation import get_language
 
+from geotrek.altimetry.models import ElevationStore
+from geotrek.altimetry.tasks import compute_elevation
+from geotrek.altimetry.tests.test_elevation import fill_raster_order
+from geotrek.core.models import Topology
+from geotrek.core.tests.factories import PathFactory
 from geotrek.trekking.tests.factories import TrekFactory
 from geotrek.trekking.models import Trek
 
@@ -19,3 +26,71 @@ class AltimetryMixinTest(TestCase):
         self.assertTrue(os.listdir(basefolder))
         directory = os.listdir(basefolder)
         self.assertIn('%s-%s-%s.png' % (Trek._meta.model_name, str(trek.pk), get_language()), directory)
+
+
+class ElevationStoreTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        fill_raster_order()
+        if settings.TREKKING_TOPOLOGY_ENABLED:
+            path = PathFactory.create(geom=LineString((12, 237), (187, 62), srid=settings.SRID))
+            cls.trek = TrekFactory.create(paths=[path])
+        else:
+            cls.trek = TrekFactory.create(geom=LineString((12, 237), (187, 62), srid=settings.SRID))
+
+    def test_profile_is_stored(self):
+        profile = self.trek.get_elevation_profile()
+        store = ElevationStore.objects.get()
+        self.assertEqual(store.profile_key, ElevationStore.profile_key_of(self.trek))
+        trek = Trek.objects.get(pk=self.trek.pk)
+        with self.assertNumQueries(1):
+            stored_profile = trek.get_elevation_profile()
+        self.assertEqual(len(stored_profile), len(profile))
+        for step, stored_step in zip(profile, stored_profile):
+            self.assertEqual(list(step), stored_step)
+
+    def test_area_is_stored(self):
+        area = self.trek.get_elevation_area()
+        trek = Trek.objects.get(pk=self.trek.pk)
+        with self.assertNumQueries(1):
+            stored_area = trek.get_elevation_area()
+        self.assertEqual(stored_area, area)
+
+    def test_topology_and_trek_share_store(self):
+        self.trek.get_elevation_profile()
+        topology = Topology.objects.get(pk=self.trek.pk)
+        with self.assertNumQueries(1):
+            topology.get_elevation_profile()
+        self.assertEqual(ElevationStore.objects.count(), 1)
+
+    def test_outdated_profile_is_computed_again(self):
+        self.trek.get_elevation_profile()
+        with override_settings(API_SRID=3857):
+            profile = self.trek.get_elevation_profile()
+        self.assertAlmostEqual(profile[-1][1], self.trek.geom_3d.transform(3857, clone=True).coords[-1][0])
+        store = ElevationStore.objects.get()
+        with override_settings(API_SRID=3857):
+            self.assertEqual(store.profile_key, ElevationStore.profile_key_of(self.trek))
+
+    @skipIf(not settings.TREKKING_TOPOLOGY_ENABLED, 'Test with dynamic segmentation only')
+    def test_store_deleted_with_object(self):
+        path = PathFactory.create(geom=LineString((12, 237), (62, 237), srid=settings.SRID))
+        path.get_elevation_profile()
+        self.assertTrue(ElevationStore.objects.filter(object_id=path.pk).exists())
+        path.delete()
+        self.assertFalse(ElevationStore.objects.filter(object_id=path.pk).exists())
+
+    @override_settings(ALTIMETRIC_PRECOMPUTE=True)
+    @mock.patch('geotrek.altimetry.tasks.compute_elevation.delay')
+    def test_precompute_on_save(self, mocked):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.trek.save()
+        content_type = ElevationStore.content_type_of(self.trek)
+        mocked.assert_called_with(content_type.pk, [self.trek.pk])
+
+    def test_compute_elevation_task(self):
+        content_type = ElevationStore.content_type_of(self.trek)
+        compute_elevation(content_type.pk, [self.trek.pk])
+        store = ElevationStore.objects.get()
+        self.assertEqual(store.profile_key, ElevationStore.profile_key_of(self.trek))
+        self.assertEqual(store.area_key, ElevationStore.area_key_of(self.trek))
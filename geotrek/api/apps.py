@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+from django.utils.translation import gettext_lazy as _
+
+
+class ApiConfig(AppConfig):
+    name = 'geotrek.api'
+    verbose_name = _("API")
+
+    def ready(self):
+        from geotrek.api.v2.viewsets import get_cached_models
+        from geotrek.common.signals import connect_version_receivers
+
+        # API v2 caches are invalidated by versions of the models they depend on
+        connect_version_receivers(get_cached_models())
@@ -1,18 +1,24 @@
 import argparse
 import filecmp
+import hashlib
+import json
 import logging
+import multiprocessing
 import os
 import re
 import shutil
 import stat
 import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from io import StringIO
 from time import sleep
 from zipfile import ZipFile
 
 import cairosvg
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
-from django.core.management.base import BaseCommand, CommandError
+from django.core.management.base import BaseCommand, CommandError, OutputWrapper
+from django.db import connection, connections
 from django.db.models import Q
 from django.http import StreamingHttpResponse
 from django.test.client import RequestFactory
@@ -25,7 +31,7 @@ from geotrek.api.mobile.views.common import FlatPageViewSet, SettingsView
 from geotrek.api.mobile.views.trekking import TrekViewSet
 from geotrek.common import models as common_models
 from geotrek.common.functions import GeometryType
-from geotrek.common.helpers_sync import ZipTilesBuilder
+from geotrek.common.helpers_sync import TilesStats, ZipTilesBuilder
 from geotrek.common.models import FileType  # NOQA
 from geotrek.flatpages.models import MenuItem
 from geotrek.tourism import models as tourism_models
@@ -36,8 +42,33 @@ from geotrek.trekking import urls  # NOQA
 
 logger = logging.getLogger(__name__)
 
+# Command run by worker processes, inherited when they are forked
+_job_command = None
+
+
+def _run_job(method_name, *args):
+    """ Run a command method in a worker process and return what the main process has to merge """
+    command = _job_command
+    command.stdout = OutputWrapper(StringIO())
+    command.celery_task = None
+    command.successfull = True
+    command.new_manifest = {}
+    command.tiles_stats = TilesStats()
+    getattr(command, method_name)(*args)
+    stats = command.tiles_stats
+    return {
+        'output': command.stdout._out.getvalue(),
+        'successfull': command.successfull,
+        'manifest': command.new_manifest,
+        'tiles': {'downloaded': stats.downloaded, 'retries': stats.retries, 'failures': stats.failures,
+                  'duration': stats.duration},
+    }
+
 
 class Command(BaseCommand):
+    # Fingerprints of the inputs of each zip file, used by incremental synchronization
+    manifest_name = os.path.join('nolang', '.manifest.json')
+
     def add_arguments(self, parser):
         parser.add_argument('path')
         parser.add_argument('--empty-tmp-folder', dest='empty_tmp_folder', action='store_true', default=False,
@@ -48,12 +79,96 @@ class Command(BaseCommand):
                             help='Skip inclusion of tiles in zip files')
         parser.add_argument('--url', '-u', dest='url', default='http://localhost', help='Base url')
         parser.add_argument('--indent', '-i', default=0, type=int, help='Indent json files')
+        parser.add_argument('--incremental', action='store_true', default=False,
+                            help='Reuse zip files whose content did not change since last synchronization')
+        parser.add_argument('--jobs', '-j', default=1, type=int,
+                            help='Number of processes used to sync treks and languages')
         parser.add_argument('--task', default=None, help=argparse.SUPPRESS)
 
     def mkdirs(self, name):
         dirname = os.path.dirname(name)
-        if not os.path.exists(dirname):
-            os.makedirs(dirname)
+        # Directory may be created concurrently by another job
+        os.makedirs(dirname, exist_ok=True)
+
+    def run_jobs(self, method_name, jobs):
+        """ Call method with each args of jobs, in the pool of worker processes if any.
+        Yields args of each job once it is done.
+        """
+        if self.pool is None:
+            for args in jobs:
+                getattr(self, method_name)(*args)
+                yield args
+            return
+        # Worker processes must open their own database connection
+        connections.close_all()
+        futures = {self.pool.submit(_run_job, method_name, *args): args for args in jobs}
+        for future in as_completed(futures):
+            result = future.result()
+            self.stdout.write(result['output'], ending='')
+            self.successfull = self.successfull and result['successfull']
+            self.new_manifest.update(result['manifest'])
+            self.tiles_stats.add(**result['tiles'])
+            yield futures[future]
+
+    def open_pool(self):
+        global _job_command
+
+        self.pool = None
+        if self.jobs <= 1:
+            return
+        if connection.in_atomic_block:
+            logger.warning("Cannot use worker processes inside a transaction, sync_mobile runs in a single process")
+            return
+        if multiprocessing.current_process().daemon:
+            # e.g. in a Celery worker, whose daemonic processes are not allowed to have children
+            logger.warning("Cannot use worker processes inside a daemon process, sync_mobile runs in a single process")
+            return
+        _job_command = self
+        self.pool = ProcessPoolExecutor(max_workers=self.jobs, mp_context=multiprocessing.get_context('fork'))
+
+    def close_pool(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def load_manifest(self):
+        try:
+            with open(os.path.join(self.dst_root, self.manifest_name)) as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return {}
+
+    def save_manifest(self):
+        fullname = os.path.join(self.tmp_root, self.manifest_name)
+        self.mkdirs(fullname)
+        with open(fullname, 'w') as f:
+            json.dump(self.new_manifest, f)
+
+    def fingerprint(self, *inputs):
+        """ Hash of all inputs a file is built from """
+        return hashlib.sha1(json.dumps(inputs, default=str).encode()).hexdigest()
+
+    def reuse_files(self, key, fingerprint, name, directories=()):
+        """ Hard link file `name` and content of `directories` from previous synchronization,
+        if they were built from the same inputs. Returns True if files have been reused.
+        """
+        self.new_manifest[key] = fingerprint
+        if not self.incremental or self.manifest.get(key) != fingerprint:
+            return False
+        if not os.path.isfile(os.path.join(self.dst_root, name)):
+            return False
+        names = [name]
+        for directory in directories:
+            for root, dirs, files in os.walk(os.path.join(self.dst_root, directory)):
+                names += [os.path.relpath(os.path.join(root, f), self.dst_root) for f in files]
+        for name in names:
+            dst = os.path.join(self.tmp_root, name)
+            self.mkdirs(dst)
+            if not os.path.isfile(dst):
+                os.link(os.path.join(self.dst_root, name), dst)
+        if self.verbosity == 2:
+            self.stdout.write("\x1b[36m**\x1b[0m \x1b[1m{name}\x1b[0m \x1b[32mreused\x1b[0m".format(name=names[0]))
+        return True
 
     def sync_view(self, lang, view, name, url='/', params=None, headers={}, zipfile=None, fix2028=False, **kwargs):
         if self.verbosity == 2:
@@ -315,27 +430,44 @@ class Command(BaseCommand):
         self.sync_global_media()
         self.sync_treks_media()
 
-    def sync_trek_by_pk_media(self, trek):
+    def sync_trek_by_pk_media(self, trek, published_pois=None):
         url_trek = os.path.join('nolang')
         zipname_trekid = os.path.join(url_trek, "{}.zip".format(trek.pk))
         zipfullname_trekid = os.path.join(self.tmp_root, zipname_trekid)
+
+        if published_pois is None:
+            published_pois = trek.published_pois
+        published_pois = [poi for poi in published_pois if poi.geom.geom_type == 'Point']
+        touristic_contents = trek.published_touristic_contents.annotate(geom_type=GeometryType("geom")).filter(geom_type="POINT")
+        touristic_events = trek.published_touristic_events.annotate(geom_type=GeometryType("geom")).filter(geom_type="POINT")
+        desks = trek.information_desks.all().annotate(geom_type=GeometryType("geom")).filter(geom_type="POINT")
+        children = trek.children.annotate(geom_type=GeometryType("geom")).filter(geom_type="LINESTRING")
+        fingerprint = self.fingerprint(
+            trek.date_update, bytes(trek.geom.wkb).hex(),
+            *[[(obj.pk, obj.date_update) for obj in objects]
+              for objects in (published_pois, touristic_contents, touristic_events, desks, children)],
+            self.languages, self.tiles_inputs, settings.MOBILE_NUMBER_PICTURES_SYNC,
+        )
+        if self.reuse_files('trek-{}'.format(trek.pk), fingerprint, zipname_trekid,
+                            directories=[os.path.join(url_trek, str(trek.pk))]):
+            return
         self.mkdirs(zipfullname_trekid)
         trekid_zipfile = ZipFile(zipfullname_trekid, 'w')
 
         if not self.skip_tiles:
             self.sync_trek_tiles(trek, trekid_zipfile)
 
-        for poi in trek.published_pois.annotate(geom_type=GeometryType("geom")).filter(geom_type="POINT"):
+        for poi in published_pois:
             if poi.resized_pictures:
                 for picture, thdetail in poi.resized_pictures[:settings.MOBILE_NUMBER_PICTURES_SYNC]:
                     self.sync_media_file(thdetail, prefix=trek.pk, directory=url_trek,
                                          zipfile=trekid_zipfile)
-        for touristic_content in trek.published_touristic_contents.annotate(geom_type=GeometryType("geom")).filter(geom_type="POINT"):
+        for touristic_content in touristic_contents:
             if touristic_content.resized_pictures:
                 for picture, thdetail in touristic_content.resized_pictures[:settings.MOBILE_NUMBER_PICTURES_SYNC]:
                     self.sync_media_file(thdetail, prefix=trek.pk, directory=url_trek,
                                          zipfile=trekid_zipfile)
-        for touristic_event in trek.published_touristic_events.annotate(geom_type=GeometryType("geom")).filter(geom_type="POINT"):
+        for touristic_event in touristic_events:
             if touristic_event.resized_pictures:
                 for picture, thdetail in touristic_event.resized_pictures[:settings.MOBILE_NUMBER_PICTURES_SYNC]:
                     self.sync_media_file(thdetail, prefix=trek.pk, directory=url_trek,
@@ -344,7 +476,7 @@ class Command(BaseCommand):
             for picture, thdetail in trek.resized_pictures[:settings.MOBILE_NUMBER_PICTURES_SYNC]:
                 self.sync_media_file(thdetail, prefix=trek.pk, directory=url_trek,
                                      zipfile=trekid_zipfile)
-        for desk in trek.information_desks.all().annotate(geom_type=GeometryType("geom")).filter(geom_type="POINT"):
+        for desk in desks:
             if desk.resized_picture:
                 self.sync_media_file(desk.resized_picture, prefix=trek.pk, directory=url_trek,
                                      zipfile=trekid_zipfile)
@@ -354,7 +486,7 @@ class Command(BaseCommand):
             self.sync_file(trek.get_elevation_chart_url_png(lang), settings.MEDIA_ROOT,
                            url_media, directory=url_trek, zipfile=trekid_zipfile)
         # Sync media of children too
-        for child in trek.children.annotate(geom_type=GeometryType("geom")).filter(geom_type="LINESTRING"):
+        for child in children:
             for picture, resized in child.resized_pictures:
                 self.sync_media_file(resized, prefix=trek.pk, directory=url_trek, zipfile=trekid_zipfile)
             for desk in child.information_desks.all().annotate(geom_type=GeometryType("geom")).filter(geom_type="POINT"):
@@ -372,37 +504,55 @@ class Command(BaseCommand):
         if self.portal:
             treks = treks.filter(Q(portal__name__in=self.portal) | Q(portal=None))
 
-        for trek in treks:
-            self.sync_trek_by_pk_media(trek)
+        # Overlapping POIs of all treks are computed with a single query
+        published_pois = trekking_models.POI.published_topologies_pois(treks)
+        jobs = [(trek, published_pois[trek.pk]) for trek in treks]
+        for i, job in enumerate(self.run_jobs('sync_trek_by_pk_media', jobs)):
+            if self.celery_task and self.pool is not None:
+                self.celery_task.update_state(
+                    state='PROGRESS',
+                    meta={
+                        'name': self.celery_task.name,
+                        'current': 10 + int(20 * (i + 1) / len(jobs)),
+                        'total': 100,
+                        'infos': "{}".format(_("Medias syncing ..."))
+                    }
+                )
 
     def sync_global_media(self):
         url_media_nolang = os.path.join('nolang')
         zipname_settings = os.path.join('nolang', 'global.zip')
         zipfullname_settings = os.path.join(self.tmp_root, zipname_settings)
+        pictogram_models = [
+            (common_models.Theme, None),
+            (trekking_models.TrekNetwork, None),
+            (trekking_models.Practice, settings.MOBILE_CATEGORY_PICTO_SIZE),
+            (trekking_models.Accessibility, None),
+            (trekking_models.DifficultyLevel, None),
+            (trekking_models.POIType, settings.MOBILE_POI_PICTO_SIZE),
+            (trekking_models.Route, None),
+            (trekking_models.ServiceType, None),
+            (tourism_models.InformationDeskType, settings.MOBILE_INFORMATIONDESKTYPE_PICTO_SIZE),
+            (tourism_models.TouristicContentCategory, settings.MOBILE_CATEGORY_PICTO_SIZE),
+            (tourism_models.TouristicContentType, None),
+            (tourism_models.TouristicEventType, None),
+        ]
+        fingerprint = self.fingerprint(
+            [(model._meta.label, size, list(model.objects.order_by('pk').values_list('pk', 'pictogram')))
+             for model, size in pictogram_models],
+            self.tiles_inputs, settings.LEAFLET_CONFIG['SPATIAL_EXTENT'], settings.MOBILE_TILES_GLOBAL_ZOOMS,
+        )
+        if self.reuse_files('global', fingerprint, zipname_settings,
+                            directories=[os.path.join(url_media_nolang, settings.MEDIA_URL.strip('/'))]):
+            return
         self.mkdirs(zipfullname_settings)
         self.zipfile_settings = ZipFile(zipfullname_settings, 'w')
 
         if not self.skip_tiles:
             self.sync_global_tiles(self.zipfile_settings)
 
-        self.sync_pictograms(common_models.Theme, directory=url_media_nolang, zipfile=self.zipfile_settings)
-        self.sync_pictograms(trekking_models.TrekNetwork, directory=url_media_nolang, zipfile=self.zipfile_settings)
-        self.sync_pictograms(trekking_models.Practice, directory=url_media_nolang, zipfile=self.zipfile_settings,
-                             size=settings.MOBILE_CATEGORY_PICTO_SIZE)
-        self.sync_pictograms(trekking_models.Accessibility, directory=url_media_nolang, zipfile=self.zipfile_settings)
-        self.sync_pictograms(trekking_models.DifficultyLevel, directory=url_media_nolang, zipfile=self.zipfile_settings)
-        self.sync_pictograms(trekking_models.POIType, directory=url_media_nolang, zipfile=self.zipfile_settings,
-                             size=settings.MOBILE_POI_PICTO_SIZE)
-        self.sync_pictograms(trekking_models.Route, directory=url_media_nolang, zipfile=self.zipfile_settings)
-        self.sync_pictograms(trekking_models.ServiceType, directory=url_media_nolang, zipfile=self.zipfile_settings)
-        self.sync_pictograms(tourism_models.InformationDeskType, directory=url_media_nolang,
-                             zipfile=self.zipfile_settings, size=settings.MOBILE_INFORMATIONDESKTYPE_PICTO_SIZE)
-        self.sync_pictograms(tourism_models.TouristicContentCategory, directory=url_media_nolang,
-                             zipfile=self.zipfile_settings, size=settings.MOBILE_CATEGORY_PICTO_SIZE)
-        self.sync_pictograms(tourism_models.TouristicContentType, directory=url_media_nolang,
-                             zipfile=self.zipfile_settings)
-        self.sync_pictograms(tourism_models.TouristicEventType, directory=url_media_nolang,
-                             zipfile=self.zipfile_settings)
+        for model, size in pictogram_models:
+            self.sync_pictograms(model, directory=url_media_nolang, zipfile=self.zipfile_settings, size=size)
         self.close_zip(self.zipfile_settings, zipname_settings)
 
     def sync_trek_tiles(self, trek, zipfile):
@@ -417,7 +567,8 @@ class Command(BaseCommand):
             return (lng - radius, lat - radius,
                     lng + radius, lat + radius)
 
-        tiles = ZipTilesBuilder(zipfile, prefix='/{}/tiles/'.format(trek.pk), **self.builder_args)
+        tiles = ZipTilesBuilder(zipfile, prefix='/{}/tiles/'.format(trek.pk), stats=self.tiles_stats,
+                                **self.builder_args)
 
         geom = trek.geom
         if geom.geom_type == 'MultiLineString':
@@ -447,7 +598,7 @@ class Command(BaseCommand):
         logger.info("Global extent is %s" % str(global_extent))
         logger.info("Build global tiles file...")
 
-        tiles = ZipTilesBuilder(zipfile, prefix='tiles/', **self.builder_args)
+        tiles = ZipTilesBuilder(zipfile, prefix='tiles/', stats=self.tiles_stats, **self.builder_args)
         tiles.add_coverage(bbox=global_extent,
                            zoomlevels=settings.MOBILE_TILES_GLOBAL_ZOOMS)
         tiles.run()
@@ -461,6 +612,21 @@ class Command(BaseCommand):
 
         self.sync_medias()
 
+        if self.pool is not None:
+            for (lang, ) in self.run_jobs('sync_language', [(lang, ) for lang in self.languages]):
+                if self.celery_task:
+                    current_value = current_value + step_value
+                    self.celery_task.update_state(
+                        state='PROGRESS',
+                        meta={
+                            'name': self.celery_task.name,
+                            'current': current_value,
+                            'total': 100,
+                            'infos': "{} : {} ...".format(_("Language"), lang)
+                        }
+                    )
+            return
+
         for lang in self.languages:
             if self.celery_task:
                 self.celery_task.update_state(
@@ -473,12 +639,14 @@ class Command(BaseCommand):
                     }
                 )
                 current_value = current_value + step_value
+            self.sync_language(lang)
 
-            with translation.override(lang):
-                self.sync_settings_json(lang)
-                if 'geotrek.flatpages' in settings.INSTALLED_APPS:
-                    self.sync_flatpage(lang)
-                self.sync_trekking(lang)
+    def sync_language(self, lang):
+        with translation.override(lang):
+            self.sync_settings_json(lang)
+            if 'geotrek.flatpages' in settings.INSTALLED_APPS:
+                self.sync_flatpage(lang)
+            self.sync_trekking(lang)
 
     def check_dst_root_is_empty(self):
         if not os.path.exists(self.dst_root):
@@ -536,6 +704,17 @@ class Command(BaseCommand):
             'ignore_errors': True,
             'tiles_dir': settings.MOBILE_TILES_PATH,
         }
+        self.tiles_stats = TilesStats()
+        if self.skip_tiles:
+            self.tiles_inputs = None
+        else:
+            self.tiles_inputs = [settings.MOBILE_TILES_URL, settings.MOBILE_TILES_EXTENSION,
+                                 settings.MOBILE_TILES_RADIUS_LARGE, settings.MOBILE_TILES_RADIUS_SMALL,
+                                 settings.MOBILE_TILES_LOW_ZOOMS, settings.MOBILE_TILES_HIGH_ZOOMS]
+        self.incremental = options['incremental']
+        self.jobs = options['jobs']
+        self.manifest = self.load_manifest() if self.incremental else {}
+        self.new_manifest = {}
         sync_mobile_tmp_dir = os.path.join(settings.TMP_DIR, 'sync_mobile')
         if options['empty_tmp_folder']:
             for dir in os.listdir(sync_mobile_tmp_dir):
@@ -547,7 +726,12 @@ class Command(BaseCommand):
 
         with tempfile.TemporaryDirectory(dir=sync_mobile_tmp_dir) as tmp_dir:
             self.tmp_root = tmp_dir
-            self.sync()
+            self.open_pool()
+            try:
+                self.sync()
+            finally:
+                self.close_pool()
+            self.save_manifest()
             if self.celery_task:
                 self.celery_task.update_state(
                     state='PROGRESS',
@@ -560,6 +744,10 @@ class Command(BaseCommand):
                 )
             self.rename_root()
 
+        logger.info("Tiles: %s" % self.tiles_stats)
+        if self.verbosity == 2:
+            self.stdout.write("Tiles: {}".format(self.tiles_stats))
+
         done_message = 'Done'
         if self.successfull:
             done_message = self.style.SUCCESS(done_message)
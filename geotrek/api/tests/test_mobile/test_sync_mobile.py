@@ -1,5 +1,6 @@
 import errno
 import json
+import multiprocessing
 import os
 import zipfile
 from io import StringIO
@@ -12,7 +13,7 @@ from django.core import management
 from django.core.management.base import CommandError
 from django.db.models import Q
 from django.http import HttpResponse, StreamingHttpResponse
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase
 from django.test.utils import override_settings
 from django.utils import translation
 from landez.sources import DownloadError
@@ -81,6 +82,23 @@ class SyncMobileTilesTest(VarTmpTestCase):
             self.assertEqual(ifile.readline(), b'I am a png')
         self.assertIn("nolang/global.zip", output.getvalue())
 
+    @mock.patch('landez.TilesManager.tile')
+    def test_tile_retry(self, mock_tiles, mock_tileslist):
+        mock_tiles.side_effect = [DownloadError, b'I am a png']
+        output = StringIO()
+        management.call_command('sync_mobile', self.sync_directory, url='http://localhost:8000', verbosity=2, stdout=output)
+        zfile = zipfile.ZipFile(os.path.join(self.sync_directory, 'nolang', 'global.zip'))
+        self.assertEqual(zfile.read('tiles/9/258/199.png'), b'I am a png')
+        self.assertIn("1 tiles downloaded, 1 retries, 0 failures", output.getvalue())
+
+    @override_settings(MOBILE_TILES_RETRIES=0)
+    @mock.patch('landez.TilesManager.tile', side_effect=DownloadError)
+    def test_tile_fail_without_retry(self, mock_tiles, mock_tileslist):
+        output = StringIO()
+        management.call_command('sync_mobile', self.sync_directory, url='http://localhost:8000', verbosity=2, stdout=output)
+        self.assertEqual(mock_tiles.call_count, 1)
+        self.assertIn("0 tiles downloaded, 0 retries, 1 failures", output.getvalue())
+
     @override_settings(MOBILE_TILES_URL=['http://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png',
                                          'http://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png'])
     @mock.patch('landez.TilesManager.tile', return_value='Error')
@@ -495,6 +513,34 @@ class SyncMobileTreksTest(TranslationResetMixin, VarTmpTestCase):
             for poi in poi_geojson['features']:
                 self.assertLessEqual(len(poi['properties']['pictures']), 3)
 
+    def test_incremental(self):
+        management.call_command('sync_mobile', self.sync_directory, url='http://localhost:8000',
+                                skip_tiles=True, verbosity=0)
+        zipname_1 = os.path.join(self.sync_directory, 'nolang', '{}.zip'.format(self.trek_1.pk))
+        zipname_2 = os.path.join(self.sync_directory, 'nolang', '{}.zip'.format(self.trek_2.pk))
+        inode_1, inode_2 = os.stat(zipname_1).st_ino, os.stat(zipname_2).st_ino
+        self.trek_2.save()
+        output = StringIO()
+        management.call_command('sync_mobile', self.sync_directory, url='http://localhost:8000',
+                                skip_tiles=True, incremental=True, verbosity=2, stdout=output)
+        self.assertIn('nolang/{}.zip\x1b[0m \x1b[32mreused'.format(self.trek_1.pk), output.getvalue())
+        self.assertIn('nolang/global.zip\x1b[0m \x1b[32mreused', output.getvalue())
+        self.assertNotIn('nolang/{}.zip\x1b[0m \x1b[32mreused'.format(self.trek_2.pk), output.getvalue())
+        self.assertEqual(os.stat(zipname_1).st_ino, inode_1)
+        self.assertNotEqual(os.stat(zipname_2).st_ino, inode_2)
+        # Media files of reused zips are still there
+        self.assertEqual(2, len(os.listdir(os.path.join(self.sync_directory, 'nolang', str(self.trek_1.pk),
+                                                        'media', 'paperclip', 'trekking_trek', str(self.trek_1.pk)))))
+
+    def test_not_incremental(self):
+        management.call_command('sync_mobile', self.sync_directory, url='http://localhost:8000',
+                                skip_tiles=True, verbosity=0)
+        output = StringIO()
+        management.call_command('sync_mobile', self.sync_directory, url='http://localhost:8000',
+                                skip_tiles=True, verbosity=2, stdout=output)
+        self.assertNotIn('reused', output.getvalue())
+        self.assertTrue(os.path.exists(os.path.join(self.sync_directory, 'nolang', '.manifest.json')))
+
     @override_settings(MOBILE_NUMBER_PICTURES_SYNC=1)
     def test_medias_treks_configuration_number_picture(self):
         output = StringIO()
@@ -590,3 +636,45 @@ class SyncMobileTreksTest(TranslationResetMixin, VarTmpTestCase):
         management.call_command('sync_mobile', self.sync_directory, url='http://localhost:8000',
                                 skip_tiles=True, verbosity=2, stdout=output)
         self.assertIn('Done', output.getvalue())
+
+
+class SyncMobileJobsTest(TransactionTestCase):
+    def setUp(self):
+        self.sync_directory = TemporaryDirectory(dir=settings.TMP_DIR).name
+        os.mkdir(self.sync_directory)
+
+    def test_sync_with_jobs(self):
+        trek_1 = TrekWithPublishedPOIsFactory.create(published=True)
+        trek_2 = TrekWithPublishedPOIsFactory.create(published=True)
+        output = StringIO()
+        management.call_command('sync_mobile', self.sync_directory, url='http://localhost:8000',
+                                skip_tiles=True, jobs=2, verbosity=2, stdout=output)
+        for trek in (trek_1, trek_2):
+            self.assertTrue(os.path.exists(os.path.join(self.sync_directory, 'nolang', '{}.zip'.format(trek.pk))))
+            self.assertTrue(os.path.exists(os.path.join(self.sync_directory, 'en', str(trek.pk), 'trek.geojson')))
+        for lang in settings.MODELTRANSLATION_LANGUAGES:
+            self.assertTrue(os.path.exists(os.path.join(self.sync_directory, lang, 'settings.json')))
+        self.assertIn('en/{}/trek.geojson'.format(trek_1.pk), output.getvalue())
+        with open(os.path.join(self.sync_directory, 'nolang', '.manifest.json')) as f:
+            self.assertIn('trek-{}'.format(trek_2.pk), json.load(f))
+
+    @mock.patch('geotrek.api.management.commands.sync_mobile.ProcessPoolExecutor')
+    def test_sync_with_jobs_in_daemon_runs_serially(self, pool):
+        trek = TrekWithPublishedPOIsFactory.create(published=True)
+        output = StringIO()
+        # e.g. in a Celery worker
+        with mock.patch.object(multiprocessing.current_process(), 'daemon', True), \
+                self.assertLogs('geotrek.api.management.commands.sync_mobile', 'WARNING'):
+            management.call_command('sync_mobile', self.sync_directory, url='http://localhost:8000',
+                                    skip_tiles=True, jobs=2, verbosity=2, stdout=output)
+        pool.assert_not_called()
+        self.assertTrue(os.path.exists(os.path.join(self.sync_directory, 'en', str(trek.pk), 'trek.geojson')))
+
+
+class SyncMobileJobsInTransactionTest(VarTmpTestCase):
+    def test_sync_with_jobs_runs_serially(self):
+        trek = TrekWithPublishedPOIsFactory.create(published=True)
+        output = StringIO()
+        management.call_command('sync_mobile', self.sync_directory, url='http://localhost:8000',
+                                skip_tiles=True, jobs=2, verbosity=2, stdout=output)
+        self.assertTrue(os.path.exists(os.path.join(self.sync_directory, 'en', str(trek.pk), 'trek.geojson')))
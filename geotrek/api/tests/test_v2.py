@@ -8,7 +8,7 @@ from dateutil.relativedelta import relativedelta
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.gis.geos import (LineString, MultiLineString, MultiPoint,
-                                     Point, Polygon)
+                                     MultiPolygon, Point, Polygon)
 from django.contrib.gis.geos.collections import GeometryCollection
 from django.db import connection
 from django.test import TestCase, RequestFactory, override_settings
@@ -27,6 +27,7 @@ from geotrek.authent.tests.factories import StructureFactory
 from geotrek.common import models as common_models
 from geotrek.common.models import Attachment, FileType
 from geotrek.common.tests import factories as common_factory, TranslationResetMixin
+from geotrek.common.utils.cache import handle_object_update
 from geotrek.common.utils.testdata import (get_dummy_uploaded_document,
                                            get_dummy_uploaded_file,
                                            get_dummy_uploaded_image, get_dummy_uploaded_image_svg)
@@ -3317,7 +3318,8 @@ class FlatPageTestCase(TestCase):
         # 5 queries for 5 related objects
         # 1 query for select on IDs
         # 1 count query
-        with self.assertNumQueries(7):
+        # 1 query for list cache key
+        with self.assertNumQueries(8):
             response = self.client.get('/api/v2/source/', {'portals': self.portal.pk})
             self.assertEqual(response.status_code, 200)
             self.assertEqual(response.json()['count'], 1)
@@ -3327,7 +3329,8 @@ class FlatPageTestCase(TestCase):
         # 5 queries for 5 related objects
         # 1 query for select on IDs
         # 1 count query
-        with self.assertNumQueries(7):
+        # 1 query for list cache key
+        with self.assertNumQueries(8):
             response = self.client.get('/api/v2/source/', {'language': 'fr'})
             self.assertEqual(response.status_code, 200)
             self.assertEqual(response.json()['count'], 1)
@@ -5486,12 +5489,12 @@ class AltimetryCacheTests(BaseApiTest):
     @skipIf(not settings.TREKKING_TOPOLOGY_ENABLED, 'Test with dynamic segmentation only')
     def test_cache_is_used_when_getting_trek_DEM(self):
         # There are 9 queries to get trek DEM
-        with self.assertNumQueries(10):
+        with self.assertNumQueries(9):
             response = self.client.get(reverse('apiv2:trek-dem', args=(self.trek.pk,)))
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response['Content-Type'], 'application/json')
-        # When cache is used there is single query to get trek DEM
-        with self.assertNumQueries(1):
+        # When cache is used there is no query to get trek DEM
+        with self.assertNumQueries(0):
             response = self.client.get(reverse('apiv2:trek-dem', args=(self.trek.pk,)))
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response['Content-Type'], 'application/json')
@@ -5500,25 +5503,25 @@ class AltimetryCacheTests(BaseApiTest):
     def test_cache_is_used_when_getting_trek_DEM_nds(self):
         trek = trek_factory.TrekFactory.create(geom=LineString((1, 101), (81, 101), (81, 99)))
         # There are 9 queries to get trek DEM
-        with self.assertNumQueries(10):
+        with self.assertNumQueries(9):
             response = self.client.get(reverse('apiv2:trek-dem', args=(trek.pk,)))
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response['Content-Type'], 'application/json')
-        # When cache is used there is single query to get trek DEM
-        with self.assertNumQueries(1):
+        # When cache is used there is no query to get trek DEM
+        with self.assertNumQueries(0):
             response = self.client.get(reverse('apiv2:trek-dem', args=(trek.pk,)))
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response['Content-Type'], 'application/json')
 
     def test_cache_is_used_when_getting_trek_profile(self):
         # There are 8 queries to get trek profile
-        with self.assertNumQueries(10):
+        with self.assertNumQueries(9):
             response = self.client.get(reverse('apiv2:trek-profile', args=(self.trek.pk,)))
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response['Content-Type'], 'application/json')
         self.assertIn("profile", response.json().keys())
-        # When cache is used there is single query to get trek profile
-        with self.assertNumQueries(1):
+        # When cache is used there is no query to get trek profile
+        with self.assertNumQueries(0):
             response = self.client.get(reverse('apiv2:trek-profile', args=(self.trek.pk,)))
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response['Content-Type'], 'application/json')
@@ -5526,12 +5529,12 @@ class AltimetryCacheTests(BaseApiTest):
 
     def test_cache_is_used_when_getting_trek_profile_svg(self):
         # There are 8 queries to get trek profile svg
-        with self.assertNumQueries(10):
+        with self.assertNumQueries(9):
             response = self.client.get(reverse('apiv2:trek-profile', args=(self.trek.pk,)), {"format": "svg"})
         self.assertEqual(response.status_code, 200)
         self.assertIn('image/svg+xml', response['Content-Type'])
-        # When cache is used there is single query to get trek profile
-        with self.assertNumQueries(1):
+        # When cache is used there is no query to get trek profile
+        with self.assertNumQueries(0):
             response = self.client.get(reverse('apiv2:trek-profile', args=(self.trek.pk,)), {"format": "svg"})
         self.assertEqual(response.status_code, 200)
         self.assertIn('image/svg+xml', response['Content-Type'])
@@ -5543,37 +5546,129 @@ class GenericCacheTestCase(APITestCase):
         cls.practice = PracticeFactory.create()
 
     def test_cache_invalidates_along_x_forwarded_proto_header(self):
-        with self.assertNumQueries(2):
+        # object version is known since it was saved, no query to check it
+        with self.assertNumQueries(1):
             response = self.client.get(reverse('apiv2:practice-detail', args=(self.practice.pk,)))
         data = response.json()
         self.assertTrue(data['pictogram'].startswith('http://'))
 
-        # after cache hit, query number is 1
-        with self.assertNumQueries(1):
+        # after cache hit, there is no query
+        with self.assertNumQueries(0):
             response = self.client.get(reverse('apiv2:practice-detail', args=(self.practice.pk,)))
         data = response.json()
         self.assertTrue(data['pictogram'].startswith('http://'))
 
         # we used custom header, cache is invalidate and url is now https
-        with self.assertNumQueries(2):
+        with self.assertNumQueries(1):
             response = self.client.get(reverse('apiv2:practice-detail', args=(self.practice.pk,)),
                                        headers={"x-forwarded-proto": 'https'})
         data = response.json()
         self.assertTrue(data['pictogram'].startswith('https://'))
 
         # cache is hit
-        with self.assertNumQueries(1):
+        with self.assertNumQueries(0):
             response = self.client.get(reverse('apiv2:practice-detail', args=(self.practice.pk,)),
                                        headers={"x-forwarded-proto": 'https'})
         data = response.json()
         self.assertTrue(data['pictogram'].startswith('https://'))
 
         # first request is always cached
-        with self.assertNumQueries(1):
+        with self.assertNumQueries(0):
             response = self.client.get(reverse('apiv2:practice-detail', args=(self.practice.pk,)))
         data = response.json()
         self.assertTrue(data['pictogram'].startswith('http://'))
 
+    def test_detail_cache_invalidated_by_changes(self):
+        url = reverse('apiv2:practice-detail', args=(self.practice.pk,))
+        self.client.get(url)
+        self.practice.name = "Renamed"
+        self.practice.save()
+        response = self.client.get(url, {'language': 'en'})
+        self.assertEqual(response.json()['name'], "Renamed")
+        response = self.client.get(url)
+        self.assertEqual(response.json()['name']['en'], "Renamed")
+
+    def test_detail_cache_kept_when_other_object_changes(self):
+        url = reverse('apiv2:practice-detail', args=(self.practice.pk,))
+        self.client.get(url)
+        PracticeFactory.create()
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+    def test_detail_cache_invalidated_by_related_changes(self):
+        trek = trek_factory.TrekFactory.create(practice=self.practice)
+        url = reverse('apiv2:trek-detail', args=(trek.pk,))
+        self.client.get(url)
+        theme = common_factory.ThemeFactory.create()
+        trek.themes.add(theme)
+        self.assertEqual(self.client.get(url).json()['themes'], [theme.pk])
+
+    def test_detail_cache_invalidated_by_sql_triggers(self):
+        url = reverse('apiv2:practice-detail', args=(self.practice.pk,))
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        # Objects updated by SQL triggers are notified on commit
+        handle_object_update(f'{trek_models.Practice._meta.db_table}:{self.practice.pk}')
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+    def test_detail_cache_deleted_object(self):
+        practice = PracticeFactory.create()
+        url = reverse('apiv2:practice-detail', args=(practice.pk,))
+        self.assertEqual(self.client.get(url).status_code, 200)
+        practice.delete()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_list_cache_invalidated_by_changes(self):
+        trek = trek_factory.TrekFactory.create(practice=self.practice)
+        url = reverse('apiv2:trek-list')
+        params = {'language': 'en'}
+        response = self.client.get(url, params)
+        self.assertEqual(response.json()['count'], 1)
+
+        # cache is hit, only list cache key is computed
+        with self.assertNumQueries(1):
+            response = self.client.get(url, params)
+        self.assertEqual(response.json()['count'], 1)
+
+        # object added
+        trek_factory.TrekFactory.create(practice=self.practice)
+        response = self.client.get(url, params)
+        self.assertEqual(response.json()['count'], 2)
+
+        # object changed
+        trek.name_en = "Renamed"
+        trek.save()
+        response = self.client.get(url, params)
+        self.assertIn("Renamed", [result['name'] for result in response.json()['results']])
+
+    def test_list_cache_invalidated_by_date(self):
+        with freeze_time("2024-06-10"):
+            tourism_factory.TouristicEventFactory.create(published=True, begin_date=datetime.date(2024, 6, 1),
+                                                         end_date=datetime.date(2024, 6, 10))
+            url = reverse('apiv2:touristicevent-list')
+            self.assertEqual(self.client.get(url).json()['count'], 1)
+        # Event ended yesterday, although no model version changed
+        with freeze_time("2024-06-11"):
+            self.assertEqual(self.client.get(url).json()['count'], 0)
+
+    def test_list_cache_invalidated_by_related_changes(self):
+        trek = trek_factory.TrekFactory.create(practice=self.practice)
+        url = reverse('apiv2:trek-list')
+        response = self.client.get(url)
+        self.assertEqual(response.json()['results'][0]['attachments'], [])
+
+        # Attachments are related to treks with a generic relation
+        common_factory.AttachmentFactory.create(content_object=trek)
+        response = self.client.get(url)
+        self.assertEqual(len(response.json()['results'][0]['attachments']), 1)
+
+        # Cities are related to treks by their geometries
+        zoning_factory.CityFactory.create(code='12345', geom=MultiPolygon(Polygon.from_bbox(trek.geom.buffer(10).extent), srid=settings.SRID))
+        response = self.client.get(url)
+        self.assertIn('12345', response.json()['results'][0]['cities'])
+
 
 class CreateReportsAPITest(TestCase):
     @classmethod
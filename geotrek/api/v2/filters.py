@@ -21,7 +21,7 @@ from modeltranslation.utils import build_localized_fieldname
 from geotrek.tourism.models import TouristicEventOrganizer, TouristicContent, TouristicContentType, TouristicEvent, \
     TouristicEventPlace, TouristicEventType
 from geotrek.trekking.models import ServiceType, Trek, POI
-from geotrek.zoning.models import City, District
+from geotrek.zoning.models import CityLink, DistrictLink
 
 if 'geotrek.outdoor' in settings.INSTALLED_APPS:
     from geotrek.outdoor.models import Course, Site
@@ -167,6 +167,9 @@ class GeotrekPublishedFilter(BaseFilterBackend):
 
 
 class GeotrekSensitiveAreaFilter(BaseFilterBackend):
+    # Species of current month are kept by default
+    depends_on_date = True
+
     def filter_queryset(self, request, queryset, view):
         qs = queryset
         practices = request.GET.get('practices')
@@ -369,15 +372,28 @@ class NearbyContentFilter(BaseFilterBackend):
         return fields
 
 
+def _filter_by_zones(queryset, link_model, zone_pks):
+    """Keep objects intersecting one of the zones, read from zoning links maintained in database.
+
+    Fall back on a spatial query for objects which links are not maintained.
+    """
+    table = link_model.linked_table(queryset.model)
+    if table is None:
+        zone_model = link_model._meta.get_field('zone').related_model
+        return queryset.filter(Exists(zone_model.objects.filter(pk__in=zone_pks, geom__intersects=OuterRef('geom'))))
+    return queryset.filter(Exists(link_model.objects.filter(object_table=table, object_id=OuterRef('pk'),
+                                                            zone__in=zone_pks)))
+
+
 class GeotrekZoningAndThemeFilter(BaseFilterBackend):
     def _filter_queryset(self, request, queryset, view):
         qs = queryset
         cities = request.GET.get('cities')
         if cities:
-            qs = qs.filter(Exists(City.objects.filter(code__in=cities.split(","), geom__intersects=OuterRef('geom'))))
+            qs = _filter_by_zones(qs, CityLink, cities.split(","))
         districts = request.GET.get('districts')
         if districts:
-            qs = qs.filter(Exists(District.objects.filter(pk__in=districts.split(","), geom__intersects=OuterRef('geom'))))
+            qs = _filter_by_zones(qs, DistrictLink, districts.split(","))
         structures = request.GET.get('structures')
         if structures:
             qs = qs.filter(structure__in=structures.split(','))
@@ -539,6 +555,9 @@ class TouristicEventFilterSet(filters.FilterSet):
 
 
 class GeotrekTouristicEventFilter(GeotrekZoningAndThemeFilter):
+    # Past events are filtered out by default
+    depends_on_date = True
+
     def filter_queryset(self, request, queryset, view):
         qs = queryset
         # Don't filter on detail view
@@ -706,10 +725,10 @@ class GeotrekTrekQueryParamsFilter(BaseFilterBackend):
             qs = qs.filter(ascent__lte=ascent_max)
         cities = request.GET.get('cities')
         if cities:
-            qs = qs.filter(Exists(City.objects.filter(code__in=cities.split(","), geom__intersects=OuterRef('geom'))))
+            qs = _filter_by_zones(qs, CityLink, cities.split(","))
         districts = request.GET.get('districts')
         if districts:
-            qs = qs.filter(Exists(District.objects.filter(pk__in=districts.split(","), geom__intersects=OuterRef('geom'))))
+            qs = _filter_by_zones(qs, DistrictLink, districts.split(","))
         structures = request.GET.get('structures')
         if structures:
             qs = qs.filter(structure__in=structures.split(','))
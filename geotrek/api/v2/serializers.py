@@ -30,6 +30,7 @@ from geotrek.api.v2.mixins import PDFSerializerMixin, PublishedRelatedObjectsSer
 from geotrek.api.v2.utils import build_url, get_translation_or_dict, is_published
 from geotrek.authent import models as authent_models
 from geotrek.common import models as common_models
+from geotrek.common.thumbnails import manifest_thumbnail
 from geotrek.common.utils import simplify_coords
 
 if 'geotrek.core' in settings.INSTALLED_APPS:
@@ -273,13 +274,15 @@ class AttachmentsSerializerMixin(serializers.ModelSerializer):
         return obj.attachment_file
 
     def get_thumbnail(self, obj):
-        thumbnailer = get_thumbnailer(self.get_attachment_file(obj))
         if hasattr(obj, 'is_image') and not obj.is_image:
             return ""
-        try:
-            thumbnail = thumbnailer.get_thumbnail(aliases.get('apiv2'))
-        except (IOError, InvalidImageFormatError, DecompressionBombError, NoSourceGenerator):
-            return ""
+        thumbnail = manifest_thumbnail(obj, 'apiv2') if isinstance(obj, common_models.Attachment) else None
+        if thumbnail is None:
+            thumbnailer = get_thumbnailer(self.get_attachment_file(obj))
+            try:
+                thumbnail = thumbnailer.get_thumbnail(aliases.get('apiv2'))
+            except (IOError, InvalidImageFormatError, DecompressionBombError, NoSourceGenerator):
+                return ""
         thumbnail.author = obj.author
         thumbnail.legend = obj.legend
         return build_url(self, thumbnail.url)
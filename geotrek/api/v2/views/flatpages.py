@@ -23,7 +23,7 @@ class FlatPageViewSet(api_viewsets.GeotrekViewSet):
     serializer_class = api_serializers.FlatPageSerializer
     queryset = flatpages_models.FlatPage.objects.order_by('pk') \
         .prefetch_related(Prefetch('attachments',
-                                   queryset=Attachment.objects.select_related('license', 'filetype', 'filetype__structure')))  # Required for reliable pagination
+                                   queryset=Attachment.objects.select_related('license', 'filetype', 'filetype__structure').prefetch_related('thumbnails')))  # Required for reliable pagination
 
 
 class MenuItemRetrieveView(RetrieveAPIView):
@@ -18,6 +18,7 @@ class SiteViewSet(api_viewsets.GeotrekGeometricViewset):
         api_filters.GeotrekRatingsFilter
     )
     serializer_class = api_serializers.SiteSerializer
+    with_zoning = True
 
     def get_queryset(self):
         activate(self.request.GET.get('language'))
@@ -25,7 +26,7 @@ class SiteViewSet(api_viewsets.GeotrekGeometricViewset):
             .annotate(geom_transformed=Transform(F('geom'), settings.API_SRID)) \
             .select_related('parent', 'practice', 'type') \
             .prefetch_related(Prefetch('attachments',
-                                       queryset=Attachment.objects.select_related('license', 'filetype', 'filetype__structure')),
+                                       queryset=Attachment.objects.select_related('license', 'filetype', 'filetype__structure').prefetch_related('thumbnails')),
                               Prefetch('view_points',
                                        queryset=HDViewPoint.objects.select_related('content_type', 'license').annotate(geom_transformed=Transform(F('geom'), settings.API_SRID))),
                               'information_desks', 'labels', 'managers', 'pois_excluded', 'portal', 'ratings', 'source', 'themes', 'web_links') \
@@ -90,6 +91,7 @@ class CourseViewSet(api_viewsets.GeotrekGeometricViewset):
         api_filters.GeotrekRatingsFilter
     )
     serializer_class = api_serializers.CourseSerializer
+    with_zoning = True
 
     def get_queryset(self):
         activate(self.request.GET.get('language'))
@@ -97,7 +99,7 @@ class CourseViewSet(api_viewsets.GeotrekGeometricViewset):
             .annotate(geom_transformed=Transform(F('geom'), settings.API_SRID)) \
             .select_related('type') \
             .prefetch_related(Prefetch('attachments',
-                                       queryset=Attachment.objects.select_related('license', 'filetype', 'filetype__structure')),
+                                       queryset=Attachment.objects.select_related('license', 'filetype', 'filetype__structure').prefetch_related('thumbnails')),
                               Prefetch('course_children', queryset=outdoor_models.OrderedCourseChild.objects.select_related('parent', 'child')),
                               Prefetch('course_parents', queryset=outdoor_models.OrderedCourseChild.objects.select_related('parent', 'child')),
                               'parent_sites', 'pois_excluded', 'ratings') \
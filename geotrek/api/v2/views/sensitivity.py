@@ -40,7 +40,7 @@ class SensitiveAreaViewSet(api_viewsets.GeotrekGeometricViewset):
             .prefetch_related(
                 'species__practices',
                 'rules',
-                Prefetch('attachments', queryset=Attachment.objects.select_related('license', 'filetype', 'filetype__structure'))
+                Prefetch('attachments', queryset=Attachment.objects.select_related('license', 'filetype', 'filetype__structure').prefetch_related('thumbnails'))
             )
             .alias(geom_type=GeometryType(F('geom')))
         )
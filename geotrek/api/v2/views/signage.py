@@ -16,7 +16,7 @@ class SignageViewSet(api_viewsets.GeotrekGeometricViewset):
         .annotate(geom3d_transformed=Transform(F('geom_3d'), settings.API_SRID)) \
         .prefetch_related('topo_object__aggregations',
                           Prefetch('attachments',
-                                   queryset=Attachment.objects.select_related('license', 'filetype', 'filetype__structure'))) \
+                                   queryset=Attachment.objects.select_related('license', 'filetype', 'filetype__structure').prefetch_related('thumbnails'))) \
         .order_by('pk')
 
 
@@ -41,6 +41,7 @@ class TouristicContentViewSet(api_viewsets.GeotrekGeometricViewset):
         api_filters.UpdateOrCreateDateFilter
     )
     serializer_class = api_serializers.TouristicContentSerializer
+    with_zoning = True
 
     def get_queryset(self):
         activate(self.request.GET.get('language'))
@@ -48,7 +49,7 @@ class TouristicContentViewSet(api_viewsets.GeotrekGeometricViewset):
             .select_related('category', 'reservation_system', 'label_accessibility') \
             .prefetch_related('source', 'themes', 'type1', 'type2',
                               Prefetch('attachments',
-                                       queryset=Attachment.objects.select_related('license', 'filetype__structure').order_by('starred', '-date_insert'))
+                                       queryset=Attachment.objects.select_related('license', 'filetype__structure').prefetch_related('thumbnails').order_by('starred', '-date_insert'))
                               ) \
             .annotate(geom_transformed=Transform(F('geom'), settings.API_SRID)) \
             .order_by('name')  # Required for reliable pagination
@@ -90,6 +91,7 @@ class TouristicEventViewSet(api_viewsets.GeotrekGeometricViewset):
     )
     filterset_class = api_filters.TouristicEventFilterSet
     serializer_class = api_serializers.TouristicEventSerializer
+    with_zoning = True
 
     def get_queryset(self):
         activate(self.request.GET.get('language'))
@@ -97,7 +99,7 @@ class TouristicEventViewSet(api_viewsets.GeotrekGeometricViewset):
             .select_related('type') \
             .prefetch_related('themes', 'source', 'portal', 'organizers',
                               Prefetch('attachments',
-                                       queryset=Attachment.objects.select_related('license', 'filetype', 'filetype__structure'))
+                                       queryset=Attachment.objects.select_related('license', 'filetype', 'filetype__structure').prefetch_related('thumbnails'))
                               ) \
             .annotate(geom_transformed=Transform(F('geom'), settings.API_SRID)) \
             .order_by('begin_date')  # Required for reliable pagination
@@ -30,6 +30,7 @@ class TrekViewSet(api_viewsets.GeotrekGeometricViewset):
         api_filters.GeotrekNetworksFilter
     )
     serializer_class = api_serializers.TrekSerializer
+    with_zoning = True
 
     def get_queryset(self):
         activate(self.request.GET.get('language'))
@@ -37,7 +38,7 @@ class TrekViewSet(api_viewsets.GeotrekGeometricViewset):
             .select_related('topo_object') \
             .prefetch_related('topo_object__aggregations', 'accessibilities',
                               Prefetch('attachments',
-                                       queryset=Attachment.objects.select_related('license', 'filetype', 'filetype__structure')),
+                                       queryset=Attachment.objects.select_related('license', 'filetype', 'filetype__structure').prefetch_related('thumbnails')),
                               Prefetch('attachments_accessibility',
                                        queryset=AccessibilityAttachment.objects.select_related('license')),
                               Prefetch('web_links',
@@ -172,7 +173,7 @@ class POIViewSet(api_viewsets.GeotrekGeometricViewset):
         .select_related('topo_object', 'type', ) \
         .prefetch_related('topo_object__aggregations',
                           Prefetch('attachments',
-                                   queryset=Attachment.objects.select_related('license', 'filetype', 'filetype__structure')),
+                                   queryset=Attachment.objects.select_related('license', 'filetype', 'filetype__structure').prefetch_related('thumbnails')),
                           Prefetch('view_points',
                                    queryset=HDViewPoint.objects.select_related('content_type', 'license').annotate(geom_transformed=Transform(F('geom'), settings.API_SRID)))) \
         .annotate(geom3d_transformed=Transform(F('geom_3d'), settings.API_SRID)) \
@@ -228,6 +229,6 @@ class ServiceViewSet(api_viewsets.GeotrekGeometricViewset):
         .select_related('topo_object', 'type', ) \
         .prefetch_related('topo_object__aggregations',
                           Prefetch('attachments',
-                                   queryset=Attachment.objects.select_related('license', 'filetype', 'filetype__structure')),) \
+                                   queryset=Attachment.objects.select_related('license', 'filetype', 'filetype__structure').prefetch_related('thumbnails')),) \
         .annotate(geom3d_transformed=Transform(F('geom_3d'), settings.API_SRID)) \
         .order_by('pk')
@@ -1,19 +1,25 @@
+import time
+from datetime import date
 from hashlib import md5
 
+from django.apps import apps
 from django.conf import settings
+from django.http import Http404
 from django_filters.rest_framework.backends import DjangoFilterBackend
 from mapentity.renderers import GeoJSONRenderer
 from rest_framework import viewsets, renderers
 from rest_framework.authentication import BasicAuthentication, SessionAuthentication
-from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
 
 from geotrek.api.v2 import pagination as api_pagination, filters as api_filters
-from geotrek.api.v2.cache import RetrieveCacheResponseMixin
+from geotrek.api.v2.cache import ListCacheResponseMixin, RetrieveCacheResponseMixin
 from geotrek.api.v2.serializers import override_serializer
+from geotrek.common.utils.cache import (get_model_versions, get_object_version, get_objects_epoch,
+                                        start_object_updates_listener)
+from geotrek.zoning.mixins import prefetch_zoning
 
 
-class GeotrekViewSet(RetrieveCacheResponseMixin, viewsets.ReadOnlyModelViewSet):
+class GeotrekViewSet(RetrieveCacheResponseMixin, ListCacheResponseMixin, viewsets.ReadOnlyModelViewSet):
     filter_backends = (
         DjangoFilterBackend,
         api_filters.GeotrekQueryParamsFilter,
@@ -24,6 +30,10 @@ class GeotrekViewSet(RetrieveCacheResponseMixin, viewsets.ReadOnlyModelViewSet):
     authentication_classes = [BasicAuthentication, SessionAuthentication]
     renderer_classes = [renderers.JSONRenderer, renderers.BrowsableAPIRenderer, ] if settings.DEBUG else [renderers.JSONRenderer, ]
     lookup_value_regex = r'\d+'
+    # Labels of models which changes invalidate cache, besides viewset model and models related to it
+    cache_dependencies = ()
+    # Labels of models which changes invalidate cache of details, besides object itself and models related to it
+    object_cache_dependencies = ()
 
     def get_ordered_query_params(self):
         """ Get multi value query params sorted by key """
@@ -36,18 +46,84 @@ class GeotrekViewSet(RetrieveCacheResponseMixin, viewsets.ReadOnlyModelViewSet):
         proto_scheme = self.request.headers.get('X-Forwarded-Proto', self.request.scheme)  # take care about scheme defined in nginx.conf
         return f"{self.request.path}:{self.get_ordered_query_params()}:{self.request.accepted_renderer.format}:{proto_scheme}"
 
+    def get_date_cache_string(self):
+        """ return current date if results are filtered against it by default (past events, species periods...) """
+        if any(getattr(backend, 'depends_on_date', False) for backend in self.filter_backends):
+            return date.today().isoformat()
+        return ''
+
     def get_object_cache_key(self, pk):
-        """ return specific object cache key based on object date_update column"""
-        # don't directly use get_object or get_queryset to avoid select / prefetch and annotation sql queries
-        # insure object exists and doesn't raise exception
-        instance = get_object_or_404(self.get_queryset().model, pk=pk)
-        date_update = instance.date_update
-        return f"{self.get_base_cache_string()}:{date_update.isoformat()}"
+        """ return specific object cache key based on object and related models versions, without sql query once known """
+        model = self.get_queryset().model
+
+        def initial_version():
+            # insure object exists and doesn't raise exception
+            return time.time_ns() if model._default_manager.filter(pk=pk).exists() else None
+
+        start_object_updates_listener()
+        version = get_object_version(model, pk, initial_version)
+        if version is None:
+            raise Http404
+        # Other objects of the model do not change this one, only its relations do
+        versions = sorted(get_model_versions(self.get_model_object_cache_dependencies(model)).items())
+        return f"{self.get_base_cache_string()}:{self.get_date_cache_string()}:{version}:{get_objects_epoch()}:{versions}"
 
     def object_cache_key_func(self, **kwargs):
         """ cache key md5 for retrieve viewset action """
         return md5(self.get_object_cache_key(kwargs.get('kwargs').get('pk')).encode("utf-8")).hexdigest()
 
+    @classmethod
+    def get_cache_model(cls):
+        """ return model served by viewset, known without request """
+        return (cls.queryset if cls.queryset is not None else cls.serializer_class.Meta).model
+
+    @staticmethod
+    def get_models(labels):
+        models = set()
+        for label in labels:
+            try:
+                models.add(apps.get_model(label))
+            except LookupError:  # application not installed
+                pass
+        return models
+
+    @classmethod
+    def get_model_cache_dependencies(cls, model):
+        """ return models which changes invalidate cache of ``model`` objects """
+        models = {model}
+        models.update(field.related_model for field in model._meta.get_fields()
+                      if field.is_relation and field.related_model is not None)
+        return models | cls.get_models(cls.cache_dependencies)
+
+    @classmethod
+    def get_model_object_cache_dependencies(cls, model):
+        """ return models which changes invalidate cache of a ``model`` object, besides its own version """
+        versioned = {model, *model._meta.get_parent_list()}
+        models = {field.related_model for field in model._meta.get_fields()
+                  if field.is_relation and field.related_model is not None and field.related_model not in versioned}
+        return models | cls.get_models(cls.object_cache_dependencies)
+
+    def get_cache_dependencies(self):
+        """ return models which changes invalidate cache """
+        return self.get_model_cache_dependencies(self.get_queryset().model)
+
+    def get_list_cache_key(self):
+        """ return list cache key based on versions of models it depends on """
+        model = self.get_queryset().model
+        # Also catch changes made by SQL triggers, or by queries which do not send signals
+        if hasattr(model, 'last_update_and_count'):
+            last_update_and_count = model.last_update_and_count
+            last_update = last_update_and_count['last_update']
+            state = f"{last_update.isoformat() if last_update else '0000-00-00'}:{last_update_and_count['count']}"
+        else:
+            state = ''
+        versions = sorted(get_model_versions(self.get_cache_dependencies()).items())
+        return f"{self.get_base_cache_string()}:{self.get_date_cache_string()}:{state}:{versions}"
+
+    def list_cache_key_func(self, **kwargs):
+        """ cache key md5 for list viewset action """
+        return md5(self.get_list_cache_key().encode("utf-8")).hexdigest()
+
     def get_serializer_context(self):
         return {
             'request': self.request,
@@ -55,6 +131,18 @@ class GeotrekViewSet(RetrieveCacheResponseMixin, viewsets.ReadOnlyModelViewSet):
         }
 
 
+def get_cached_models():
+    """ return models which changes invalidate cache of any viewset of the API """
+    from geotrek.api.v2.urls import router
+
+    models = set()
+    for prefix, viewset, basename in router.registry:
+        if issubclass(viewset, GeotrekViewSet):
+            model = viewset.get_cache_model()
+            models.update(viewset.get_model_cache_dependencies(model), viewset.get_model_object_cache_dependencies(model))
+    return models
+
+
 class GeotrekGeometricViewset(GeotrekViewSet):
     filter_backends = GeotrekViewSet.filter_backends + (
         api_filters.GeotrekQueryParamsDimensionFilter,
@@ -64,7 +152,21 @@ class GeotrekGeometricViewset(GeotrekViewSet):
     distance_filter_field = 'geom'
     bbox_filter_field = 'geom'
     bbox_filter_include_overlapping = True
+    # Cities, districts and restricted areas are computed from geometries, like objects near another one
+    cache_dependencies = (
+        'zoning.City', 'zoning.District', 'zoning.RestrictedArea',
+        'trekking.Trek', 'tourism.TouristicContent', 'tourism.TouristicEvent', 'outdoor.Site', 'outdoor.Course',
+    )
+    object_cache_dependencies = ('zoning.City', 'zoning.District', 'zoning.RestrictedArea')
     renderer_classes = GeotrekViewSet.renderer_classes + [GeoJSONRenderer, ]
+    # Read cities and districts of listed objects from zoning links, in bulk
+    with_zoning = False
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None and self.with_zoning:
+            page = prefetch_zoning(page)
+        return page
 
     def get_serializer_class(self):
         base_serializer_class = super().get_serializer_class()
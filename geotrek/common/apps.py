@@ -11,7 +11,11 @@ class CommonConfig(AppConfig):
 
     def ready(self):
         import geotrek.common.lookups  # NOQA
-        import geotrek.common.signals  # NOQA
+        from geotrek.common.mixins.models import GeotrekMapEntityMixin
+        from geotrek.common.signals import connect_version_receivers
+
+        # Map layers tiles are cached per model version
+        connect_version_receivers(model for model in self.apps.get_models() if issubclass(model, GeotrekMapEntityMixin))
 
 
 @register()
@@ -34,6 +34,18 @@ class EndPoint(GeoFunc):
     output_field = PointField()
 
 
+class PointX(GeoFunc):
+    """ ST_X postgis function """
+    output_field = FloatField()
+    function = 'ST_X'
+
+
+class PointY(GeoFunc):
+    """ ST_Y postgis function """
+    output_field = FloatField()
+    function = 'ST_Y'
+
+
 class Buffer(GeomOutputGeoFunc):
     """ ST_Buffer postgis function """
     pass
@@ -42,3 +54,8 @@ class Buffer(GeomOutputGeoFunc):
 class Area(GeoFunc):
     """ ST_Area postgis function """
     output_field = FloatField()
+
+
+class AsMVTGeom(GeomOutputGeoFunc):
+    """ ST_AsMVTGeom postgis function, transforming a geometry into tile coordinates """
+    geom_param_pos = (0, 1)
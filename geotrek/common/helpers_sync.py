@@ -1,5 +1,8 @@
 import logging
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from django.conf import settings
 from landez import TilesManager
@@ -9,10 +12,35 @@ from landez.sources import DownloadError
 logger = logging.getLogger(__name__)
 
 
+class TilesStats:
+    """ Thread-safe counters of tiles downloads, shared by the builders of a synchronization """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.downloaded = 0
+        self.retries = 0
+        self.failures = 0
+        self.duration = 0.0
+
+    def add(self, **counts):
+        with self.lock:
+            for name, count in counts.items():
+                setattr(self, name, getattr(self, name) + count)
+
+    def __str__(self):
+        return "{} tiles downloaded, {} retries, {} failures in {:.1f}s".format(
+            self.downloaded, self.retries, self.failures, self.duration)
+
+
 class ZipTilesBuilder:
-    def __init__(self, zipfile, prefix="", **builder_args):
+    """
+    Write tiles covering given areas into a zip file.
+    Tiles are fetched by a pool of MOBILE_TILES_WORKERS threads through landez, whose disk cache
+    in MOBILE_TILES_PATH is shared between treks and synchronizations.
+    """
+    def __init__(self, zipfile, prefix="", stats=None, **builder_args):
         self.zipfile = zipfile
         self.prefix = prefix
+        self.stats = stats or TilesStats()
         builder_args['tile_format'] = self.format_from_url(builder_args['tiles_url'])
         self.tm = TilesManager(**builder_args)
 
@@ -39,16 +67,34 @@ class ZipTilesBuilder:
     def add_coverage(self, bbox, zoomlevels):
         self.tiles |= set(self.tm.tileslist(bbox, zoomlevels))
 
-    def run(self):
-        for tile in self.tiles:
-            name = '{prefix}{0}/{1}/{2}{ext}'.format(
-                *tile,
-                prefix=self.prefix,
-                ext=settings.MOBILE_TILES_EXTENSION or self.tm._tile_extension
-            )
+    def fetch(self, tile):
+        """ Get tile content, retrying with exponential backoff. Returns None on failure. """
+        for attempt in range(settings.MOBILE_TILES_RETRIES + 1):
+            if attempt:
+                self.stats.add(retries=1)
+                time.sleep(settings.MOBILE_TILES_RETRY_DELAY * 2 ** (attempt - 1))
             try:
                 data = self.tm.tile(tile)
             except DownloadError:
-                logger.warning("Failed to download tile %s" % name)
-            else:
-                self.zipfile.writestr(name, data)
+                continue
+            self.stats.add(downloaded=1)
+            return data
+        self.stats.add(failures=1)
+        return None
+
+    def run(self):
+        start = time.time()
+        tiles = sorted(self.tiles)
+        # Zip file is written by this thread only
+        with ThreadPoolExecutor(max_workers=settings.MOBILE_TILES_WORKERS) as executor:
+            for tile, data in zip(tiles, executor.map(self.fetch, tiles)):
+                name = '{prefix}{0}/{1}/{2}{ext}'.format(
+                    *tile,
+                    prefix=self.prefix,
+                    ext=settings.MOBILE_TILES_EXTENSION or self.tm._tile_extension
+                )
+                if data is None:
+                    logger.warning("Failed to download tile %s" % name)
+                else:
+                    self.zipfile.writestr(name, data)
+        self.stats.add(duration=time.time() - start)
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from geotrek.common.models import Attachment, AttachmentThumbnail, file_hash
+
+
+class Command(BaseCommand):
+    help = "Compute hashes of attachment files, then make attachments with identical files share the same one"
+
+    def handle(self, *args, **options):
+        hashed = 0
+        attachments = Attachment.objects.exclude(attachment_file='').filter(file_hash='')
+        for pk, name in attachments.values_list('pk', 'attachment_file').iterator():
+            attachment_file = Attachment(pk=pk, attachment_file=name).attachment_file
+            try:
+                with attachment_file.open('rb'):
+                    content_hash = file_hash(attachment_file)
+            except FileNotFoundError:
+                if options['verbosity'] >= 2:
+                    self.stdout.write("{}... Missing".format(name))
+                continue
+            Attachment.objects.filter(pk=pk).update(file_hash=content_hash)
+            hashed += 1
+
+        deduplicated = 0
+        duplicates = Attachment.objects.exclude(file_hash='').order_by().values('file_hash') \
+            .annotate(nb_files=Count('attachment_file', distinct=True)).filter(nb_files__gt=1)
+        for duplicate in duplicates:
+            stored_name = Attachment.stored_file_name(duplicate['file_hash'])
+            if stored_name is None:
+                continue
+            others = Attachment.objects.filter(file_hash=duplicate['file_hash']).exclude(attachment_file=stored_name)
+            AttachmentThumbnail.objects.filter(attachment__in=others).delete()
+            deduplicated += others.update(attachment_file=stored_name)
+            if options['verbosity'] >= 2:
+                self.stdout.write("{}... Shared".format(stored_name))
+        if options['verbosity'] >= 1:
+            self.stdout.write("Hashed: {} / Deduplicated: {}".format(hashed, deduplicated))
+            if deduplicated:
+                self.stdout.write("Run generate_thumbnails then clean_attachments commands to remove unused files")
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from geotrek.common.models import Attachment
+from geotrek.common.thumbnails import generate_attachments_thumbnails
+
+
+class Command(BaseCommand):
+    help = "Render thumbnails of image attachments missing from thumbnails manifest"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', default=False,
+                            help="Render thumbnails of all image attachments again")
+
+    def handle(self, *args, **options):
+        attachments = Attachment.objects.filter(is_image=True).exclude(attachment_file='')
+        if not options['all']:
+            attachments = attachments.filter(thumbnails__isnull=True)
+        attachments = list(attachments)
+        generated = generate_attachments_thumbnails(attachments)
+        if options['verbosity'] >= 1:
+            self.stdout.write("Generated: {} / Invalid: {}".format(generated, len(attachments) - generated))
@@ -5,11 +5,14 @@ from django.conf import settings
 
 from easy_thumbnails.models import Thumbnail
 
+from geotrek.common.models import AttachmentThumbnail
+
 
 class Command(BaseCommand):
     help = "Remove all thumbnails"
 
     def handle(self, *args, **options):
+        AttachmentThumbnail.objects.all().delete()
         thumbnails = Thumbnail.objects.all()
 
         for thumbnail in thumbnails:
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.13 on 2024-10-07 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0037_annotationcategory_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attachment',
+            name='file_hash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=64, verbose_name='File hash'),
+        ),
+    ]
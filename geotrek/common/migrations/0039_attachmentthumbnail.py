@@ -0,0 +1,30 @@
+# Generated by Django 4.2.13 on 2024-10-14 09:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0038_attachment_file_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttachmentThumbnail',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alias', models.CharField(max_length=128)),
+                ('name', models.CharField(max_length=512)),
+                ('width', models.PositiveIntegerField(null=True)),
+                ('height', models.PositiveIntegerField(null=True)),
+                ('attachment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='thumbnails', to='common.attachment')),
+            ],
+            options={
+                'verbose_name': 'Attachment thumbnail',
+                'verbose_name_plural': 'Attachment thumbnails',
+                'unique_together': {('attachment', 'alias')},
+            },
+        ),
+    ]
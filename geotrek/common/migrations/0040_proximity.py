@@ -0,0 +1,29 @@
+# Generated by Django 4.2.13 on 2024-10-23 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0039_attachmentthumbnail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Proximity',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_type', models.CharField(max_length=64)),
+                ('source_id', models.IntegerField()),
+                ('target_type', models.CharField(max_length=64)),
+                ('target_id', models.IntegerField()),
+                ('distance', models.FloatField()),
+            ],
+            options={
+                'verbose_name': 'Proximity',
+                'verbose_name_plural': 'Proximities',
+                'indexes': [models.Index(fields=['source_type', 'source_id', 'target_type'], name='proximity_source_idx'), models.Index(fields=['target_type', 'target_id'], name='proximity_target_idx')],
+            },
+        ),
+    ]
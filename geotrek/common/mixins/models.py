@@ -1,5 +1,4 @@
 import datetime
-import hashlib
 import os
 import shutil
 import uuid
@@ -22,6 +21,7 @@ from easy_thumbnails.exceptions import InvalidImageFormatError
 from easy_thumbnails.files import get_thumbnailer
 
 from geotrek.common.mixins.managers import NoDeleteManager
+from geotrek.common.thumbnails import WATERMARK_ALIAS, manifest_thumbnail, thumbnail_options
 from geotrek.common.utils import classproperty, logger
 
 from mapentity.models import MapEntityMixin
@@ -107,7 +107,8 @@ class PicturesMixin:
         """
         if hasattr(self, '_pictures'):
             return self._pictures
-        return self.attachments.filter(is_image=True).exclude(title='mapimage').order_by('-starred', 'attachment_file')
+        return self.attachments.filter(is_image=True).exclude(title='mapimage').order_by('-starred', 'attachment_file') \
+            .prefetch_related('thumbnails')
 
     @pictures.setter
     def pictures(self, values):
@@ -141,34 +142,27 @@ class PicturesMixin:
     def resized_pictures(self):
         resized = []
         for picture in self.pictures:
-            thumbnailer = get_thumbnailer(picture.attachment_file)
-            try:
-                # Uppercase options aren't used by prepared options (a primary
-                # use of prepared options is to generate the filename -- these
-                # options don't alter the filename).
-                text = settings.THUMBNAIL_COPYRIGHT_FORMAT.format(author=picture.author, title=picture.title,
-                                                                  legend=picture.legend)
-                ali = thumbnailer.get_options({'size': (800, 800),
-                                               'TEXT': text,
-                                               'SIZE_WATERMARK': settings.THUMBNAIL_COPYRIGHT_SIZE,
-                                               'watermark': hashlib.md5(text.encode('utf-8')).hexdigest()
-                                               })
-
-                thdetail = thumbnailer.get_thumbnail(ali)
-            except (IOError, InvalidImageFormatError, DecompressionBombError, NoSourceGenerator) as e:
-                logger.info(_("Image {} invalid or missing from disk: {}.").format(picture.attachment_file, e))
-            else:
-                resized.append((picture, thdetail))
+            thdetail = manifest_thumbnail(picture, WATERMARK_ALIAS)
+            if thdetail is None:
+                thumbnailer = get_thumbnailer(picture.attachment_file)
+                try:
+                    thdetail = thumbnailer.get_thumbnail(thumbnailer.get_options(thumbnail_options(picture, WATERMARK_ALIAS)))
+                except (IOError, InvalidImageFormatError, DecompressionBombError, NoSourceGenerator) as e:
+                    logger.info(_("Image {} invalid or missing from disk: {}.").format(picture.attachment_file, e))
+                    continue
+            resized.append((picture, thdetail))
         return resized
 
     def get_thumbnail(self, alias):
         for picture in self.pictures:
-            thumbnailer = get_thumbnailer(picture.attachment_file)
-            try:
-                thumbnail = thumbnailer.get_thumbnail(aliases.get(alias))
-            except (IOError, InvalidImageFormatError, DecompressionBombError) as e:
-                logger.info(_("Image {} invalid or missing from disk: {}.").format(picture.attachment_file, e))
-                continue
+            thumbnail = manifest_thumbnail(picture, alias)
+            if thumbnail is None:
+                thumbnailer = get_thumbnailer(picture.attachment_file)
+                try:
+                    thumbnail = thumbnailer.get_thumbnail(aliases.get(alias))
+                except (IOError, InvalidImageFormatError, DecompressionBombError) as e:
+                    logger.info(_("Image {} invalid or missing from disk: {}.").format(picture.attachment_file, e))
+                    continue
             thumbnail.author = picture.author
             thumbnail.legend = picture.legend
             return thumbnail
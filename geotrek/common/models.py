@@ -1,3 +1,4 @@
+import hashlib
 import os
 import random
 import string
@@ -182,9 +183,88 @@ class FileType(StructureOrNoneRelated, TimeStampedModelMixin, BaseFileType):
         return self.type
 
 
+def file_hash(f):
+    """ SHA-256 of a file content, identical files have the same hash """
+    sha = hashlib.sha256()
+    for chunk in f.chunks():
+        sha.update(chunk)
+    return sha.hexdigest()
+
+
 class Attachment(BaseAttachment):
     creation_date = models.DateField(verbose_name=_("Creation Date"), null=True, blank=True)
     uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    file_hash = models.CharField(verbose_name=_("File hash"), max_length=64, blank=True, default='',
+                                 db_index=True, editable=False)
+    # Thumbnails are rendered from the file, with copyright of these fields
+    thumbnail_fields = ('attachment_file', 'author', 'title', 'legend')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._thumbnail_source = instance.get_thumbnail_source()
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._thumbnail_source = self.get_thumbnail_source()
+
+    def get_thumbnail_source(self):
+        """ Values thumbnails depend on, or None if some of them are not loaded """
+        if self.get_deferred_fields().intersection(self.thumbnail_fields):
+            return None
+        return tuple(str(getattr(self, name)) for name in self.thumbnail_fields)
+
+    def save(self, *args, **kwargs):
+        stored_name = self.attachment_file.name if self.attachment_file._committed else None
+        super().save(*args, **kwargs)
+        if not self.attachment_file:
+            content_hash = ''
+        elif self.attachment_file.name != stored_name:
+            # Image may have been resized by paperclip: hash the stored file, as deduplicate_attachments does
+            try:
+                with self.attachment_file.storage.open(self.attachment_file.name, 'rb') as f:
+                    content_hash = file_hash(f)
+            except FileNotFoundError:
+                return
+        else:
+            return
+        if content_hash != self.file_hash:
+            self.file_hash = content_hash
+            type(self).objects.filter(pk=self.pk).update(file_hash=content_hash)
+
+    @classmethod
+    def stored_file_name(cls, content_hash):
+        """
+        Name of a stored file with this content hash, if any.
+        Attachments may share their file, thumbnails are then generated once.
+        """
+        names = cls.objects.filter(file_hash=content_hash).exclude(attachment_file='') \
+            .order_by('pk').values_list('attachment_file', flat=True)
+        for name in names:
+            if cls._meta.get_field('attachment_file').storage.exists(name):
+                return name
+        return None
+
+
+class AttachmentThumbnail(models.Model):
+    """
+    Manifest of thumbnails rendered in background for an attachment (see ``geotrek.common.thumbnails``),
+    so that they are served without checking source files or easy-thumbnails tables.
+    """
+    attachment = models.ForeignKey(Attachment, on_delete=models.CASCADE, related_name='thumbnails')
+    alias = models.CharField(max_length=128)
+    name = models.CharField(max_length=512)
+    width = models.PositiveIntegerField(null=True)
+    height = models.PositiveIntegerField(null=True)
+
+    class Meta:
+        verbose_name = _("Attachment thumbnail")
+        verbose_name_plural = _("Attachment thumbnails")
+        unique_together = (('attachment', 'alias'),)
+
+    def __str__(self):
+        return "{} ({})".format(self.name, self.alias)
 
 
 class Theme(TimeStampedModelMixin, PictogramMixin):
@@ -405,3 +485,43 @@ class AccessMean(TimeStampedModelMixin):
 
     def __str__(self):
         return self.label
+
+
+class Proximity(models.Model):
+    """
+    Objects closer than ``PROXIMITY_MARGIN``, maintained by SQL triggers (see ``post_30_proximities.sql``),
+    so that neighbours are read without spatial queries. Each pair is stored in both directions.
+    """
+    INDEXED_MODELS = ('trekking.trek', 'tourism.touristiccontent', 'tourism.touristicevent',
+                      'outdoor.site', 'outdoor.course')
+
+    source_type = models.CharField(max_length=64)
+    source_id = models.IntegerField()
+    target_type = models.CharField(max_length=64)
+    target_id = models.IntegerField()
+    distance = models.FloatField()
+
+    class Meta:
+        verbose_name = _("Proximity")
+        verbose_name_plural = _("Proximities")
+        indexes = [
+            models.Index(fields=['source_type', 'source_id', 'target_type'], name='proximity_source_idx'),
+            models.Index(fields=['target_type', 'target_id'], name='proximity_target_idx'),
+        ]
+
+    def __str__(self):
+        return "{}:{} - {}:{}".format(self.source_type, self.source_id, self.target_type, self.target_id)
+
+    @classmethod
+    def near(cls, model, obj, distance):
+        """
+        Ids of objects of ``model`` within ``distance`` of ``obj``, as a subquery.
+        Returns None if this relation is not indexed.
+        """
+        source_type = obj._meta.label_lower
+        target_type = model._meta.label_lower
+        if obj.pk is None or distance > settings.PROXIMITY_MARGIN \
+                or source_type not in cls.INDEXED_MODELS or target_type not in cls.INDEXED_MODELS:
+            return None
+        return cls.objects.filter(source_type=source_type, source_id=obj.pk, target_type=target_type,
+                                  distance__lte=distance).values('target_id')
@@ -1,3 +1,4 @@
+from concurrent.futures import ThreadPoolExecutor, wait
 from io import BytesIO
 import importlib
 import json
@@ -6,10 +7,13 @@ from pathlib import PurePath
 import re
 import requests
 import logging
+import tempfile
 import magic
 import mimetypes
+import queue
 from requests.auth import HTTPBasicAuth
 import textwrap
+import threading
 import xlrd
 import xml.etree.ElementTree as ET
 from functools import reduce
@@ -17,12 +21,12 @@ from collections.abc import Iterable
 from time import sleep
 from PIL import Image, UnidentifiedImageError
 
-from ftplib import FTP
+from ftplib import FTP, all_errors as ftp_errors
 from os.path import dirname
 from urllib.parse import urlparse
 
 from django.contrib.gis.geos import GEOSGeometry, WKBWriter
-from django.db import models, connection
+from django.db import models, connection, transaction
 from django.db.models.fields import NOT_PROVIDED
 from django.db.utils import DatabaseError, InternalError
 from django.contrib.auth import get_user_model
@@ -31,7 +35,7 @@ from django.contrib.gis.geos import Point, Polygon
 from django.core.exceptions import ImproperlyConfigured
 from django.core.files.base import ContentFile
 from django.template.loader import render_to_string
-from django.utils import translation
+from django.utils import timezone, translation
 from django.utils.translation import gettext as _
 from django.utils.encoding import force_str
 from django.conf import settings
@@ -39,8 +43,10 @@ from paperclip.models import attachment_upload, random_suffix_regexp
 from modeltranslation.utils import build_localized_fieldname
 
 from geotrek.authent.models import default_structure
-from geotrek.common.models import FileType, Attachment, License, RecordSource
-from geotrek.common.utils.parsers import add_http_prefix
+from geotrek.common.models import FileType, Attachment, License, RecordSource, file_hash
+from geotrek.common.thumbnails import schedule_thumbnails
+from geotrek.common.utils.cache import bump_model_version, bump_object_version
+from geotrek.common.utils.parsers import add_http_prefix, stream_json_items
 from geotrek.common.utils.translation import get_translated_fields
 
 
@@ -100,10 +106,17 @@ class Parser:
     field_options = {}
     default_language = None
     headers = {"User-Agent": "Geotrek-Admin"}
+    batch_size = None
+    # Parse feed incrementally instead of loading it at once, where supported
+    streaming = False
+    stream_chunk_size = 64 * 1024
 
     def __init__(self, progress_cb=None, user=None, encoding='utf8'):
         self.warnings = {}
         self.line = 0
+        self.batch_objects = None
+        self.bulk_objects = None
+        self.lookup_cache = None
         self.nb_success = 0
         self.nb_created = 0
         self.nb_updated = 0
@@ -336,9 +349,17 @@ class Parser:
         if operation == "created":
             if hasattr(self.model, 'provider') and self.provider is not None and not self.obj.provider:
                 self.obj.provider = self.provider
+        if self.bulk_objects is not None:
+            self.defer_obj(row, operation, update_fields)
+            return
+        if operation == "created":
             self.obj.save()
         else:
             self.obj.save(update_fields=update_fields)
+        self.parse_relations(row, operation, update_fields)
+
+    def parse_relations(self, row, operation, update_fields):
+        """ Parse fields requiring the object to be saved, and count it """
         update_fields += self.parse_fields(row, self.m2m_fields)
         update_fields += self.parse_fields(row, self.m2m_constant_fields)
         update_fields += self.parse_fields(row, self.non_fields, non_field=True)
@@ -365,6 +386,14 @@ class Parser:
         self.eid_val = eid_val
         return {self.eid: eid_val}
 
+    def get_objects(self, eid_kwargs):
+        if self.batch_objects is not None:
+            return list(self.batch_objects.get(self.eid_key(eid_kwargs[self.eid]), []))
+        objects = self.model.objects.filter(**eid_kwargs)
+        if hasattr(self.model, 'provider') and self.provider is not None:
+            objects = objects.filter(provider__exact=self.provider)
+        return objects
+
     def parse_row(self, row):
         self.eid_val = None
         self.line += 1
@@ -377,9 +406,7 @@ class Parser:
             except RowImportError as warnings:
                 self.add_warning(str(warnings))
                 return
-            objects = self.model.objects.filter(**eid_kwargs)
-            if hasattr(self.model, 'provider') and self.provider is not None:
-                objects = objects.filter(provider__exact=self.provider)
+            objects = self.get_objects(eid_kwargs)
         if len(objects) == 0 and self.update_only:
             if self.warn_on_missing_objects:
                 self.add_warning(_("Bad value '{eid_val}' for field '{eid_src}'. No object with this identifier").format(eid_val=self.eid_val, eid_src=self.eid_src))
@@ -390,6 +417,9 @@ class Parser:
                 obj.structure = self.structure
             objects = [obj]
             operation = "created"
+            if self.batch_objects is not None:
+                # Next rows of the batch with the same eid will update this object
+                self.batch_objects[self.eid_key(self.eid_val)] = objects
         elif len(objects) >= 2 and not self.duplicate_eid_allowed:
             self.add_warning(_("Bad value '{eid_val}' for field '{eid_src}'. Multiple objects with this identifier").format(eid_val=self.eid_val, eid_src=self.eid_src))
             return
@@ -453,15 +483,14 @@ class Parser:
         if fk:
             fields[fk] = getattr(self.obj, fk)
         if create:
-            val, created = model.objects.get_or_create(**fields)
+            val, created = self.get_related(model, fields, create=True)
             if created:
                 self.add_warning(_("{model} '{val}' did not exist in Geotrek-Admin and was automatically created").format(model=model._meta.verbose_name.title(), val=val))
             return val
-        try:
-            return model.objects.get(**fields)
-        except model.DoesNotExist:
+        related, created = self.get_related(model, fields)
+        if related is None:
             self.add_warning(_("{model} '{val}' does not exists in Geotrek-Admin. Please add it").format(model=model._meta.verbose_name.title(), val=val))
-            return None
+        return related
 
     def filter_m2m(self, src, val, model, field, mapping=None, partial=False, create=False, fk=None, **kwargs):
         if not val:
@@ -479,18 +508,42 @@ class Parser:
             if fk:
                 fields[fk] = getattr(self.obj, fk)
             if create:
-                subval, created = model.objects.get_or_create(**fields)
+                subval, created = self.get_related(model, fields, create=True)
                 if created:
                     self.add_warning(_("{model} '{val}' did not exist in Geotrek-Admin and was automatically created").format(model=model._meta.verbose_name.title(), val=subval))
                 dst.append(subval)
                 continue
-            try:
-                dst.append(model.objects.get(**fields))
-            except model.DoesNotExist:
+            related, created = self.get_related(model, fields)
+            if related is None:
                 self.add_warning(_("{model} '{val}' does not exists in Geotrek-Admin. Please add it").format(model=model._meta.verbose_name.title(), val=subval))
                 continue
+            dst.append(related)
         return dst
 
+    def get_related(self, model, fields, create=False):
+        """
+        Returns (object or None if it does not exist, created) for a foreign key or many to many value.
+        In batch mode, lookups are cached for the whole import.
+        """
+        key = (model, create, tuple(sorted(fields.items())))
+        try:
+            hash(key)
+        except TypeError:
+            key = None
+        if self.lookup_cache is not None and key in self.lookup_cache:
+            return self.lookup_cache[key], False
+        created = False
+        if create:
+            related, created = model.objects.get_or_create(**fields)
+        else:
+            try:
+                related = model.objects.get(**fields)
+            except model.DoesNotExist:
+                related = None
+        if self.lookup_cache is not None and key is not None:
+            self.lookup_cache[key] = related
+        return related, created
+
     def get_to_delete_kwargs(self):
         # FIXME: use mapping if it exists
         kwargs = {}
@@ -537,30 +590,148 @@ class Parser:
             raise GlobalImportError(_("Filename or url is required"))
         if self.filename and not os.path.exists(self.filename):
             raise GlobalImportError(_("File does not exists at: {filename}").format(filename=self.filename))
+        self.lookup_cache = {} if self.batch_size else None
         self.start()
+        batch = []
         for i, row in enumerate(self.next_row()):
             if limit and i >= limit:
                 break
+            if not self.batch_size:
+                self.call_or_warn(self.parse_row, row)
+                continue
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self.parse_batch(batch)
+                batch = []
+        if batch:
+            self.parse_batch(batch)
+        self.end()
+
+    def call_or_warn(self, method, *args):
+        """ Call method, turning row errors into warnings """
+        try:
+            method(*args)
+        except DatabaseError as e:
+            if settings.DEBUG:
+                raise
+            self.add_warning(str(e))
+        except (ValueImportError, RowImportError) as e:
+            self.add_warning(str(e))
+
+    def eid_key(self, val):
+        return self.model._meta.get_field(self.eid).to_python(val)
+
+    def can_bulk_save(self):
+        """ bulk_create/bulk_update bypass save() and do not support multi-table inheritance """
+        return not self.model._meta.parents and self.model.save is models.Model.save
+
+    def prefetch_objects(self, rows):
+        """ Get existing objects of a batch of rows with a single query """
+        warnings, line = self.warnings, self.line
+        # Warnings are added when rows are parsed
+        self.warnings = {}
+        eids = set()
+        for row in rows:
+            try:
+                eids.add(self.get_eid_kwargs(row)[self.eid])
+            except (ValueImportError, RowImportError):
+                continue
+        self.warnings, self.line = warnings, line
+        objects = self.model.objects.filter(**{'{}__in'.format(self.eid): eids})
+        if hasattr(self.model, 'provider') and self.provider is not None:
+            objects = objects.filter(provider__exact=self.provider)
+        self.batch_objects = {}
+        for obj in objects:
+            self.batch_objects.setdefault(self.eid_key(getattr(obj, self.eid)), []).append(obj)
+
+    def parse_batch(self, rows):
+        """
+        Parse rows with set-based queries: existing objects are fetched at once,
+        then created and updated with bulk queries when model allows it.
+        """
+        if self.eid is not None:
+            self.prefetch_objects(rows)
+        if self.can_bulk_save():
+            self.bulk_objects = {}
+            self.bulk_rows = []
+        for row in rows:
+            self.call_or_warn(self.parse_row, row)
+        if self.bulk_objects is not None:
+            self.call_or_warn(self.bulk_save)
+        self.batch_objects = None
+        self.bulk_objects = None
+
+    def defer_obj(self, row, operation, update_fields):
+        obj, created, fields = self.bulk_objects.setdefault(id(self.obj), (self.obj, operation == "created", set()))
+        fields.update(name for name in update_fields if not self.model._meta.get_field(name).many_to_many)
+        self.bulk_rows.append((self.line, self.eid_val, row, self.obj, operation, update_fields))
+
+    def bulk_save(self):
+        to_create = [obj for obj, created, fields in self.bulk_objects.values() if created]
+        to_update = [obj for obj, created, fields in self.bulk_objects.values() if not created and fields]
+        update_fields = set().union(*[fields for obj, created, fields in self.bulk_objects.values() if not created])
+        date_update = 'date_update' in {field.name for field in self.model._meta.concrete_fields}
+        if to_update and date_update:
+            # bulk_update does not set auto_now fields
+            now = timezone.now()
+            for obj in to_update:
+                obj.date_update = now
+            update_fields.add('date_update')
+        try:
+            with transaction.atomic():
+                self.model.objects.bulk_create(to_create, batch_size=self.batch_size)
+                if to_update:
+                    self.model.objects.bulk_update(to_update, update_fields, batch_size=self.batch_size)
+        except DatabaseError:
+            # Save objects one by one, so that errors are reported on their own line
+            for obj in to_create:
+                obj.pk = None
+                obj._state.adding = True
+            self.save_rows(date_update)
+            return
+        # Bulk operations do not send post_save signals, which invalidate API caches
+        if to_create or to_update:
+            bump_model_version(self.model)
+        for obj in to_update:
+            bump_object_version(self.model, obj.pk)
+        line = self.line
+        for self.line, self.eid_val, row, self.obj, operation, update_fields in self.bulk_rows:
+            self.call_or_warn(self.parse_relations, row, operation, update_fields)
+            self.to_delete.discard(self.obj.pk)
+        self.line = line
+
+    def save_rows(self, date_update):
+        """ Save deferred rows one by one, after bulk queries failed """
+        line = self.line
+        failed_lines = set()
+        for self.line, self.eid_val, row, self.obj, operation, update_fields in self.bulk_rows:
+            if self.obj.pk is None:
+                # Object of a previous row of the batch failed to be created
+                operation = "created"
+            elif update_fields and date_update:
+                update_fields.append('date_update')
             try:
-                self.parse_row(row)
+                with transaction.atomic():
+                    if operation == "created":
+                        self.obj.save()
+                    else:
+                        self.obj.save(update_fields=update_fields)
             except DatabaseError as e:
                 if settings.DEBUG:
                     raise
                 self.add_warning(str(e))
-            except (ValueImportError, RowImportError) as e:
-                self.add_warning(str(e))
-            except Exception as e:
-                raise
-                if settings.DEBUG:
-                    raise
-                self.add_warning(str(e))
-        self.end()
+                failed_lines.add(self.line)
+                continue
+            self.call_or_warn(self.parse_relations, row, operation, update_fields)
+            self.to_delete.discard(self.obj.pk)
+        self.nb_success -= len(failed_lines)
+        self.line = line
 
-    def request_or_retry(self, url, verb='get', **kwargs):
+    def request_or_retry(self, url, verb='get', session=None, **kwargs):
         try_get = settings.PARSER_NUMBER_OF_TRIES
         assert try_get > 0
         while try_get:
-            action = getattr(requests, verb)
+            action = getattr(session or requests, verb)
             response = action(url, headers=self.headers, allow_redirects=True, **kwargs)
             if response.status_code in settings.PARSER_RETRY_HTTP_STATUS:
                 logger.info("Failed to fetch url {}. Retrying ...".format(url))
@@ -578,8 +749,13 @@ class XmlParser(Parser):
     """XML Parser"""
     ns = {}
     results_path = ''
+    # Top level elements kept in self.root when streaming, e.g. for lookups
+    keep_in_root = []
 
     def next_row(self):
+        if self.streaming:
+            yield from self.next_row_streaming()
+            return
         if self.filename:
             with open(self.filename) as f:
                 self.root = ET.fromstring(f.read())
@@ -594,6 +770,59 @@ class XmlParser(Parser):
         for row in entries:
             yield row
 
+    def next_row_streaming(self):
+        """
+        Parse document incrementally, so that memory use does not depend on its size.
+        It is read twice: first to count entries and get ``keep_in_root`` elements, then to yield entries.
+        """
+        with self.open_document() as f:
+            self.nb = 0
+            for row in self.iterparse_entries(f):
+                self.nb += 1
+            f.seek(0)
+            yield from self.iterparse_entries(f)
+
+    def open_document(self):
+        if self.filename:
+            return open(self.filename, 'rb')
+        response = requests.get(self.url, params={}, stream=True)
+        if response.status_code != 200:
+            raise GlobalImportError(_(u"Failed to download {url}. HTTP status code {status_code}").format(
+                url=self.url, status_code=response.status_code))
+        f = tempfile.TemporaryFile()
+        for chunk in response.iter_content(chunk_size=self.stream_chunk_size):
+            f.write(chunk)
+        f.seek(0)
+        return f
+
+    def results_tags(self):
+        """Tags of elements on results path, which must be a simple path from root"""
+        tags = []
+        for part in self.results_path.split('/'):
+            prefix, sep, tag = part.rpartition(':')
+            tags.append('{%s}%s' % (self.ns[prefix], tag) if sep else part)
+        return tags
+
+    def iterparse_entries(self, f):
+        """
+        Yield elements on results path, removed from the tree once processed, like
+        other top level elements except ``keep_in_root`` ones.
+        """
+        tags = self.results_tags()
+        events = ET.iterparse(f, events=('start', 'end'))
+        stack = []
+        for event, elem in events:
+            if event == 'start':
+                stack.append(elem)
+                continue
+            stack.pop()
+            if len(stack) == len(tags) and all(e.tag == tag for e, tag in zip(stack[1:] + [elem], tags)):
+                yield elem
+                stack[-1].remove(elem)
+            elif len(stack) == 1 and elem.tag not in self.keep_in_root:
+                stack[0].remove(elem)
+        self.root = events.root
+
     def get_part(self, dst, src, val):
         return val.findtext(src, None, self.ns)
 
@@ -672,6 +901,9 @@ class AttachmentParserMixin:
     non_fields = {
         'attachments': _("Attachments"),
     }
+    # Number of objects whose attachments are queued before being saved, when downloaded by a pool of threads
+    attachments_batch_size = 50
+    attachments_pool = None
 
     def start(self):
         super().start()
@@ -686,6 +918,175 @@ class AttachmentParserMixin:
                 raise GlobalImportError(_("FileType '{name}' does not exists in "
                                           "Geotrek-Admin. Please add it").format(name=self.filetype_name))
         self.creator, created = get_user_model().objects.get_or_create(username='import', defaults={'is_active': False})
+        self.attachments_local = threading.local()
+        self.attachments_connections = []
+        self.attachments_lock = threading.Lock()
+        self.attachments_queue = []
+        self.prefetched_attachments = {}
+        # Files stored during this import, by url and by content hash
+        self.stored_urls = {}
+        self.stored_hashes = {}
+        if settings.PARSER_ATTACHMENTS_WORKERS > 1:
+            self.attachments_pool = ThreadPoolExecutor(max_workers=settings.PARSER_ATTACHMENTS_WORKERS)
+
+    def end(self):
+        if self.attachments_pool is not None:
+            self.flush_attachments()
+            self.attachments_pool.shutdown()
+            self.attachments_pool = None
+        self.close_connections()
+        super().end()
+
+    def parse_relations(self, row, operation, update_fields):
+        super().parse_relations(row, operation, update_fields)
+        if not self.attachments_queue:
+            return
+        entry = self.attachments_queue[-1]
+        if entry['obj'] is self.obj and 'unmodified' not in entry:
+            # Counted before its attachments are saved, see flush_attachments()
+            entry['unmodified'] = operation != "created" and not update_fields
+        if len(self.attachments_queue) >= self.attachments_batch_size:
+            self.flush_attachments()
+
+    def register_connection(self, client):
+        with self.attachments_lock:
+            self.attachments_connections.append(client)
+        return client
+
+    def close_connections(self):
+        for client in getattr(self, 'attachments_connections', []):
+            try:
+                client.close()
+            except ftp_errors:
+                pass
+        self.attachments_connections = []
+
+    def get_session(self):
+        """ HTTP session of the current worker thread, reusing its connections """
+        if self.attachments_pool is None:
+            return None
+        if not hasattr(self.attachments_local, 'session'):
+            self.attachments_local.session = self.register_connection(requests.Session())
+        return self.attachments_local.session
+
+    def get_ftp(self, parsed_url):
+        """ FTP connection of the current thread to this host, logged in once """
+        connections = self.attachments_local.__dict__.setdefault('ftp', {})
+        key = (parsed_url.hostname, parsed_url.username, parsed_url.password)
+        ftp = connections.get(key)
+        if ftp is not None:
+            try:
+                ftp.voidcmd('NOOP')
+            except ftp_errors:
+                ftp = None
+        if ftp is None:
+            ftp = self.register_connection(FTP(parsed_url.hostname))
+            ftp.login(user=parsed_url.username, passwd=parsed_url.password)
+            connections[key] = ftp
+        return ftp
+
+    def ftp_size(self, url):
+        parsed_url = urlparse(url)
+        ftp = self.get_ftp(parsed_url)
+        ftp.cwd(dirname(parsed_url.path))
+        return ftp.size(parsed_url.path.split('/')[-1:][0])
+
+    def fetch_attachment(self, url, verb):
+        if verb == 'size':
+            return self.ftp_size(url)
+        return self.request_or_retry(url, verb=verb, session=self.get_session())
+
+    def request_attachment(self, url, verb='get'):
+        """ Return the result of a request, fetched by the pool of threads if possible """
+        try:
+            result = self.prefetched_attachments[(verb, url)]
+        except (AttributeError, KeyError):
+            return self.fetch_attachment(url, verb)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def prefetch_attachment(self, url, sizes, download=True):
+        """
+        Run in a worker thread the requests of an attachment url. ``sizes`` are sizes of existing
+        attachments matching this url (``None`` if there is none), unchanged files are not downloaded.
+        """
+        scheme = urlparse(url).scheme
+        if sizes is not None:
+            verb = 'size' if scheme == 'ftp' else 'head'
+            try:
+                result = self.fetch_attachment(url, verb)
+            except Exception as e:
+                self.prefetched_attachments[(verb, url)] = e
+                return
+            self.prefetched_attachments[(verb, url)] = result
+            size = result if verb == 'size' else result.headers.get('content-length')
+            try:
+                if size is None or int(size) in sizes:
+                    return
+            except ValueError:
+                return
+        if download and scheme in ('http', 'https') and self.download_attachments:
+            try:
+                self.prefetched_attachments[('get', url)] = self.fetch_attachment(url, 'get')
+            except Exception as e:
+                self.prefetched_attachments[('get', url)] = e
+
+    def queue_attachments(self, src, val):
+        """ Start downloading attachments in background, they are saved by flush_attachments() """
+        attachments_to_delete = list(Attachment.objects.attachments_for_object(self.obj))
+        futures = []
+        for attachment_data in self.filter_attachments(src, val):
+            url = self.base_url + attachment_data[0]
+            basename, ext = os.path.splitext(os.path.basename(url))
+            name = '%s%s' % (basename[:128], ext)
+            sizes = None
+            for attachment in attachments_to_delete:
+                if self.match_attachment(attachment, name):
+                    sizes = sizes or set()
+                    try:
+                        sizes.add(attachment.attachment_file.size)
+                    except FileNotFoundError:
+                        pass
+            futures.append(self.attachments_pool.submit(self.prefetch_attachment, url, sizes,
+                                                        url not in self.stored_urls))
+        self.attachments_queue.append({
+            'obj': self.obj,
+            'line': self.line,
+            'src': src,
+            'val': val,
+            'attachments_to_delete': attachments_to_delete,
+            'futures': futures,
+        })
+
+    def flush_attachments(self):
+        """
+        Save queued attachments once downloaded. Rows were counted as unmodified if nothing else
+        changed, they are counted as updated if their attachments did.
+        """
+        queue, self.attachments_queue = self.attachments_queue, []
+        wait([future for entry in queue for future in entry['futures']])
+        obj, line = getattr(self, 'obj', None), self.line
+        attachments, attachments_to_delete = [], []
+        for entry in queue:
+            self.obj, self.line = entry['obj'], entry['line']
+            try:
+                updated, new_attachments = self.generate_attachments(entry['src'], entry['val'],
+                                                                     entry['attachments_to_delete'], False)
+            except ValueImportError as warning:
+                if self.warn_on_missing_fields:
+                    self.add_warning(str(warning))
+                continue
+            attachments += new_attachments
+            attachments_to_delete += entry['attachments_to_delete']
+            if updated and entry.get('unmodified'):
+                self.nb_unmodified -= 1
+                self.nb_updated += 1
+        Attachment.objects.bulk_create(attachments)
+        schedule_thumbnails(attachments)
+        self.remove_attachments(attachments_to_delete)
+        self.prefetched_attachments = {}
+        self.obj, self.line = obj, line
 
     def filter_attachments(self, src, val):
         if not val:
@@ -695,17 +1096,12 @@ class AttachmentParserMixin:
     def has_size_changed(self, url, attachment):
         parsed_url = urlparse(url)
         if parsed_url.scheme == 'ftp':
-            directory = dirname(parsed_url.path)
-
-            ftp = FTP(parsed_url.hostname)
-            ftp.login(user=parsed_url.username, passwd=parsed_url.password)
-            ftp.cwd(directory)
-            size = ftp.size(parsed_url.path.split('/')[-1:][0])
+            size = self.request_attachment(url, verb='size')
             return size != attachment.attachment_file.size
 
         if parsed_url.scheme == 'http' or parsed_url.scheme == 'https':
             try:
-                response = self.request_or_retry(url, verb='head')
+                response = self.request_attachment(url, verb='head')
             except (requests.exceptions.ConnectionError, DownloadImportError) as e:
                 raise ValueImportError('Failed to load attachment: {exc}'.format(exc=e))
             size = response.headers.get('content-length')
@@ -727,7 +1123,7 @@ class AttachmentParserMixin:
         else:
             if self.download_attachments:
                 try:
-                    response = self.request_or_retry(url)
+                    response = self.request_attachment(url)
                 except (DownloadImportError, requests.exceptions.ConnectionError) as e:
                     raise ValueImportError('Failed to load attachment: {exc}'.format(exc=e))
                 if response.status_code != requests.codes.ok:
@@ -736,13 +1132,18 @@ class AttachmentParserMixin:
                 return response.content
             return None
 
+    def match_attachment(self, attachment, name):
+        """ Whether existing attachment was downloaded from a file with this name """
+        # Compare basenames, the file may be shared with an attachment of another object
+        upload_name, ext = os.path.splitext(os.path.basename(attachment_upload(attachment, name)))
+        existing_name = os.path.basename(attachment.attachment_file.name)
+        regexp = f"{upload_name}({random_suffix_regexp()})?(_[a-zA-Z0-9]{{7}})?{ext}"
+        return re.search(r"^{regexp}$".format(regexp=regexp), existing_name)
+
     def check_attachment_updated(self, attachments_to_delete, updated, **kwargs):
         found = False
         for attachment in attachments_to_delete:
-            upload_name, ext = os.path.splitext(attachment_upload(attachment, kwargs.get('name')))
-            existing_name = attachment.attachment_file.name
-            regexp = f"{upload_name}({random_suffix_regexp()})?(_[a-zA-Z0-9]{{7}})?{ext}"
-            if re.search(r"^{regexp}$".format(regexp=regexp), existing_name) and not self.has_size_changed(kwargs.get('url'), attachment):
+            if self.match_attachment(attachment, kwargs.get('name')) and not self.has_size_changed(kwargs.get('url'), attachment):
                 found = True
                 attachments_to_delete.remove(attachment)
                 if (
@@ -760,6 +1161,11 @@ class AttachmentParserMixin:
 
     def generate_content_attachment(self, attachment, parsed_url, url, updated, name):
         if (parsed_url.scheme in ('http', 'https') and self.download_attachments) or parsed_url.scheme == 'ftp':
+            if url in self.stored_urls:
+                # Already downloaded and checked for another object
+                attachment.attachment_file.name, attachment.file_hash = self.stored_urls[url]
+                attachment.is_image = attachment.is_an_image()
+                return True, updated
             content = self.download_attachment(url)
             if content is None:
                 return False, updated
@@ -805,12 +1211,23 @@ class AttachmentParserMixin:
             except ValueError:
                 # We want to catch : https://github.com/python-pillow/Pillow/blob/22ef8df59abf461824e4672bba8c47137730ef57/src/PIL/PngImagePlugin.py#L143
                 return False, updated
-            attachment.attachment_file.save(name, f, save=False)
+            self.store_attachment_file(attachment, name, f)
+            self.stored_urls[url] = (attachment.attachment_file.name, attachment.file_hash)
             attachment.is_image = attachment.is_an_image()
         else:
             attachment.attachment_link = url
         return True, updated
 
+    def store_attachment_file(self, attachment, name, f):
+        """ Store file, unless a file with the same content is already stored """
+        attachment.file_hash = file_hash(f)
+        stored_name = self.stored_hashes.get(attachment.file_hash) or Attachment.stored_file_name(attachment.file_hash)
+        if stored_name:
+            attachment.attachment_file.name = stored_name
+        else:
+            attachment.attachment_file.save(name, f, save=False)
+        self.stored_hashes[attachment.file_hash] = attachment.attachment_file.name
+
     def remove_attachments(self, attachments_to_delete):
         if self.delete_attachments:
             for att in attachments_to_delete:
@@ -850,13 +1267,17 @@ class AttachmentParserMixin:
         return updated, attachments
 
     def save_attachments(self, src, val):
+        if self.attachments_pool is not None:
+            self.queue_attachments(src, val)
+            return False
         updated = False
         attachments_to_delete = list(Attachment.objects.attachments_for_object(self.obj))
         updated, attachments = self.generate_attachments(src, val, attachments_to_delete, updated)
         Attachment.objects.bulk_create(attachments)
         # TODO : attachments from parsers should be resized
         #  See https://github.com/makinacorpus/django-paperclip/blob/master/paperclip/models.py#L124
-        # `bulk_create` does not call this `save` method
+        # `bulk_create` does not call this `save` method, nor send `post_save` which renders thumbnails
+        schedule_thumbnails(attachments)
         self.remove_attachments(attachments_to_delete)
         return updated
 
@@ -877,6 +1298,12 @@ class TourInSoftParser(AttachmentParserMixin, Parser):
             return int(self.root['odata.count'])
         return int(self.root['d']['__count'])
 
+    @property
+    def items_keys(self):
+        if self.version_tourinsoft == 3:
+            return ['value']
+        return ['d', 'results']
+
     def next_row(self):
         skip = 0
         while True:
@@ -886,11 +1313,20 @@ class TourInSoftParser(AttachmentParserMixin, Parser):
                 '$top': 1000,
                 '$skip': skip,
             }
-            response = self.request_or_retry(self.url, params=params)
-            self.root = response.json()
-            self.nb = self.get_nb()
-            for row in self.items:
+            response = self.request_or_retry(self.url, params=params, stream=self.streaming)
+            if self.streaming:
+                self.root = {}
+                rows = stream_json_items(response.iter_content(chunk_size=self.stream_chunk_size), self.items_keys, self.root)
+            else:
+                self.root = response.json()
+            try:
+                self.nb = self.get_nb()
+            except KeyError:
+                # A streamed page may give count after its items
+                self.nb = skip + 1000
+            for row in rows if self.streaming else self.items:
                 yield {self.normalize_field_name(src): val for src, val in row.items()}
+            self.nb = self.get_nb()
             skip += 1000
             if skip >= self.nb:
                 return
@@ -1061,6 +1497,7 @@ class LEIParser(AttachmentParserMixin, XmlParser):
     }
     """
     results_path = 'Resultat/sit_liste'
+    keep_in_root = ['NOMENCLATURE']
     eid = 'eid'
 
     def get_part(self, dst, src, val):
@@ -1257,7 +1694,8 @@ class GeotrekAggregatorParser:
                 else:
                     Parser = parser(progress_cb=self.progress_cb, provider=key, url=datas['url'],
                                     portals_filter=datas.get('portals'), mapping=datas.get('mapping'),
-                                    create_categories=datas.get('create'), all_datas=datas.get('all_datas'))
+                                    create_categories=datas.get('create'), all_datas=datas.get('all_datas'),
+                                    prefetch_pages=datas.get('prefetch_pages'))
                     parsers_to_parse.append(Parser)
 
             self.run_method_parser(key, parsers_to_parse, 'start_meta')
@@ -1281,6 +1719,8 @@ class GeotrekParser(AttachmentParserMixin, Parser):
         Can be use when you want to change a value from the api/v2
     create_categories: Create all categories during importation
     all_datas: Import all datas and do not use updated_after filter
+    extra_api_fields: Fields of api v2 used by the parser besides mapped ones, only mapped fields are requested
+    prefetch_pages: Number of api v2 pages fetched in background while the current one is imported (default: 0)
     """
     model = None
     next_url = ''
@@ -1306,9 +1746,13 @@ class GeotrekParser(AttachmentParserMixin, Parser):
     create_categories = False
     all_datas = False
     provider = None
+    extra_api_fields = []
+    prefetch_pages = 0
 
-    def __init__(self, all_datas=None, create_categories=None, provider=None, mapping=None, portals_filter=None, url=None, *args, **kwargs):
+    def __init__(self, all_datas=None, create_categories=None, provider=None, mapping=None, portals_filter=None, url=None,
+                 prefetch_pages=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.prefetch_pages = prefetch_pages if prefetch_pages else self.prefetch_pages
         self.bbox = Polygon.from_bbox(settings.SPATIAL_EXTENT)
         self.bbox.srid = settings.SRID
         self.bbox.transform(4326)  # WGS84
@@ -1463,20 +1907,12 @@ class GeotrekParser(AttachmentParserMixin, Parser):
         params = {
             'in_bbox': ','.join([str(coord) for coord in self.bbox.extent]),
             'portals': ','.join(portals) if portals else '',
-            'updated_after': updated_after
+            'updated_after': updated_after,
+            'fields': self.get_api_fields(),
         }
         self.params_used = params
-        response = self.request_or_retry(self.next_url, params=params)
-        self.root = response.json()
-        self.nb = int(self.root['count'])
-
-        for row in self.items:
-            yield row
-        self.next_url = self.root['next']
-
-        while self.next_url:
-            response = self.request_or_retry(self.next_url)
-            self.root = response.json()
+        for page in self.read_ahead(self.fetch_pages(self.next_url, params)):
+            self.root = page
             self.nb = int(self.root['count'])
 
             for row in self.items:
@@ -1484,6 +1920,68 @@ class GeotrekParser(AttachmentParserMixin, Parser):
 
             self.next_url = self.root['next']
 
+    def get_api_fields(self):
+        """Names of api v2 fields read by this parser, for the ``fields`` parameter"""
+        names = set(self.extra_api_fields)
+        for src in list(self.fields.values()) + list(self.m2m_fields.values()) + list(self.non_fields.values()):
+            for subsrc in [src] if isinstance(src, str) else src:
+                names.add(subsrc.split('.', 1)[0])
+        return ','.join(sorted(names))
+
+    def fetch_pages(self, url, params):
+        """Yield pages of api v2 results, until "next" is empty"""
+        while url:
+            response = self.request_or_retry(url, params=params)
+            page = response.json()
+            yield page
+            # Next url contains parameters
+            url, params = page['next'], None
+
+    def read_ahead(self, pages):
+        """
+        Iterate over pages, fetching up to ``prefetch_pages`` next ones in a background thread,
+        so that network and database work overlap.
+        """
+        if not self.prefetch_pages:
+            yield from pages
+            return
+        buffer = queue.Queue(maxsize=self.prefetch_pages)
+        stop = threading.Event()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    buffer.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce():
+            try:
+                for page in pages:
+                    if not put((page, None)):
+                        return
+            except Exception as e:
+                put((None, e))
+            else:
+                put((None, None))
+
+        thread = threading.Thread(target=produce, daemon=True)
+        thread.start()
+        try:
+            while True:
+                page, error = buffer.get()
+                if error is not None:
+                    raise error
+                if page is None:
+                    return
+                yield page
+        finally:
+            # Also stops fetching when import fails or is interrupted
+            stop.set()
+            thread.join()
+
     def get_sources_extra_fields(self):
         response = self.request_or_retry(f"{self.url}/api/v2/source/")
         create = self.field_options['source'].get("create", False)
@@ -1544,10 +2042,15 @@ class ApidaeBaseParser(Parser):
             }
             if self.locales:
                 params['locales'] = self.locales
-            response = self.request_or_retry(self.url, params={'query': json.dumps(params)})
-            self.root = response.json()
+            response = self.request_or_retry(self.url, params={'query': json.dumps(params)}, stream=self.streaming)
+            if self.streaming:
+                self.root = {}
+                rows = stream_json_items(response.iter_content(chunk_size=self.stream_chunk_size),
+                                         ['objetsTouristiques'], self.root)
+            else:
+                self.root = response.json()
             self.nb = int(self.root['numFound'])
-            for row in self.items:
+            for row in rows if self.streaming else self.items:
                 yield row
             self.skip += self.size
             if self.skip >= self.nb:
@@ -1,13 +1,16 @@
+from django.apps import apps
 from django.contrib.admin.models import DELETION, LogEntry
 from django.contrib.contenttypes.models import ContentType
-from django.db.models.signals import post_delete, post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 from django.utils.timezone import now
 
 from mapentity.middleware import get_internal_user
 
 from geotrek.common.models import (AccessibilityAttachment, Attachment,
-                                   HDViewPoint)
+                                   AttachmentThumbnail, HDViewPoint)
+from geotrek.common.thumbnails import schedule_thumbnails
+from geotrek.common.utils.cache import bump_model_version, bump_object_version
 
 
 def log_cascade_deletion(sender, instance, related_model, cascading_field):
@@ -38,3 +41,53 @@ def update_content_object_date_update(sender, instance, *args, **kwargs):
     if content_object and hasattr(content_object, 'date_update'):
         content_object.date_update = now()
         content_object.save(update_fields=['date_update'])
+
+
+@receiver(post_save, sender=Attachment)
+def pregenerate_attachment_thumbnails(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    """ after each creation / change of file or copyright, render thumbnails in background instead of during requests """
+    if raw:
+        return
+    if update_fields is not None and not update_fields.intersection(instance.thumbnail_fields):
+        return
+    source = instance.get_thumbnail_source()
+    if not created and source is not None and source == getattr(instance, '_thumbnail_source', None):
+        return
+    instance._thumbnail_source = source
+    # Serve thumbnails on the fly until rendered again
+    AttachmentThumbnail.objects.filter(attachment=instance).delete()
+    schedule_thumbnails([instance])
+
+
+def bump_model_version_on_change(sender, instance, raw=False, **kwargs):
+    """ after each creation / edition / deletion, bump model and object versions to invalidate API cache """
+    if not raw:
+        bump_model_version(sender)
+        bump_object_version(sender, instance.pk)
+
+
+def bump_model_version_on_relation_change(sender, instance, action, model, pk_set=None, **kwargs):
+    """ after each change of a many-to-many relation, bump version of both sides """
+    if action.startswith('post_'):
+        bump_model_version(type(instance))
+        bump_object_version(type(instance), instance.pk)
+        bump_model_version(model)
+        for pk in pk_set or ():
+            bump_object_version(model, pk)
+
+
+def connect_version_receivers(models):
+    """
+    Bump versions of ``models`` and of their children when they change. Other models
+    are not versioned, so that saving them does not cost cache round-trips.
+    """
+    models = set(models)
+    for model in apps.get_models():
+        if models.isdisjoint([model] + model._meta.get_parent_list()):
+            continue
+        post_save.connect(bump_model_version_on_change, sender=model)
+        post_delete.connect(bump_model_version_on_change, sender=model)
+        for field in model._meta.get_fields():
+            if field.many_to_many:
+                through = field.remote_field.through if field.concrete else field.through
+                m2m_changed.connect(bump_model_version_on_relation_change, sender=through)
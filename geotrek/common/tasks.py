@@ -123,3 +123,11 @@ def import_datas_from_web(**kwargs):
         'report': parser.report(output_format='html').replace('$celery_id', current_task.request.id),
         'name': current_task.name
     }
+
+
+@shared_task(name='geotrek.common.generate-thumbnails')
+def generate_thumbnails_task(pks):
+    from geotrek.common.models import Attachment
+    from geotrek.common.thumbnails import generate_attachments_thumbnails
+
+    return generate_attachments_thumbnails(Attachment.objects.filter(pk__in=pks))
@@ -12,6 +12,8 @@ $$ LANGUAGE plpgsql;
 CREATE FUNCTION {{ schema_geotrek }}.ft_date_update() RETURNS trigger SECURITY DEFINER AS $$
 BEGIN
     NEW.date_update := statement_timestamp();
+    -- Let Django processes know the object changed (delivered on commit), to invalidate its cache
+    PERFORM pg_notify('geotrek_object_update', TG_TABLE_NAME || ':' || NEW.id);
     RETURN NEW;
 END;
 $$ LANGUAGE plpgsql;
@@ -0,0 +1,116 @@
+-------------------------------------------------------------------------------
+-- Materialized pairs of objects closer than PROXIMITY_MARGIN
+-------------------------------------------------------------------------------
+
+CREATE FUNCTION {{ schema_geotrek }}.proximity_indexed() RETURNS TABLE (object_type text, object_table text, object_filter text) AS $$
+    -- Tables of optional applications may be missing
+    SELECT t.* FROM (VALUES ('trekking.trek', 'core_topology', 'o.kind = ''TREK'''),
+                            ('tourism.touristiccontent', 'tourism_touristiccontent', 'TRUE'),
+                            ('tourism.touristicevent', 'tourism_touristicevent', 'TRUE'),
+                            ('outdoor.site', 'outdoor_site', 'TRUE'),
+                            ('outdoor.course', 'outdoor_course', 'TRUE')) AS t
+    WHERE to_regclass(t.column2) IS NOT NULL;
+$$ LANGUAGE sql STABLE;
+
+
+CREATE FUNCTION {{ schema_geotrek }}.proximity_update(obj_type text, obj_id integer, obj_geom geometry) RETURNS void AS $$
+DECLARE
+    indexed record;
+BEGIN
+    DELETE FROM common_proximity WHERE source_type = obj_type AND source_id = obj_id;
+    DELETE FROM common_proximity WHERE target_type = obj_type AND target_id = obj_id;
+    IF obj_geom IS NULL OR ST_IsEmpty(obj_geom) THEN
+        RETURN;
+    END IF;
+    FOR indexed IN SELECT * FROM proximity_indexed() LOOP
+        -- Store each neighbour in both directions
+        EXECUTE format('INSERT INTO common_proximity (source_type, source_id, target_type, target_id, distance)
+                        SELECT p.* FROM (
+                            SELECT o.id, ST_Distance(o.geom, $1) AS distance FROM %I o
+                            WHERE %s AND ST_DWithin(o.geom, $1, {{ PROXIMITY_MARGIN }})
+                                  AND NOT (o.id = $3 AND %L = $2)
+                        ) n
+                        CROSS JOIN LATERAL (VALUES ($2, $3, %L, n.id, n.distance),
+                                                   (%L, n.id, $2, $3, n.distance)) AS p',
+                       indexed.object_table, indexed.object_filter, indexed.object_type,
+                       indexed.object_type, indexed.object_type) USING obj_geom, obj_type, obj_id;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE FUNCTION {{ schema_geotrek }}.proximity_refresh() RETURNS void AS $$
+DECLARE
+    source record;
+    target record;
+BEGIN
+    -- Recompute pairs of every object
+    TRUNCATE common_proximity;
+    FOR source IN SELECT * FROM proximity_indexed() LOOP
+        FOR target IN SELECT * FROM proximity_indexed() LOOP
+            EXECUTE format('INSERT INTO common_proximity (source_type, source_id, target_type, target_id, distance)
+                            SELECT %L, s.id, %L, t.id, ST_Distance(s.geom, t.geom)
+                            FROM (SELECT o.id, o.geom FROM %I o WHERE %s) s
+                            JOIN (SELECT o.id, o.geom FROM %I o WHERE %s) t
+                            ON ST_DWithin(s.geom, t.geom, {{ PROXIMITY_MARGIN }})
+                            WHERE NOT (s.id = t.id AND %L = %L)',
+                           source.object_type, target.object_type,
+                           source.object_table, source.object_filter, target.object_table, target.object_filter,
+                           source.object_type, target.object_type);
+        END LOOP;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-------------------------------------------------------------------------------
+-- Keep pairs up-to-date when objects change
+-------------------------------------------------------------------------------
+
+CREATE FUNCTION {{ schema_geotrek }}.proximity_iud() RETURNS trigger SECURITY DEFINER AS $$
+BEGIN
+    -- Trigger argument: type of objects of the table
+    IF TG_OP = 'DELETE' THEN
+        PERFORM proximity_update(TG_ARGV[0], OLD.id, NULL);
+    ELSE
+        PERFORM proximity_update(TG_ARGV[0], NEW.id, NEW.geom);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+DO $$
+DECLARE
+    indexed record;
+BEGIN
+    FOR indexed IN SELECT * FROM proximity_indexed() LOOP
+        EXECUTE format('CREATE TRIGGER %I AFTER INSERT ON %I
+                        FOR EACH ROW WHEN (%s) EXECUTE PROCEDURE proximity_iud(%L)',
+                       indexed.object_table || '_proximity_i_tgr', indexed.object_table,
+                       replace(indexed.object_filter, 'o.', 'NEW.'), indexed.object_type);
+        EXECUTE format('CREATE TRIGGER %I AFTER UPDATE OF geom ON %I
+                        FOR EACH ROW WHEN (%s AND OLD.geom IS DISTINCT FROM NEW.geom) EXECUTE PROCEDURE proximity_iud(%L)',
+                       indexed.object_table || '_proximity_u_tgr', indexed.object_table,
+                       replace(indexed.object_filter, 'o.', 'NEW.'), indexed.object_type);
+        EXECUTE format('CREATE TRIGGER %I AFTER DELETE ON %I
+                        FOR EACH ROW WHEN (%s) EXECUTE PROCEDURE proximity_iud(%L)',
+                       indexed.object_table || '_proximity_d_tgr', indexed.object_table,
+                       replace(indexed.object_filter, 'o.', 'OLD.'), indexed.object_type);
+    END LOOP;
+END;
+$$;
+
+
+-------------------------------------------------------------------------------
+-- Compute pairs of existing objects on first install or when margin changed
+-------------------------------------------------------------------------------
+
+DO $$
+BEGIN
+    IF obj_description('common_proximity'::regclass, 'pg_class') IS DISTINCT FROM 'margin {{ PROXIMITY_MARGIN }}' THEN
+        PERFORM proximity_refresh();
+        COMMENT ON TABLE common_proximity IS 'margin {{ PROXIMITY_MARGIN }}';
+    END IF;
+END;
+$$;
@@ -4,3 +4,8 @@ DROP FUNCTION IF EXISTS ft_date_insert() CASCADE;
 DROP FUNCTION IF EXISTS ft_date_update() CASCADE;
 DROP FUNCTION IF EXISTS ft_uuid_insert() CASCADE;
 DROP FUNCTION IF EXISTS flatten_geometrycollection_iu() CASCADE;
+
+DROP FUNCTION IF EXISTS proximity_indexed() CASCADE;
+DROP FUNCTION IF EXISTS proximity_update(text, integer, geometry) CASCADE;
+DROP FUNCTION IF EXISTS proximity_refresh() CASCADE;
+DROP FUNCTION IF EXISTS proximity_iud() CASCADE;
@@ -1,22 +1,29 @@
+import hashlib
 import os
-from io import BytesIO
+from io import BytesIO, StringIO
 from unittest import mock
 
+from django.conf import settings
 from django.contrib.auth.models import Permission
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.management import call_command
-from django.test import RequestFactory, TestCase
+from django.test import RequestFactory, TestCase, TransactionTestCase
 from django.test.utils import override_settings
 from django.urls import reverse
+from easy_thumbnails.alias import aliases
+from easy_thumbnails.files import get_thumbnailer
 from mapentity.tests.factories import SuperUserFactory, UserFactory
 from paperclip.models import random_suffix_regexp
 from PIL import Image
 
 from geotrek.authent.tests.factories import StructureFactory
-from geotrek.common.models import AccessibilityAttachment
+from geotrek.common.models import AccessibilityAttachment, Attachment, AttachmentThumbnail
+from geotrek.common.tasks import generate_thumbnails_task
 from geotrek.common.tests.factories import (AttachmentAccessibilityFactory,
-                                            AttachmentFactory)
-from geotrek.common.utils.testdata import get_dummy_uploaded_image
+                                            AttachmentFactory,
+                                            AttachmentImageFactory)
+from geotrek.common.thumbnails import generate_attachments_thumbnails, manifest_thumbnail
+from geotrek.common.utils.testdata import get_dummy_img, get_dummy_uploaded_image
 from geotrek.trekking.tests.factories import PracticeFactory, TrekFactory
 from geotrek.trekking.views import TrekDetail
 
@@ -582,3 +589,128 @@ class ReduceSaveSettingsTestCase(TestCase):
         )
         self.assertEqual(response.status_code, 302)
         self.assertEqual(AccessibilityAttachment.objects.count(), 1)
+
+
+class AttachmentFileHashTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.object = TrekFactory.create()
+
+    def setUp(self):
+        self.attachment = AttachmentFactory.create(content_object=self.object,
+                                                   attachment_file=get_dummy_uploaded_image())
+
+    def test_hash_computed_on_upload(self):
+        self.assertEqual(self.attachment.file_hash, hashlib.sha256(get_dummy_img()).hexdigest())
+        self.assertEqual(Attachment.stored_file_name(self.attachment.file_hash), self.attachment.attachment_file.name)
+
+    @mock.patch('paperclip.models.PAPERCLIP_RESIZE_ATTACHMENTS_ON_UPLOAD', True)
+    def test_hash_of_resized_file(self):
+        attachment = AttachmentFactory.create(content_object=self.object, attachment_file=get_dummy_uploaded_image())
+        with attachment.attachment_file.open('rb') as f:
+            content = f.read()
+        self.assertNotEqual(content, get_dummy_img())
+        attachment.refresh_from_db()
+        self.assertEqual(attachment.file_hash, hashlib.sha256(content).hexdigest())
+
+    def test_hash_kept_if_file_unchanged(self):
+        Attachment.objects.filter(pk=self.attachment.pk).update(file_hash='0' * 64)
+        self.attachment.refresh_from_db()
+        self.attachment.title = "A title"
+        self.attachment.save()
+        self.assertEqual(self.attachment.file_hash, '0' * 64)
+
+    def test_stored_file_missing(self):
+        os.remove(self.attachment.attachment_file.path)
+        self.assertIsNone(Attachment.stored_file_name(self.attachment.file_hash))
+
+
+class AttachmentThumbnailTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.object = TrekFactory.create()
+
+    def setUp(self):
+        self.attachment = AttachmentImageFactory.create(content_object=self.object, author="Author", legend="Legend")
+
+    @mock.patch('geotrek.common.tasks.generate_thumbnails_task.delay')
+    def test_thumbnails_scheduled_on_save(self, mocked):
+        self.attachment.legend = "New legend"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.attachment.save()
+        mocked.assert_called_once_with([self.attachment.pk])
+
+    @mock.patch('geotrek.common.tasks.generate_thumbnails_task.delay')
+    def test_thumbnails_not_scheduled_if_unchanged(self, mocked):
+        attachment = Attachment.objects.get(pk=self.attachment.pk)
+        attachment.starred = True
+        with self.captureOnCommitCallbacks(execute=True):
+            attachment.save()
+            attachment.save(update_fields=['starred'])
+        mocked.assert_not_called()
+
+    @mock.patch('geotrek.common.tasks.generate_thumbnails_task.delay')
+    def test_thumbnails_not_scheduled_for_files(self, mocked):
+        with self.captureOnCommitCallbacks(execute=True):
+            AttachmentFactory.create(content_object=self.object)
+        mocked.assert_not_called()
+
+    def test_thumbnails_in_manifest(self):
+        self.assertEqual(generate_thumbnails_task([self.attachment.pk]), 1)
+        self.assertEqual(sorted(self.attachment.thumbnails.values_list('alias', flat=True)),
+                         sorted(settings.THUMBNAIL_PREGENERATED_ALIASES))
+        expected = get_thumbnailer(self.attachment.attachment_file).get_thumbnail(aliases.get('apiv2'))
+        thumbnail = manifest_thumbnail(self.attachment, 'apiv2')
+        self.assertEqual(thumbnail.name, expected.name)
+        self.assertEqual(thumbnail.url, expected.url)
+
+    def test_manifest_read_without_files(self):
+        generate_thumbnails_task([self.attachment.pk])
+        os.remove(self.attachment.attachment_file.path)
+        thumbnail = self.object.get_thumbnail('print')
+        self.assertEqual(thumbnail.name, self.attachment.thumbnails.get(alias='print').name)
+        self.assertEqual(thumbnail.author, "Author")
+        self.assertEqual(len(self.object.resized_pictures), 1)
+
+    def test_manifest_cleared_on_save(self):
+        generate_thumbnails_task([self.attachment.pk])
+        self.attachment.author = "New author"
+        self.attachment.save()
+        self.assertFalse(self.attachment.thumbnails.exists())
+
+    def test_manifest_kept_on_save_without_changes(self):
+        generate_thumbnails_task([self.attachment.pk])
+        self.attachment.title = self.attachment.title
+        self.attachment.save()
+        self.assertTrue(self.attachment.thumbnails.exists())
+
+    def test_missing_file_not_in_manifest(self):
+        os.remove(self.attachment.attachment_file.path)
+        self.assertEqual(generate_thumbnails_task([self.attachment.pk]), 0)
+        self.assertFalse(self.attachment.thumbnails.exists())
+
+    def test_api_reads_manifest(self):
+        AttachmentThumbnail.objects.create(attachment=self.attachment, alias='apiv2', name='paperclip/manifest.jpg')
+        response = self.client.get(reverse('apiv2:trek-detail', args=(self.object.pk,)))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['attachments'][0]['thumbnail'].endswith(settings.MEDIA_URL + 'paperclip/manifest.jpg'))
+
+    def test_generate_thumbnails_command(self):
+        output = StringIO()
+        call_command('generate_thumbnails', stdout=output)
+        self.assertIn('Generated: 1 / Invalid: 0', output.getvalue())
+        output = StringIO()
+        call_command('generate_thumbnails', stdout=output)
+        self.assertIn('Generated: 0 / Invalid: 0', output.getvalue())
+
+
+class AttachmentThumbnailWorkersTestCase(TransactionTestCase):
+    """ Rendering threads use their own database connection, they do not see data of a transaction """
+
+    @override_settings(THUMBNAIL_WORKERS=2)
+    @mock.patch('geotrek.common.tasks.generate_thumbnails_task.delay')
+    def test_thumbnails_rendered_by_workers(self, mocked):
+        trek = TrekFactory.create()
+        attachments = AttachmentImageFactory.create_batch(3, content_object=trek)
+        self.assertEqual(generate_attachments_thumbnails(attachments), 3)
+        self.assertEqual(AttachmentThumbnail.objects.count(), 3 * len(settings.THUMBNAIL_PREGENERATED_ALIASES))
@@ -11,7 +11,7 @@ from easy_thumbnails.models import Thumbnail
 
 from geotrek import __version__
 from geotrek.authent.tests.factories import StructureFactory
-from geotrek.common.models import TargetPortal
+from geotrek.common.models import Attachment, TargetPortal
 from geotrek.common.tests.factories import AttachmentFactory, TargetPortalFactory
 from geotrek.common.utils.testdata import get_dummy_uploaded_image
 from geotrek.core.models import Usage, Path
@@ -140,6 +140,18 @@ class CommandAttachmentsTests(TestCase):
         self.assertFalse(os.path.exists("{name}.120x120_q85_crop.png".format(name=self.picture.attachment_file.path)))
         self.assertEqual(Thumbnail.objects.count(), 0)
 
+    def test_deduplicate_attachments(self):
+        duplicate = AttachmentFactory(content_object=self.content, attachment_file=get_dummy_uploaded_image())
+        self.assertNotEqual(duplicate.attachment_file.name, self.picture.attachment_file.name)
+        Attachment.objects.update(file_hash='')
+        output = StringIO()
+        call_command('deduplicate_attachments', stdout=output)
+        self.assertIn('Hashed: 2 / Deduplicated: 1', output.getvalue())
+        duplicate.refresh_from_db()
+        self.picture.refresh_from_db()
+        self.assertEqual(duplicate.attachment_file.name, self.picture.attachment_file.name)
+        self.assertEqual(duplicate.file_hash, self.picture.file_hash)
+
     def test_clean_attachments_deleted(self):
         output = StringIO()
         self.picture.delete()
@@ -1,12 +1,15 @@
 import os
 
+from django.conf import settings
 from django.core.files import File
 from django.test import TestCase
 
 from geotrek.authent.models import default_structure
 from geotrek.authent.tests.factories import StructureFactory, UserProfileFactory, UserFactory
-from geotrek.common.models import Theme
+from geotrek.common.models import Proximity, Theme
 from geotrek.common.tests.factories import (HDViewPointFactory, LabelFactory, OrganismFactory)
+from geotrek.tourism.models import TouristicEvent
+from geotrek.tourism.tests.factories import TouristicContentFactory, TouristicEventFactory
 from geotrek.trekking.tests.factories import TrekFactory
 
 
@@ -77,3 +80,34 @@ class HDViewPointTestCase(TestCase):
     def test_properties(self):
         self.assertEqual(str(self.vp), 'Panorama')
         self.assertIn('admin/', self.vp.get_list_url())
+
+
+class ProximityTest(TestCase):
+    def pairs(self, obj):
+        return set(Proximity.objects.filter(source_type=obj._meta.label_lower, source_id=obj.pk)
+                   .values_list('target_type', 'target_id', 'distance'))
+
+    def test_pairs_follow_objects(self):
+        content = TouristicContentFactory(geom='SRID=%s;POINT(0 0)' % settings.SRID)
+        event = TouristicEventFactory(geom='SRID=%s;POINT(300 400)' % settings.SRID)
+        far_event = TouristicEventFactory(geom='SRID=%s;POINT(3000 4000)' % settings.SRID)
+        self.assertEqual(self.pairs(content), {('tourism.touristicevent', event.pk, 500)})
+        self.assertEqual(self.pairs(event), {('tourism.touristiccontent', content.pk, 500)})
+        self.assertEqual(self.pairs(far_event), set())
+        far_event.geom = 'SRID=%s;POINT(0 100)' % settings.SRID
+        far_event.save()
+        self.assertEqual(self.pairs(content), {('tourism.touristicevent', event.pk, 500),
+                                               ('tourism.touristicevent', far_event.pk, 100)})
+        content.delete(force=True)
+        self.assertEqual(self.pairs(event), set())
+
+    def test_near(self):
+        content = TouristicContentFactory(geom='SRID=%s;POINT(0 0)' % settings.SRID)
+        event = TouristicEventFactory(geom='SRID=%s;POINT(300 400)' % settings.SRID)
+        TouristicEventFactory(geom='SRID=%s;POINT(0 600)' % settings.SRID)
+        near = Proximity.near(TouristicEvent, content, 500)
+        self.assertQuerySetEqual(TouristicEvent.objects.filter(pk__in=near), [event])
+        near = Proximity.near(TouristicEvent, content, 100)
+        self.assertFalse(TouristicEvent.objects.filter(pk__in=near).exists())
+        # Beyond indexed margin, neighbours are searched on the fly
+        self.assertIsNone(Proximity.near(TouristicEvent, content, 1000))
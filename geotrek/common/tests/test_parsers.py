@@ -15,6 +15,7 @@ from django.test import TestCase
 from django.test.utils import override_settings
 from requests import Response
 
+from geotrek.authent.models import Structure
 from geotrek.authent.tests.factories import StructureFactory
 from geotrek.common.models import Attachment, FileType, Organism, RecordSource, Theme
 from geotrek.common.parsers import (AttachmentParserMixin, DownloadImportError,
@@ -22,8 +23,9 @@ from geotrek.common.parsers import (AttachmentParserMixin, DownloadImportError,
                                     GeotrekParser, OpenSystemParser,
                                     TourInSoftParser, TourismSystemParser,
                                     ValueImportError, XmlParser)
-from geotrek.common.tests.factories import ThemeFactory
+from geotrek.common.tests.factories import OrganismFactory, ThemeFactory
 from geotrek.common.tests.mixins import GeotrekParserTestMixin
+from geotrek.common.utils.cache import get_model_versions
 from geotrek.common.utils.testdata import SVG_FILE, get_dummy_img
 from geotrek.trekking.models import POI, Trek
 from geotrek.trekking.parsers import GeotrekTrekParser
@@ -41,6 +43,10 @@ class OrganismEidParser(ExcelParser):
     eid = 'organism'
 
 
+class OrganismEidBatchParser(OrganismEidParser):
+    batch_size = 2
+
+
 class StructureExcelParser(ExcelParser):
     model = Organism
     fields = {
@@ -76,6 +82,10 @@ class AttachmentParser(AttachmentParserMixin, OrganismEidParser):
     non_fields = {'attachments': 'photo'}
 
 
+class NoEidAttachmentParser(AttachmentParserMixin, OrganismParser):
+    non_fields = {'attachments': 'photo'}
+
+
 class WarnAttachmentParser(AttachmentParser):
     warn_on_missing_fields = True
 
@@ -186,6 +196,100 @@ class ParserTests(TestCase):
         self.assertIn("Bad value 'Structure' for field STRUCTURE. Should contain ['foo']", output.getvalue())
 
 
+class BatchParserTests(TestCase):
+    def test_create(self):
+        filename = os.path.join(os.path.dirname(__file__), 'data', 'organism.xls')
+        parser = OrganismEidBatchParser()
+        parser.parse(filename)
+        self.assertEqual(parser.nb_created, 1)
+        organism = Organism.objects.get()
+        self.assertEqual(organism.organism, "2.0")
+
+    def test_unmodified_with_eid(self):
+        filename = os.path.join(os.path.dirname(__file__), 'data', 'organism.xls')
+        OrganismEidBatchParser().parse(filename)
+        parser = OrganismEidBatchParser()
+        parser.parse(filename)
+        self.assertEqual(Organism.objects.count(), 1)
+        self.assertEqual(parser.nb_created, 0)
+        self.assertEqual(parser.nb_unmodified, 1)
+
+    def test_updated_with_eid(self):
+        filename = os.path.join(os.path.dirname(__file__), 'data', 'organism.xls')
+        filename2 = os.path.join(os.path.dirname(__file__), 'data', 'organism2.xls')
+        OrganismEidBatchParser().parse(filename)
+        OrganismEidBatchParser().parse(filename2)
+        self.assertEqual(Organism.objects.count(), 2)
+        organisms = Organism.objects.order_by('pk')
+        self.assertEqual(organisms[0].organism, "2.0")
+        self.assertEqual(organisms[1].organism, "Comité Hippolyte")
+
+    def test_model_version_bumped_after_bulk_create(self):
+        version = get_model_versions([Organism])['common.organism']
+        filename = os.path.join(os.path.dirname(__file__), 'data', 'organism.xls')
+        OrganismEidBatchParser().parse(filename)
+        self.assertGreater(get_model_versions([Organism])['common.organism'], version)
+
+    @mock.patch('geotrek.common.parsers.bump_object_version')
+    def test_object_versions_bumped_after_bulk_update(self, bump_object_version):
+        organism = OrganismFactory.create()
+        organism.organism = "Renamed"
+        parser = OrganismEidBatchParser()
+        parser.bulk_objects = {id(organism): (organism, False, {'organism'})}
+        parser.bulk_rows = []
+        parser.bulk_save()
+        bump_object_version.assert_called_once_with(Organism, organism.pk)
+
+    def test_date_update_set_by_bulk_update(self):
+        organism = OrganismFactory.create()
+        date_update = organism.date_update
+        organism.organism = "Renamed"
+        parser = OrganismEidBatchParser()
+        parser.bulk_objects = {id(organism): (organism, False, {'organism'})}
+        parser.bulk_rows = []
+        parser.bulk_save()
+        organism.refresh_from_db()
+        self.assertEqual(organism.organism, "Renamed")
+        self.assertGreater(organism.date_update, date_update)
+
+    def test_rows_saved_one_by_one_after_bulk_failure(self):
+        valid, invalid = Organism(organism="Valid"), Organism(organism="x" * 200)
+        parser = OrganismEidBatchParser()
+        parser.nb_success = 2
+        parser.bulk_objects = {id(valid): (valid, True, set()), id(invalid): (invalid, True, set())}
+        parser.bulk_rows = [(1, valid.organism, {}, valid, "created", []),
+                            (2, invalid.organism, {}, invalid, "created", [])]
+        parser.bulk_save()
+        self.assertQuerySetEqual(Organism.objects.values_list('organism', flat=True), ["Valid"])
+        self.assertEqual(parser.nb_success, 1)
+        self.assertEqual(parser.nb_created, 1)
+        self.assertEqual(list(parser.warnings), ["Line 2"])
+
+    def test_bulk_save_only_without_custom_save(self):
+        class TrekBatchParser(OrganismEidBatchParser):
+            model = Trek
+
+        self.assertTrue(OrganismEidBatchParser().can_bulk_save())
+        self.assertFalse(TrekBatchParser().can_bulk_save())
+
+    def test_related_lookups_are_cached(self):
+        structure = StructureFactory.create(name="foo")
+        parser = OrganismEidBatchParser()
+        parser.lookup_cache = {}
+        with self.assertNumQueries(2):
+            self.assertEqual(parser.get_related(Structure, {'name': 'foo'}), (structure, False))
+            self.assertEqual(parser.get_related(Structure, {'name': 'foo'}), (structure, False))
+            self.assertEqual(parser.get_related(Structure, {'name': 'bar'}), (None, False))
+            self.assertEqual(parser.get_related(Structure, {'name': 'bar'}), (None, False))
+
+    def test_related_lookups_are_not_cached_without_batch(self):
+        StructureFactory.create(name="foo")
+        parser = OrganismEidParser()
+        with self.assertNumQueries(2):
+            parser.get_related(Structure, {'name': 'foo'})
+            parser.get_related(Structure, {'name': 'foo'})
+
+
 class ThemeParser(ExcelParser):
     """Parser used in MultilangParserTests, using Theme because it has a translated field"""
     model = Theme
@@ -463,6 +567,84 @@ class AttachmentParserTests(TestCase):
         self.assertEqual(mocked_head.call_count, 3)
         self.assertEqual(Attachment.objects.count(), 1)
 
+    @mock.patch('requests.get')
+    def test_attachment_file_stored_once(self, mocked_get):
+        mocked_get.return_value.status_code = 200
+        mocked_get.return_value.content = get_dummy_img()
+        filename = os.path.join(os.path.dirname(__file__), 'data', 'organism.xls')
+        call_command('import', 'geotrek.common.tests.test_parsers.NoEidAttachmentParser', filename, verbosity=0)
+        call_command('import', 'geotrek.common.tests.test_parsers.NoEidAttachmentParser', filename, verbosity=0)
+        self.assertEqual(Organism.objects.count(), 2)
+        first, second = Attachment.objects.order_by('pk')
+        self.assertNotEqual(first.object_id, second.object_id)
+        self.assertEqual(second.attachment_file.name, first.attachment_file.name)
+        self.assertEqual(second.file_hash, first.file_hash)
+        self.assertTrue(second.is_image)
+
+    @mock.patch('requests.get')
+    @mock.patch('requests.head')
+    def test_attachment_shared_file_not_downloaded_again(self, mocked_head, mocked_get):
+        mocked_get.return_value.status_code = 200
+        mocked_get.return_value.content = get_dummy_img()
+        mocked_head.return_value.status_code = 200
+        mocked_head.return_value.headers = {'content-length': len(get_dummy_img())}
+        filename = os.path.join(os.path.dirname(__file__), 'data', 'organism.xls')
+        call_command('import', 'geotrek.common.tests.test_parsers.NoEidAttachmentParser', filename, verbosity=0)
+        Organism.objects.update(organism="Other")
+        call_command('import', 'geotrek.common.tests.test_parsers.AttachmentParser', filename, verbosity=0)
+        organism = Organism.objects.exclude(organism="Other").get()
+        attachment = Attachment.objects.get(object_id=organism.pk)
+        # Attachment file is stored in the folder of the first organism
+        self.assertNotIn('/{}/'.format(organism.pk), attachment.attachment_file.name)
+        call_command('import', 'geotrek.common.tests.test_parsers.AttachmentParser', filename, verbosity=0)
+        self.assertEqual(mocked_get.call_count, 2)
+        self.assertEqual(Attachment.objects.get(object_id=organism.pk), attachment)
+
+    @override_settings(PARSER_ATTACHMENTS_WORKERS=2)
+    @mock.patch('requests.Session.get')
+    @mock.patch('requests.Session.head')
+    def test_attachment_workers(self, mocked_head, mocked_get):
+        mocked_get.return_value.status_code = 200
+        mocked_get.return_value.content = get_dummy_img()
+        mocked_head.return_value.status_code = 200
+        mocked_head.return_value.headers = {'content-length': len(get_dummy_img())}
+        filename = os.path.join(os.path.dirname(__file__), 'data', 'organism.xls')
+        parser = AttachmentParser()
+        parser.parse(filename)
+        self.assertEqual(parser.nb_created, 1)
+        self.assertEqual(mocked_get.call_count, 1)
+        self.assertEqual(mocked_head.call_count, 0)
+        attachment = Attachment.objects.get()
+        self.assertEqual(attachment.content_object, Organism.objects.get())
+        self.assertTrue(attachment.is_image)
+        # Unchanged file is not downloaded again
+        parser = AttachmentParser()
+        parser.parse(filename)
+        self.assertEqual(parser.nb_unmodified, 1)
+        self.assertEqual(mocked_get.call_count, 1)
+        self.assertEqual(mocked_head.call_count, 1)
+        self.assertEqual(Attachment.objects.get(), attachment)
+        # Row is counted as updated if its file changed
+        mocked_head.return_value.headers = {'content-length': 1}
+        parser = AttachmentParser()
+        parser.parse(filename)
+        self.assertEqual(parser.nb_unmodified, 0)
+        self.assertEqual(parser.nb_updated, 1)
+        self.assertEqual(mocked_get.call_count, 2)
+        self.assertNotEqual(Attachment.objects.get(), attachment)
+
+    @override_settings(PARSER_ATTACHMENTS_WORKERS=2)
+    @mock.patch('requests.Session.get')
+    def test_attachment_workers_fail(self, mocked_get):
+        mocked_get.side_effect = DownloadImportError("DownloadImportError")
+        filename = os.path.join(os.path.dirname(__file__), 'data', 'organism.xls')
+        output = StringIO()
+        call_command('import', 'geotrek.common.tests.test_parsers.WarnAttachmentParser', filename, verbosity=2,
+                     stdout=output)
+        self.assertIn("Failed to load attachment: DownloadImportError", output.getvalue())
+        self.assertEqual(mocked_get.call_count, 1)
+        self.assertEqual(Attachment.objects.count(), 0)
+
     @mock.patch('requests.get')
     @mock.patch('requests.head')
     def test_attachment_request_except(self, mocked_head, mocked_get):
@@ -554,6 +736,26 @@ class XMLParserTests(TestCase):
         self.assertEqual(Organism.objects.count(), 1)
         self.assertEqual(Organism.objects.get().organism, 'Organism a')
 
+    def test_xml_streaming(self):
+        class TestXmlParser(XmlParser):
+            results_path = 'Result/el'
+            model = Organism
+            streaming = True
+
+            fields = {'organism': 'ORGANISM'}
+
+            def __init__(self):
+                self.filename = os.path.join(os.path.dirname(__file__), 'data', 'test.xml')
+                super().__init__()
+
+        parser = TestXmlParser()
+        parser.parse()
+        self.assertEqual(parser.nb, 1)
+        self.assertEqual(Organism.objects.count(), 1)
+        self.assertEqual(Organism.objects.get().organism, 'Organism a')
+        # Processed elements are not kept in memory
+        self.assertEqual(len(parser.root), 0)
+
 
 class TourInSoftParserTests(TestCase):
 
@@ -747,6 +949,61 @@ class GeotrekParserTest(GeotrekParserTestMixin, TestCase):
         self.assertEqual([t.pk], list(Trek.objects.values_list('pk', flat=True)))
 
 
+class GeotrekParserPagesTest(TestCase):
+    def setUp(self):
+        self.pages = [
+            {'count': 3, 'next': 'https://test.fr/api/v2/trek/?page=2', 'results': [{'uuid': 1}]},
+            {'count': 3, 'next': 'https://test.fr/api/v2/trek/?page=3', 'results': [{'uuid': 2}]},
+            {'count': 3, 'next': None, 'results': [{'uuid': 3}]},
+        ]
+
+    def test_api_fields(self):
+        parser = GeotrekTrekTestProviderParser()
+        fields = parser.get_api_fields().split(',')
+        self.assertIn('uuid', fields)
+        self.assertIn('geometry', fields)
+        self.assertIn('attachments', fields)
+        self.assertNotIn('eid', fields)
+        self.assertNotIn('geom', fields)
+
+    @mock.patch('requests.get')
+    def test_read_ahead(self, mocked_get):
+        mocked_get.return_value.status_code = 200
+        mocked_get.return_value.json.side_effect = self.pages
+        parser = GeotrekTrekTestProviderParser(prefetch_pages=1)
+        pages = list(parser.read_ahead(parser.fetch_pages('https://test.fr/api/v2/trek/', {'fields': 'uuid'})))
+        self.assertEqual(pages, self.pages)
+        self.assertEqual(mocked_get.call_count, 3)
+        self.assertEqual(mocked_get.call_args_list[0][1]['params'], {'fields': 'uuid'})
+        self.assertEqual(mocked_get.call_args_list[1][0][0], 'https://test.fr/api/v2/trek/?page=2')
+        self.assertIsNone(mocked_get.call_args_list[1][1]['params'])
+
+    @mock.patch('requests.get')
+    def test_read_ahead_error(self, mocked_get):
+        mocked_get.return_value.status_code = 200
+        mocked_get.return_value.json.side_effect = [self.pages[0], ValueError("Invalid JSON")]
+        parser = GeotrekTrekTestProviderParser(prefetch_pages=2)
+        pages = parser.read_ahead(parser.fetch_pages('https://test.fr/api/v2/trek/', {}))
+        self.assertEqual(next(pages), self.pages[0])
+        with self.assertRaisesRegex(ValueError, "Invalid JSON"):
+            next(pages)
+
+    def test_read_ahead_stopped(self):
+        produced = []
+
+        def pages():
+            for i in range(100):
+                produced.append(i)
+                yield {'results': [i]}
+
+        parser = GeotrekTrekTestProviderParser(prefetch_pages=2)
+        iterator = parser.read_ahead(pages())
+        self.assertEqual(next(iterator), {'results': [0]})
+        iterator.close()
+        # Current page, pages in buffer and the one waiting for room
+        self.assertLessEqual(len(produced), 4)
+
+
 class GeotrekAggregatorParserTest(GeotrekParserTestMixin, TestCase):
     def setUp(self, *args, **kwargs):
         self.filetype = FileType.objects.create(type="Photographie")
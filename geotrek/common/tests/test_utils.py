@@ -1,13 +1,25 @@
 import os
+from unittest import mock
 
 from django.conf import settings
+from django.contrib.admin.models import ADDITION, LogEntry
 from django.contrib.gis.geos import Point
+from django.core.cache import caches
 from django.test import SimpleTestCase, TestCase, override_settings
 
+from mapentity.tests.factories import UserFactory
+
+from geotrek.core.models import Topology
+from geotrek.trekking.tests.factories import TrekFactory
+
+from ..models import Theme
 from ..parsers import Parser
 from ..utils import uniquify, format_coordinates, spatial_reference, simplify_coords
+from ..utils.cache import (EPOCH_KEY, LISTENER_KEY, OBJECT_UPDATES_CHANNEL, _listen_object_updates,
+                           get_model_versions, get_object_version, get_objects_epoch)
 from ..utils.import_celery import create_tmp_destination, subclasses
-from ..utils.parsers import add_http_prefix
+from ..utils.parsers import add_http_prefix, stream_json_items
+from .factories import ThemeFactory
 
 
 class UtilsTest(TestCase):
@@ -100,3 +112,91 @@ class UtilsParsersTest(SimpleTestCase):
 
     def test_add_http_prefix_with_prefix(self):
         self.assertEqual('http://test.com', add_http_prefix('http://test.com'))
+
+    def test_stream_json_items(self):
+        document = b'{"d": {"results": [{"name": "\xc3\xa9t\xc3\xa9 ]"}, 12345, null], "__count": "3"}, "other": true}'
+        for size in (1, 2, 5, len(document)):
+            root = {}
+            chunks = [document[i:i + size] for i in range(0, len(document), size)]
+            items = stream_json_items(chunks, ['d', 'results'], root)
+            self.assertEqual(list(items), [{"name": "été ]"}, 12345, None])
+            self.assertEqual(root, {'d': {'__count': '3'}, 'other': True})
+
+    def test_stream_json_items_values_before(self):
+        root = {}
+        items = stream_json_items([b'{"numFound": 1, "objetsTouristiques": [{"id": 1}]}'], ['objetsTouristiques'], root)
+        self.assertEqual(root, {'numFound': 1})
+        self.assertEqual(list(items), [{"id": 1}])
+
+    def test_stream_json_items_missing(self):
+        root = {}
+        self.assertEqual(list(stream_json_items([b'{"numFound": 0}'], ['objetsTouristiques'], root)), [])
+        self.assertEqual(root, {'numFound': 0})
+
+    def test_stream_json_items_invalid(self):
+        with self.assertRaises(ValueError):
+            list(stream_json_items([b'{"results": [1, 2'], ['results'], {}))
+
+
+class ModelVersionsTest(TestCase):
+    def test_version_bumped_on_save_and_delete(self):
+        version = get_model_versions([Theme])['common.theme']
+        theme = ThemeFactory.create()
+        self.assertGreater(get_model_versions([Theme])['common.theme'], version)
+        version = get_model_versions([Theme])['common.theme']
+        theme.delete()
+        self.assertGreater(get_model_versions([Theme])['common.theme'], version)
+
+    def test_parent_version_bumped(self):
+        version = get_model_versions([Topology])['core.topology']
+        TrekFactory.create()
+        self.assertGreater(get_model_versions([Topology])['core.topology'], version)
+
+    def test_version_not_bumped_for_models_not_cached(self):
+        version = get_model_versions([LogEntry])['admin.logentry']
+        LogEntry.objects.create(user=UserFactory.create(), action_flag=ADDITION, object_repr='Theme')
+        self.assertEqual(get_model_versions([LogEntry])['admin.logentry'], version)
+
+
+class StopListening(BaseException):
+    """ Raised by mocks to exit the listener loop """
+
+
+class ObjectUpdatesListenerTest(TestCase):
+    def setUp(self):
+        caches['default'].delete(LISTENER_KEY)
+
+    @mock.patch('geotrek.common.utils.cache.select.select')
+    @mock.patch('geotrek.common.utils.cache.connections.create_connection')
+    def test_notified_objects_bumped(self, create_connection, select):
+        theme = ThemeFactory.create()
+        version = get_object_version(Theme, theme.pk, lambda: None)
+        epoch = get_objects_epoch()
+        pg_connection = create_connection.return_value.connection
+        pg_connection.notifies = []
+
+        def notify(*args):
+            if select.call_count > 1:
+                raise StopListening
+            pg_connection.notifies.append(mock.Mock(payload=f'{Theme._meta.db_table}:{theme.pk}'))
+            return [pg_connection], [], []
+
+        select.side_effect = notify
+        with self.assertRaises(StopListening):
+            _listen_object_updates()
+        cursor = pg_connection.cursor.return_value.__enter__.return_value
+        cursor.execute.assert_called_once_with(f'LISTEN {OBJECT_UPDATES_CHANNEL}')
+        self.assertGreater(get_object_version(Theme, theme.pk, lambda: None), version)
+        # Nobody listened before
+        self.assertGreater(get_objects_epoch(), epoch)
+        create_connection.return_value.close.assert_called_once_with()
+
+    @mock.patch('geotrek.common.utils.cache.time.sleep', side_effect=StopListening)
+    @mock.patch('geotrek.common.utils.cache.connections.create_connection')
+    def test_single_process_listens(self, create_connection, sleep):
+        caches['default'].set(LISTENER_KEY, 'other process')
+        epoch = caches['default'].get(EPOCH_KEY, 0)
+        with self.assertRaises(StopListening):
+            _listen_object_updates()
+        create_connection.assert_not_called()
+        self.assertEqual(caches['default'].get(EPOCH_KEY, 0), epoch)
@@ -0,0 +1,107 @@
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL.Image import DecompressionBombError
+from django.conf import settings
+from django.db import connection, transaction
+from easy_thumbnails.alias import aliases
+from easy_thumbnails.engine import NoSourceGenerator
+from easy_thumbnails.exceptions import InvalidImageFormatError
+from easy_thumbnails.files import ThumbnailFile, get_thumbnailer
+
+logger = logging.getLogger(__name__)
+
+# Not an easy-thumbnails alias: its options depend on the attachment (copyright text)
+WATERMARK_ALIAS = 'watermark'
+
+
+def thumbnail_options(attachment, alias):
+    """ easy-thumbnails options used to render this alias of an attachment """
+    if alias != WATERMARK_ALIAS:
+        return aliases.get(alias)
+    # Uppercase options aren't used by prepared options (a primary
+    # use of prepared options is to generate the filename -- these
+    # options don't alter the filename).
+    text = settings.THUMBNAIL_COPYRIGHT_FORMAT.format(author=attachment.author, title=attachment.title,
+                                                      legend=attachment.legend)
+    return {
+        'size': (800, 800),
+        'TEXT': text,
+        'SIZE_WATERMARK': settings.THUMBNAIL_COPYRIGHT_SIZE,
+        'watermark': hashlib.md5(text.encode('utf-8')).hexdigest()
+    }
+
+
+def manifest_thumbnail(attachment, alias):
+    """
+    Thumbnail of an attachment read from manifest, without filesystem access.
+    Returns None if it was not rendered yet.
+    Prefetch ``thumbnails`` of attachments to avoid a query per attachment.
+    """
+    for entry in attachment.thumbnails.all():
+        if entry.alias == alias:
+            storage = get_thumbnailer(attachment.attachment_file).thumbnail_storage
+            thumbnail = ThumbnailFile(entry.name, storage=storage)
+            if entry.width is not None:
+                thumbnail._dimensions_cache = (entry.width, entry.height)
+            return thumbnail
+    return None
+
+
+def generate_thumbnails(attachment):
+    """
+    Render every pre-generated alias of an image attachment and record them in manifest.
+    Returns False if the image is invalid or missing from disk.
+    """
+    from geotrek.common.models import AttachmentThumbnail
+
+    thumbnailer = get_thumbnailer(attachment.attachment_file)
+    entries = []
+    for alias in settings.THUMBNAIL_PREGENERATED_ALIASES:
+        options = thumbnailer.get_options(thumbnail_options(attachment, alias))
+        try:
+            thumbnail = thumbnailer.get_thumbnail(options)
+        except (IOError, InvalidImageFormatError, DecompressionBombError, NoSourceGenerator) as e:
+            logger.info("Image {} invalid or missing from disk: {}.".format(attachment.attachment_file, e))
+            return False
+        entries.append(AttachmentThumbnail(attachment=attachment, alias=alias, name=thumbnail.name,
+                                           width=thumbnail.width, height=thumbnail.height))
+    with transaction.atomic():
+        AttachmentThumbnail.objects.filter(attachment=attachment).delete()
+        AttachmentThumbnail.objects.bulk_create(entries)
+    return True
+
+
+def _generate_chunk(attachments):
+    try:
+        return sum(generate_thumbnails(attachment) for attachment in attachments)
+    finally:
+        # Each thread has its own database connection
+        connection.close()
+
+
+def generate_attachments_thumbnails(attachments):
+    """
+    Render thumbnails of image attachments with a pool of ``THUMBNAIL_WORKERS`` threads.
+    Returns the number of attachments rendered.
+    """
+    attachments = [attachment for attachment in attachments if attachment.is_image and attachment.attachment_file]
+    workers = min(settings.THUMBNAIL_WORKERS, len(attachments))
+    if workers <= 1:
+        return sum(generate_thumbnails(attachment) for attachment in attachments)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return sum(pool.map(_generate_chunk, [attachments[i::workers] for i in range(workers)]))
+
+
+def schedule_thumbnails(attachments):
+    """
+    Render thumbnails of attachments in a Celery task once current transaction is committed.
+    Attachments created with ``bulk_create`` need it explicitly since ``post_save`` is not sent.
+    """
+    from geotrek.common.tasks import generate_thumbnails_task
+
+    pks = [attachment.pk for attachment in attachments
+           if attachment.pk and attachment.is_image and attachment.attachment_file]
+    if pks and settings.THUMBNAIL_PREGENERATED_ALIASES:
+        transaction.on_commit(lambda: generate_thumbnails_task.delay(pks))
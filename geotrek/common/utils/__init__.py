@@ -104,7 +104,13 @@ def intersecting(qs, obj, distance=None, ordering=True, field='geom', defer=None
     if distance is None:
         distance = obj.distance(qs.model)
     if distance:
-        qs = qs.filter(**{'{}__dwithin'.format(field): (obj.geom, Distance(m=distance))})
+        # Read neighbours stored in database if this relation is indexed
+        from geotrek.common.models import Proximity
+        near = Proximity.near(qs.model, obj, distance) if field == 'geom' else None
+        if near is not None:
+            qs = qs.filter(pk__in=near)
+        else:
+            qs = qs.filter(**{'{}__dwithin'.format(field): (obj.geom, Distance(m=distance))})
     else:
         qs = qs.filter(**{'{}__intersects'.format(field): obj.geom})
         if obj.geom.geom_type == 'LineString' and ordering:
@@ -0,0 +1,178 @@
+import logging
+import select
+import threading
+import time
+import uuid
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+# PostgreSQL channel notified by ``ft_date_update`` trigger function, with ``<table>:<id>`` payloads
+OBJECT_UPDATES_CHANNEL = 'geotrek_object_update'
+LISTENER_KEY = 'object_versions:listener'
+EPOCH_KEY = 'object_versions:epoch'
+
+# Object versions of this process, as {cache key: (version, expiry)}
+_memory_versions = {}
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def _bump(key):
+    cache = caches['default']
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Never bumped or evicted: start from current time so that a previous version is not reused
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def _bump_on_commit(keys):
+    for key in keys:
+        _bump(key)
+    # Inside a transaction, bump again once committed, so that data read
+    # by concurrent requests before commit is not cached with the new version.
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: [_bump(key) for key in keys])
+
+
+def model_version_key(model):
+    return 'model_version:{}'.format(model._meta.label_lower)
+
+
+def get_model_versions(models):
+    """ Versions of models (as a dict by model label), bumped each time one of their objects changes """
+    keys = {model._meta.label_lower: model_version_key(model) for model in models}
+    versions = caches['default'].get_many(keys.values())
+    return {label: versions.get(key, 0) for label, key in keys.items()}
+
+
+def bump_model_version(model):
+    """ Bump version of a model and of its parents (multi-table inheritance) """
+    _bump_on_commit([model_version_key(model) for model in [model] + model._meta.get_parent_list()])
+
+
+def root_model(model):
+    """ Objects of multi-table inheritance children share the row of their root model (eg. treks and topologies) """
+    model = model._meta.concrete_model
+    while model._meta.pk.remote_field is not None:
+        model = model._meta.pk.remote_field.model
+    return model
+
+
+def object_version_key(model, pk):
+    return 'object_version:{}:{}'.format(root_model(model)._meta.label_lower, pk)
+
+
+def get_object_version(model, pk, initial):
+    """
+    Version of an object, bumped each time it changes, read from memory then from shared cache.
+    If unknown, ``initial()`` gives it (or returns None if object does not exist).
+    """
+    key = object_version_key(model, pk)
+    now = time.monotonic()
+    version, expiry = _memory_versions.get(key, (None, 0))
+    if expiry > now:
+        return version
+    cache = caches['default']
+    version = cache.get(key)
+    if version is None:
+        version = initial()
+        if version is None:
+            return None
+        cache.add(key, version, timeout=None)
+        version = cache.get(key, version)
+    if len(_memory_versions) >= settings.OBJECT_VERSIONS_MEMORY_SIZE:
+        _memory_versions.clear()
+    _memory_versions[key] = (version, now + settings.OBJECT_VERSIONS_MEMORY_TIMEOUT)
+    return version
+
+
+def bump_object_version(model, pk):
+    key = object_version_key(model, pk)
+    _memory_versions.pop(key, None)
+    _bump_on_commit([key])
+
+
+def get_objects_epoch():
+    """ Bumped when object updates were not listened, all object versions are then outdated """
+    return caches['default'].get(EPOCH_KEY, 0)
+
+
+def _models_by_table():
+    return {model._meta.db_table: model for model in apps.get_models()}
+
+
+def handle_object_update(payload, models=None):
+    """ Bump version of an object notified by SQL triggers with a ``<table>:<id>`` payload """
+    if models is None:
+        models = _models_by_table()
+    table, _, pk = payload.rpartition(':')
+    model = models.get(table)
+    if model is None or not pk.isdigit():
+        return
+    key = object_version_key(model, int(pk))
+    _memory_versions.pop(key, None)
+    _bump(key)
+
+
+def _listen_object_updates():
+    """
+    Bump versions of objects notified by SQL triggers. A single process listens at a time, so that
+    each update is bumped once: it owns ``LISTENER_KEY`` and refreshes it, others take over once it expired.
+    """
+    models = _models_by_table()
+    cache = caches['default']
+    timeout = settings.OBJECT_VERSIONS_LISTENER_TIMEOUT
+    owner = uuid.uuid4().hex
+    while True:
+        if cache.get(LISTENER_KEY) != owner:
+            if not cache.add(LISTENER_KEY, owner, timeout * 2):
+                time.sleep(timeout)
+                continue
+            # Nobody listened since the key expired: updates may have been missed
+            _bump(EPOCH_KEY)
+        connection = connections.create_connection('default')
+        try:
+            connection.ensure_connection()
+            connection.connection.autocommit = True
+            with connection.connection.cursor() as cursor:
+                cursor.execute('LISTEN {}'.format(OBJECT_UPDATES_CHANNEL))
+            pg_connection = connection.connection
+            while cache.get(LISTENER_KEY) in (owner, None):
+                cache.set(LISTENER_KEY, owner, timeout * 2)
+                if select.select([pg_connection], [], [], timeout) == ([], [], []):
+                    continue
+                pg_connection.poll()
+                while pg_connection.notifies:
+                    handle_object_update(pg_connection.notifies.pop(0).payload, models)
+        except Exception as e:
+            logger.warning("Listening to object updates failed: %s", e)
+            # Updates may be missed until listening again
+            _bump(EPOCH_KEY)
+            time.sleep(timeout)
+        finally:
+            connection.close()
+
+
+def start_object_updates_listener():
+    """
+    Start (once per process) a thread listening to objects updated by SQL triggers,
+    to bump their versions even if no Django signal was sent. Threads of other processes
+    stand by, to listen if this one stops.
+    """
+    global _listener
+    if not settings.OBJECT_VERSIONS_LISTENER or (_listener is not None and _listener.is_alive()):
+        return
+    with _listener_lock:
+        if _listener is not None and _listener.is_alive():
+            return
+        if not caches['default'].get(LISTENER_KEY):
+            # Nobody listened so far: updates may have been missed
+            _bump(EPOCH_KEY)
+        _listener = threading.Thread(target=_listen_object_updates, name='object-updates-listener', daemon=True)
+        _listener.start()
@@ -1,5 +1,113 @@
+import codecs
+import json
+
+
 def add_http_prefix(url):
     if url.startswith('http'):
         return url
     else:
         return 'http://' + url
+
+
+class JSONStreamReader:
+    """Decode JSON values one at a time from chunks of a document"""
+    whitespace = ' \t\n\r'
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = json.JSONDecoder()
+        self.text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """Read next chunk, returns False at end of document"""
+        if self.eof:
+            return False
+        try:
+            chunk = next(self.chunks)
+        except StopIteration:
+            self.eof = True
+            self.buffer += self.text_decoder.decode(b'', final=True)
+            return False
+        if isinstance(chunk, bytes):
+            chunk = self.text_decoder.decode(chunk)
+        # Drop decoded text
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Next non blank character"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in self.whitespace:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                raise ValueError("Unexpected end of JSON document")
+
+    def read(self, expected):
+        char = self.peek()
+        if char not in expected:
+            raise ValueError("Expecting one of '{}' in JSON document, got '{}'".format(expected, char))
+        self.pos += 1
+        return char
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            if end == len(self.buffer) and self.fill():
+                # A number may go on in next chunk
+                continue
+            self.pos = end
+            return value
+
+
+def _walk_json(reader, keys, root):
+    if not keys:
+        yield _ITEMS_START
+        reader.read('[')
+        if reader.peek() == ']':
+            reader.pos += 1
+            return
+        while True:
+            yield reader.value()
+            if reader.read(',]') == ']':
+                return
+    reader.read('{')
+    if reader.peek() == '}':
+        reader.pos += 1
+        return
+    while True:
+        key = reader.value()
+        reader.read(':')
+        if key == keys[0] and reader.peek() == ('{' if len(keys) > 1 else '['):
+            yield from _walk_json(reader, keys[1:], root.setdefault(key, {}))
+        else:
+            root[key] = reader.value()
+        if reader.read(',}') == '}':
+            return
+
+
+_ITEMS_START = object()
+
+
+def stream_json_items(chunks, keys, root):
+    """
+    Iterate over items of the array found under ``keys`` in a JSON document read from ``chunks``,
+    decoding one item at a time. Other values of the document are stored in ``root`` dict, with the
+    same nesting: those before the array are available as soon as this function returns.
+    """
+    items = _walk_json(JSONStreamReader(chunks), keys, root)
+    for item in items:
+        if item is _ITEMS_START:
+            return items
+    return iter([])
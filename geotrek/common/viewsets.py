@@ -1,5 +1,27 @@
+from hashlib import md5
+
+from django.conf import settings
+from django.contrib.gis.db.models.functions import Transform
+from django.contrib.gis.geos import Polygon
+from django.core.cache import caches
+from django.db import connection
+from django.db.models import F
+from mapentity.settings import app_settings
 from mapentity.views import MapEntityViewSet
 from rest_framework import permissions
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, PermissionDenied
+from rest_framework.response import Response
+
+from geotrek.common.functions import AsMVTGeom, SimplifyPreserveTopology
+from geotrek.common.renderers import MVTRenderer
+from geotrek.common.utils.cache import get_model_versions
+
+# Half size of the world in web mercator (EPSG:3857) coordinates
+MERCATOR_HALF_SIZE = 20037508.342789244
+# Size of a tile in its own coordinates, and margin kept around it so that features crossing edges are drawn continuously
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
 
 
 class GeotrekMapentityViewSet(MapEntityViewSet):
@@ -7,6 +29,7 @@ class GeotrekMapentityViewSet(MapEntityViewSet):
 
     permission_classes = [permissions.DjangoModelPermissionsOrAnonReadOnly]
     mapentity_list_class = []
+    tile_geometry_field = 'geom'
 
     def get_columns(self):
         return self.mapentity_list_class.columns
@@ -21,3 +44,63 @@ class GeotrekMapentityViewSet(MapEntityViewSet):
             # this permit to optimize data serialization with only required columns
             context['request'].query_params['fields'] = ','.join(columns)
         return context
+
+    def get_layer_version(self):
+        """ Changed each time an object of the layer is created, edited (even by SQL triggers) or deleted """
+        latest_updated = self.model.latest_updated()
+        version = get_model_versions([self.model])[self.model._meta.label_lower]
+        return '{}:{}'.format(version, latest_updated.isoformat() if latest_updated else '')
+
+    def get_tile_cache_key(self, z, x, y):
+        """ Tiles are cached per layer version and filters """
+        params = sorted(self.request.GET.items())
+        key = '{}:{}:{}/{}/{}:{}'.format(self.model._meta.label_lower, self.get_layer_version(), z, x, y, params)
+        return 'tile_{}'.format(md5(key.encode('utf-8')).hexdigest())
+
+    def get_tile_queryset(self):
+        """ Objects of the layer, where ``tile_geometry_field`` can be used in database lookups """
+        return self.filter_queryset(self.get_queryset()).order_by()
+
+    def get_tile(self, z, x, y):
+        """ Encode objects of the layer within a tile with PostGIS, simplified according to zoom """
+        size = 2 * MERCATOR_HALF_SIZE / 2 ** z
+        xmin = -MERCATOR_HALF_SIZE + x * size
+        ymax = MERCATOR_HALF_SIZE - y * size
+        bounds = Polygon.from_bbox((xmin, ymax - size, xmin + size, ymax))
+        bounds.srid = 3857
+        margin = size * TILE_BUFFER / TILE_EXTENT
+        area = bounds.buffer(margin)
+        area.srid = 3857
+        area.transform(settings.SRID)
+
+        field = self.tile_geometry_field
+        # Details smaller than a tile pixel would not be drawn
+        geom = SimplifyPreserveTopology(Transform(field, 3857), size / TILE_EXTENT)
+        qs = self.get_tile_queryset()
+        qs = qs.filter(**{'{}__intersects'.format(field): area})
+        qs = qs.annotate(mvt_id=F('pk'), mvt_geom=AsMVTGeom(geom, bounds, TILE_EXTENT, TILE_BUFFER, True))
+        sql, params = qs.values('mvt_id', 'mvt_geom').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT ST_AsMVT(tile, %s, {}, 'mvt_geom', 'mvt_id') FROM ({}) AS tile WHERE mvt_geom IS NOT NULL"
+                .format(TILE_EXTENT, sql),
+                [self.model._meta.model_name, *params]
+            )
+            content = cursor.fetchone()[0]
+        return bytes(content) if content is not None else b''
+
+    @action(detail=False, url_path=r'tiles/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)', renderer_classes=[MVTRenderer])
+    def tiles(self, request, z, x, y, *args, **kwargs):
+        """ Layer as a ``{z}/{x}/{y}.mvt`` vector tile, so that maps load a constant amount of data """
+        if not request.user.has_perm(self.model.get_permission_codename('list')):
+            raise PermissionDenied
+        z, x, y = int(z), int(x), int(y)
+        if z > 30 or x >= 2 ** z or y >= 2 ** z:
+            raise NotFound
+        cache = caches[app_settings['GEOJSON_LAYERS_CACHE_BACKEND']]
+        key = self.get_tile_cache_key(z, x, y)
+        content = cache.get(key)
+        if content is None:
+            content = self.get_tile(z, x, y)
+            cache.set(key, content)
+        return Response(content)
@@ -0,0 +1,70 @@
+"""
+Deferred update of topologies geometries.
+
+Editing a path recomputes geometries of every topology on it, right away and once per edited path.
+In deferred mode, these topologies are only flagged (``geom_need_update``), then recomputed once each,
+at commit (``'commit'`` mode) or in batches by ``update_dirty_topologies`` task (``'worker'`` mode).
+"""
+import contextlib
+
+from django.conf import settings
+from django.db import connection, transaction
+
+MODES = ('commit', 'worker')
+BATCH_SIZE = 100
+
+
+def _set_mode(mode):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT current_setting('geotrek.topology_geom_update', TRUE), "
+                       "set_config('geotrek.topology_geom_update', %s, TRUE)", [mode])
+        return cursor.fetchone()[0] or ''
+
+
+@contextlib.contextmanager
+def deferred_topologies_update(mode=None):
+    """
+    Defer update of topologies changed by path editions within this block.
+    Mode defaults to ``TOPOLOGY_DEFERRED_UPDATE`` setting, nothing is deferred without mode.
+    """
+    if mode is None:
+        mode = settings.TOPOLOGY_DEFERRED_UPDATE
+    if not mode or not settings.TREKKING_TOPOLOGY_ENABLED:
+        yield
+        return
+    if mode not in MODES:
+        raise ValueError("Unknown deferred update mode: {}".format(mode))
+    with transaction.atomic():
+        previous = _set_mode(mode)
+        yield
+        # Mode is also reset if block fails, when savepoint is rolled back
+        _set_mode(previous)
+        if mode == 'worker':
+            from geotrek.core.tasks import update_dirty_topologies_task
+
+            transaction.on_commit(update_dirty_topologies_task.delay)
+
+
+def update_dirty_topologies(batch_size=BATCH_SIZE):
+    """
+    Recompute geometries of queued topologies, one transaction per batch.
+    Returns the number of topologies updated.
+    """
+    total = 0
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SELECT update_dirty_topologies(%s)", [batch_size])
+            updated = cursor.fetchone()[0]
+        total += updated
+        if updated < batch_size:
+            return total
+
+
+def topologies_update_status():
+    """ Deferred update mode and number of topologies waiting for their geometry to be updated """
+    from geotrek.core.models import Topology
+
+    return {
+        'mode': settings.TOPOLOGY_DEFERRED_UPDATE,
+        'pending': Topology._base_manager.filter(geom_need_update=True).count(),
+    }
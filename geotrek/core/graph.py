@@ -1,16 +1,110 @@
 import math
-from collections import defaultdict
+import time
+from array import array
+from bisect import bisect_left
 
+from django.core.cache import caches
+from django.db.models import Count, Max, Q
 
-def path_modifier(path):
-    length = 0.0 if math.isnan(path.length) else path.length
-    return {"id": path.pk, "length": length}
+from geotrek.common.functions import EndPoint, PointX, PointY, StartPoint
 
 
-def get_key_optimizer():
-    next_id = iter(range(1, 1000000)).__next__
-    mapping = defaultdict(next_id)
-    return lambda x: mapping[x]
+def edge_length(length):
+    return 0.0 if length is None or math.isnan(length) else length
+
+
+def graph_rows_of_qs(qs):
+    """
+    Iterate over ``(id, length, start_x, start_y, end_x, end_y)`` tuples of a path queryset,
+    computed by PostGIS without instantiating models nor geometries.
+    """
+    return qs.annotate(
+        start_x=PointX(StartPoint('geom')), start_y=PointY(StartPoint('geom')),
+        end_x=PointX(EndPoint('geom')), end_y=PointY(EndPoint('geom')),
+    ).values_list('pk', 'length', 'start_x', 'start_y', 'end_x', 'end_y').iterator()
+
+
+class CompactGraph:
+    """
+    Path graph stored in flat arrays.
+
+    Edges are stored by index in ``edge_ids``, ``edge_lengths``, ``edge_starts`` and ``edge_ends``
+    (node indexes). Adjacency is stored in CSR form: neighbours of node ``n`` are
+    ``neighbours[offsets[n]:offsets[n + 1]]``, reached through ``neighbour_edges`` (edge indexes).
+    Node indexes follow the order of first appearance of extremities in the rows.
+    """
+
+    def __init__(self, rows):
+        node_keys = {}
+        self.edge_ids = array('q')
+        self.edge_lengths = array('d')
+        self.edge_starts = array('q')
+        self.edge_ends = array('q')
+        for pk, length, start_x, start_y, end_x, end_y in rows:
+            self.edge_ids.append(pk)
+            self.edge_lengths.append(edge_length(length))
+            self.edge_starts.append(node_keys.setdefault((start_x, start_y), len(node_keys)))
+            self.edge_ends.append(node_keys.setdefault((end_x, end_y), len(node_keys)))
+        self.node_coords = array('d', [coord for key in node_keys for coord in key])
+        self.node_count = len(node_keys)
+        del node_keys
+        self._build_adjacency()
+
+    @classmethod
+    def from_qs(cls, qs):
+        return cls(graph_rows_of_qs(qs))
+
+    def _build_adjacency(self):
+        degrees = array('q', bytes(8 * (self.node_count + 1)))
+        for start, end in zip(self.edge_starts, self.edge_ends):
+            degrees[start + 1] += 1
+            degrees[end + 1] += 1
+        for n in range(self.node_count):
+            degrees[n + 1] += degrees[n]
+        self.offsets = degrees
+        cursor = array('q', degrees)
+        size = 2 * len(self.edge_ids)
+        self.neighbours = array('q', bytes(8 * size))
+        self.neighbour_edges = array('q', bytes(8 * size))
+        for index, (start, end) in enumerate(zip(self.edge_starts, self.edge_ends)):
+            for node, other in ((start, end), (end, start)):
+                self.neighbours[cursor[node]] = other
+                self.neighbour_edges[cursor[node]] = index
+                cursor[node] += 1
+
+    def edge_index(self, pk):
+        """ Return the index of the edge of path ``pk``, or ``None`` """
+        if not hasattr(self, '_sorted_edge_ids'):
+            order = sorted(range(len(self.edge_ids)), key=self.edge_ids.__getitem__)
+            self._sorted_edge_ids = array('q', (self.edge_ids[i] for i in order))
+            self._sorted_edge_indexes = array('q', order)
+        i = bisect_left(self._sorted_edge_ids, pk)
+        if i < len(self._sorted_edge_ids) and self._sorted_edge_ids[i] == pk:
+            return self._sorted_edge_indexes[i]
+        return None
+
+    def node_key(self, node):
+        return self.node_coords[2 * node], self.node_coords[2 * node + 1]
+
+    def serialize(self):
+        """ Return the graph in the shape of ``graph_edges_nodes_of_qs`` (node ids start at 1) """
+        edge_ids = self.edge_ids
+        edges = {
+            pk: {'id': pk, 'length': length, 'nodes_id': [start + 1, end + 1]}
+            for pk, length, start, end in zip(edge_ids, self.edge_lengths, self.edge_starts, self.edge_ends)
+        }
+        nodes = {}
+        offsets, neighbours, neighbour_edges = self.offsets, self.neighbours, self.neighbour_edges
+        for node in range(self.node_count):
+            # Neighbours are stored in edges order: with parallel edges, the last one wins
+            nodes[node + 1] = {
+                neighbours[i] + 1: edge_ids[neighbour_edges[i]]
+                for i in range(offsets[node], offsets[node + 1])
+            }
+        return {
+            'edges': edges,
+            'nodes': nodes,
+        }
 
 
 def graph_edges_nodes_of_qs(qs):
@@ -31,27 +125,184 @@ def graph_edges_nodes_of_qs(qs):
 
     coord_point are tuple of float
     """
+    return CompactGraph.from_qs(qs).serialize()
 
-    key_modifier = get_key_optimizer()
-    value_modifier = path_modifier
 
-    edges = defaultdict(dict)
-    nodes = defaultdict(dict)
+class PathGraphStore:
+    """
+    Persistent path graph, kept in the ``fat`` cache and patched with the paths
+    inserted, updated or deleted since the cached version instead of being
+    rebuilt from scratch.
 
-    for path in qs:
-        coords = path.geom.coords
-        start_point, end_point = coords[0], coords[-1]
-        k_start_point, k_end_point = key_modifier(start_point), key_modifier(end_point)
+    Every patch increments ``version`` and is recorded in a bounded changelog,
+    so that clients can fetch only what changed since the version they hold
+    (see ``delta()``). A full rebuild starts a new version sequence from the
+    current timestamp, so that versions stay monotonic when the cache is purged.
+    """
+    cache_alias = 'fat'
+    cache_key = 'path_graph_store'
+    changelog_size = 100
+    lock_timeout = 60
+    lock_poll_interval = 0.05
 
-        v_path = value_modifier(path)
-        v_path['nodes_id'] = [k_start_point, k_end_point]
-        edge_id = v_path['id']
+    def __init__(self):
+        self.cache = caches[self.cache_alias]
 
-        nodes[k_start_point][k_end_point] = edge_id
-        nodes[k_end_point][k_start_point] = edge_id
-        edges[edge_id] = v_path
+    @staticmethod
+    def get_token():
+        """ Cheap fingerprint of the non-draft paths table """
+        from geotrek.core.models import Path
 
-    return {
-        'edges': dict(edges),
-        'nodes': dict(nodes),
-    }
+        return Path.objects.filter(draft=False).aggregate(last_update=Max('date_update'), count=Count('pk'))
+
+    @staticmethod
+    def empty_state():
+        return {
+            'token': None,
+            'version': 0,
+            'edges': {},
+            'nodes': {},
+            'incidence': {},
+            'node_keys': {},
+            'next_node_id': 1,
+            'changelog': [],
+        }
+
+    def get_state(self):
+        """ Return the graph state, patched up to the current paths table """
+        state = self.cache.get(self.cache_key)
+        if state is not None and state['token'] == self.get_token():
+            return state
+        # A single worker patches and publishes at a time, so that concurrent workers
+        # cannot publish different states under the same version. Waiting only polls
+        # the cache, the paths table is queried once the lock is released
+        lock_key = '{}_lock'.format(self.cache_key)
+        while not self.cache.add(lock_key, True, self.lock_timeout):
+            time.sleep(self.lock_poll_interval)
+        try:
+            # State may have been published while waiting for the lock
+            state = self.cache.get(self.cache_key)
+            token = self.get_token()
+            if state is not None and state['token'] == token:
+                return state
+            if state is None or state['token'] is None or state['token']['last_update'] is None:
+                state = self.empty_state()
+                self.rebuild(state)
+            else:
+                self.patch(state)
+            state['token'] = token
+            self.cache.set(self.cache_key, state)
+        finally:
+            self.cache.delete(lock_key)
+        return state
+
+    def get_graph(self):
+        state = self.get_state()
+        return state['version'], {'edges': state['edges'], 'nodes': state['nodes']}
+
+    def delta(self, since):
+        """
+        Return the edges and nodes changed since version ``since``.
+        If this version is unknown or too old, the whole graph is returned with ``full`` set.
+        """
+        state = self.get_state()
+        changelog = state['changelog']
+        if since > state['version'] or (since < state['version'] and (not changelog or changelog[0][0] > since + 1)):
+            return {
+                'version': state['version'],
+                'full': True,
+                'edges': state['edges'],
+                'nodes': state['nodes'],
+                'deleted_edges': [],
+                'deleted_nodes': [],
+            }
+        edge_ids, node_ids = set(), set()
+        for version, changed_edges, changed_nodes in changelog:
+            if version > since:
+                edge_ids.update(changed_edges)
+                node_ids.update(changed_nodes)
+        edges, nodes = state['edges'], state['nodes']
+        return {
+            'version': state['version'],
+            'full': False,
+            'edges': {edge_id: edges[edge_id] for edge_id in edge_ids if edge_id in edges},
+            'nodes': {node_id: nodes[node_id] for node_id in node_ids if node_id in nodes},
+            'deleted_edges': sorted(edge_id for edge_id in edge_ids if edge_id not in edges),
+            'deleted_nodes': sorted(node_id for node_id in node_ids if node_id not in nodes),
+        }
+
+    def rebuild(self, state):
+        from geotrek.core.models import Path
+
+        graph = CompactGraph.from_qs(Path.objects.exclude(draft=True))
+        serialized = graph.serialize()
+        state['edges'] = serialized['edges']
+        state['nodes'] = serialized['nodes']
+        state['node_keys'] = {graph.node_key(node): node + 1 for node in range(graph.node_count)}
+        state['next_node_id'] = graph.node_count + 1
+        state['incidence'] = {
+            node + 1: {graph.edge_ids[i] for i in graph.neighbour_edges[graph.offsets[node]:graph.offsets[node + 1]]}
+            for node in range(graph.node_count)
+        }
+        state['version'] = int(time.time() * 1000)
+
+    def patch(self, state):
+        from geotrek.core.models import Path
+
+        last_update = state['token']['last_update']
+        existing_ids = set(Path.objects.filter(draft=False).values_list('pk', flat=True))
+        # Paths committed by a longer transaction may be dated before the last update
+        missing_ids = existing_ids - set(state['edges'])
+        changed = Path.objects.filter(Q(date_update__gte=last_update) | Q(pk__in=missing_ids))
+        draft_ids = set(changed.filter(draft=True).values_list('pk', flat=True))
+        changed_edges, changed_nodes = set(), set()
+
+        for edge_id in set(state['edges']) - existing_ids:
+            changed_nodes.update(self._remove_edge(state, edge_id))
+            changed_edges.add(edge_id)
+        for row in graph_rows_of_qs(changed):
+            pk = row[0]
+            if pk in state['edges']:
+                changed_nodes.update(self._remove_edge(state, pk))
+            if pk not in draft_ids:
+                changed_nodes.update(self._add_edge(state, row))
+            changed_edges.add(pk)
+        if not changed_edges:
+            return
+        state['version'] += 1
+        state['changelog'].append((state['version'], changed_edges, changed_nodes))
+        del state['changelog'][:-self.changelog_size]
+
+    def _node_id(self, state, coords):
+        node_keys = state['node_keys']
+        if coords not in node_keys:
+            node_keys[coords] = state['next_node_id']
+            state['next_node_id'] += 1
+        return node_keys[coords]
+
+    def _add_edge(self, state, row):
+        edge_id, length, start_x, start_y, end_x, end_y = row
+        k_start_point = self._node_id(state, (start_x, start_y))
+        k_end_point = self._node_id(state, (end_x, end_y))
+        state['edges'][edge_id] = {'id': edge_id, 'length': edge_length(length), 'nodes_id': [k_start_point, k_end_point]}
+        state['nodes'].setdefault(k_start_point, {})[k_end_point] = edge_id
+        state['nodes'].setdefault(k_end_point, {})[k_start_point] = edge_id
+        state['incidence'].setdefault(k_start_point, set()).add(edge_id)
+        state['incidence'].setdefault(k_end_point, set()).add(edge_id)
+        return k_start_point, k_end_point
+
+    def _remove_edge(self, state, edge_id):
+        """ Remove an edge, restoring parallel edges between the same nodes if any """
+        edges, nodes, incidence = state['edges'], state['nodes'], state['incidence']
+        node_ids = edges.pop(edge_id)['nodes_id']
+        for node_id in set(node_ids):
+            incidence[node_id].discard(edge_id)
+            if not incidence[node_id]:
+                del incidence[node_id]
+                nodes.pop(node_id, None)
+                continue
+            nodes[node_id] = {}
+            for other_id in sorted(incidence[node_id]):
+                start, end = edges[other_id]['nodes_id']
+                nodes[node_id][end if start == node_id else start] = other_id
+        return node_ids
@@ -1,11 +1,76 @@
+import csv
+from io import StringIO
+
 from django.contrib.gis.gdal import DataSource, GDALException
+from geotrek.core.deferred import deferred_topologies_update
 from geotrek.core.models import Path
 from geotrek.authent.models import Structure
+from django.contrib.gis.geos import GEOSGeometry
 from django.contrib.gis.geos.collections import Polygon, LineString
 from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
 from django.db.utils import IntegrityError, InternalError
-from django.db import transaction
+from django.db import connection, transaction
+
+# Extremities of loaded paths are snapped on the closest path, existing or loaded before,
+# preferring its closest vertex, as done by paths_snap_extremities trigger
+SNAP_SQL = """
+    WITH snapped AS (
+        SELECT s.rid, COALESCE(vertex.geom, nearest.closest) AS point
+        FROM loadpaths_staging s
+        CROSS JOIN LATERAL (
+            SELECT o.geom, ST_ClosestPoint(o.geom, {point}(s.geom)) AS closest
+            FROM (SELECT geom FROM core_path
+                  UNION ALL
+                  SELECT geom FROM loadpaths_staging WHERE rid < s.rid) AS o
+            WHERE ST_DWithin(o.geom, {point}(s.geom), %(distance)s)
+                  AND ST_Distance(o.geom, {point}(s.geom)) < %(distance)s
+            ORDER BY ST_Distance(o.geom, {point}(s.geom))
+            LIMIT 1
+        ) AS nearest
+        LEFT JOIN LATERAL (
+            SELECT v.geom FROM ST_DumpPoints(nearest.geom) AS v
+            WHERE ST_Distance(v.geom, nearest.closest) < %(distance)s
+            ORDER BY ST_Distance(v.geom, nearest.closest)
+            LIMIT 1
+        ) AS vertex ON TRUE
+        WHERE s.valid
+    )
+    UPDATE loadpaths_staging s SET geom = ST_SetPoint(s.geom, {index}, snapped.point)
+    FROM snapped WHERE s.rid = snapped.rid
+"""
+
+# Loaded paths are split where they cross each other, as done by paths_topology_intersect_split trigger
+NODE_SQL = """
+    CREATE TEMP TABLE loadpaths_pieces AS
+    SELECT s.rid, s.name, s.comments, COALESCE(piece.path[1], 1) AS part, piece.geom
+    FROM loadpaths_staging s
+    LEFT JOIN LATERAL (
+        SELECT ST_Union(crossing.geom) AS blade
+        FROM loadpaths_staging o
+        CROSS JOIN LATERAL ST_Dump(ST_Intersection(s.geom, o.geom)) AS crossing
+        WHERE o.rid != s.rid AND o.valid AND ST_Intersects(s.geom, o.geom)
+              AND GeometryType(crossing.geom) = 'POINT'
+    ) AS crossings ON s.valid
+    CROSS JOIN LATERAL ST_Dump(CASE WHEN crossings.blade IS NULL THEN s.geom
+                                    ELSE ST_Split(ST_Snap(s.geom, crossings.blade, %(tolerance)s), crossings.blade)
+                               END) AS piece
+"""
+
+# Pieces of invalid paths, or crossing existing paths elsewhere than at extremities of both, are inserted one
+# by one afterwards, so that triggers split existing paths and their topologies (or fail as usual)
+CLASSIFY_SQL = """
+    ALTER TABLE loadpaths_pieces ADD COLUMN path_id integer, ADD COLUMN bulk boolean;
+    UPDATE loadpaths_pieces p SET
+        path_id = nextval(pg_get_serial_sequence('core_path', 'id')),
+        bulk = ST_IsValid(p.geom) AND ST_IsSimple(p.geom) AND NOT EXISTS (
+            SELECT 1 FROM core_path c
+            WHERE NOT c.draft AND ST_Intersects(c.geom, p.geom)
+                  AND NOT ST_Within(ST_Intersection(c.geom, p.geom),
+                                    ST_Intersection(ST_Boundary(c.geom), ST_Boundary(p.geom)))
+        );
+    UPDATE loadpaths_pieces SET bulk = FALSE WHERE rid IN (SELECT rid FROM loadpaths_pieces WHERE NOT bulk);
+"""
 
 
 class Command(BaseCommand):
@@ -29,6 +94,9 @@ class Command(BaseCommand):
         parser.add_argument('--dry', '-d', action='store_true', dest='dry', default=False,
                             help="Do not change the database, dry run. Show the number of fail"
                                  " and objects potentially created")
+        parser.add_argument('--bulk', '-b', action='store_true', dest='bulk', default=False,
+                            help="Snap and split all paths at once, then insert them in bulk."
+                                 " Faster for large networks")
 
     def handle(self, *args, **options):
         verbosity = options.get('verbosity')
@@ -41,6 +109,7 @@ class Command(BaseCommand):
         comments_columns = options.get('comment')
         fail = options.get('fail')
         dry = options.get('dry')
+        bulk = options.get('bulk')
 
         if dry:
             fail = True
@@ -68,6 +137,7 @@ class Command(BaseCommand):
         self.bbox.srid = settings.SRID
 
         sid = transaction.savepoint()
+        rows = []
 
         for layer in ds:
             for feat in layer:
@@ -84,10 +154,14 @@ class Command(BaseCommand):
                     break
                 self.check_srid(srid, geom)
                 geom.dim = 2
-                if self.should_import(feat, geom):
+                if not self.should_import(feat, geom):
+                    continue
+                comment_final = '</br>'.join(comment_final_tab)
+                if bulk:
+                    rows.append((name, comment_final, geom))
+                else:
                     try:
                         with transaction.atomic():
-                            comment_final = '</br>'.join(comment_final_tab)
                             path = Path.objects.create(name=name,
                                                        structure=structure,
                                                        geom=geom,
@@ -103,6 +177,8 @@ class Command(BaseCommand):
                             self.stdout.write('Integrity Error on path : {}, {}'.format(name, geom))
                         else:
                             raise
+        if bulk:
+            counter, counter_fail = self.load_bulk(rows, structure, fail, verbosity)
         if not dry:
             transaction.savepoint_commit(sid)
             if verbosity >= 2:
@@ -113,6 +189,86 @@ class Command(BaseCommand):
             self.stdout.write(self.style.NOTICE(
                 "{0} objects will be create, {1} objects failed;".format(counter, counter_fail)))
 
+    def load_bulk(self, rows, structure, fail, verbosity):
+        """
+        Load paths in a few set-based queries instead of one by one:
+        features are copied into a staging table, snapped and split all at once,
+        then inserted without snapping and splitting triggers.
+        Returns the numbers of features created and failed.
+        """
+        counter = 0
+        counter_fail = 0
+        if not rows:
+            return counter, counter_fail
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TABLE IF EXISTS loadpaths_staging, loadpaths_pieces")
+            cursor.execute("CREATE TEMP TABLE loadpaths_staging "
+                           "(rid integer PRIMARY KEY, name text, comments text, geom geometry, valid boolean)")
+            data = StringIO()
+            writer = csv.writer(data, quoting=csv.QUOTE_NONNUMERIC)
+            srid = Path._meta.get_field('geom').srid
+            for rid, (name, comment, geom) in enumerate(rows):
+                geom = geom.transform(srid, clone=True) if geom.srid != srid else geom
+                writer.writerow([rid, name or '', comment, geom.hexewkb.decode()])
+            data.seek(0)
+            cursor.copy_expert("COPY loadpaths_staging (rid, name, comments, geom) FROM STDIN WITH (FORMAT csv)", data)
+            cursor.execute("UPDATE loadpaths_staging SET valid = ST_IsValid(geom) AND ST_IsSimple(geom)")
+            cursor.execute("CREATE INDEX ON loadpaths_staging USING gist (geom)")
+            cursor.execute("ANALYZE loadpaths_staging")
+
+            distance = {'distance': settings.PATH_SNAPPING_DISTANCE}
+            cursor.execute(SNAP_SQL.format(point='ST_StartPoint', index='0'), distance)
+            cursor.execute(SNAP_SQL.format(point='ST_EndPoint', index='ST_NPoints(s.geom) - 1'), distance)
+            cursor.execute(NODE_SQL, {'tolerance': 0.000001})
+            cursor.execute(CLASSIFY_SQL)
+
+            # Snapping and splitting triggers are suspended, other ones (elevation, dates...) still run
+            with transaction.atomic():
+                cursor.execute("SELECT set_config('geotrek.path_bulk_load', 'on', TRUE)")
+                cursor.execute("INSERT INTO core_path (id, structure_id, name, comments, geom) "
+                               "SELECT path_id, %s, name, comments, geom FROM loadpaths_pieces WHERE bulk "
+                               "ORDER BY path_id", [structure.pk])
+                cursor.execute("SELECT set_config('geotrek.path_bulk_load', '', TRUE)")
+            cursor.execute("SELECT rid, array_agg(path_id ORDER BY path_id) FROM loadpaths_pieces WHERE bulk "
+                           "GROUP BY rid ORDER BY rid")
+            created = cursor.fetchall()
+            cursor.execute("SELECT rid, array_agg(encode(ST_AsEWKB(geom), 'hex') ORDER BY part) "
+                           "FROM loadpaths_pieces WHERE NOT bulk GROUP BY rid ORDER BY rid")
+            remaining = cursor.fetchall()
+            cursor.execute("DROP TABLE loadpaths_staging, loadpaths_pieces")
+
+        for rid, pks in created:
+            counter += 1
+            name, comment, geom = rows[rid]
+            if verbosity > 0:
+                for pk in pks:
+                    self.stdout.write('Create path with pk : {}'.format(pk))
+            if verbosity > 1:
+                self.stdout.write("The comment %s was added on %s" % (comment, name))
+
+        # Topologies on existing paths split by these ones are updated once, at the end
+        with deferred_topologies_update('commit'):
+            for rid, pieces in remaining:
+                name, comment, geom = rows[rid]
+                try:
+                    with transaction.atomic():
+                        paths = [Path.objects.create(name=name, structure=structure,
+                                                     geom=GEOSGeometry(piece), comments=comment)
+                                 for piece in pieces]
+                    counter += 1
+                    if verbosity > 0:
+                        for path in paths:
+                            self.stdout.write('Create path with pk : {}'.format(path.pk))
+                    if verbosity > 1:
+                        self.stdout.write("The comment %s was added on %s" % (comment, name))
+                except (IntegrityError, InternalError):
+                    if fail:
+                        counter_fail += 1
+                        self.stdout.write('Integrity Error on path : {}, {}'.format(name, geom))
+                    else:
+                        raise
+        return counter, counter_fail
+
     def check_srid(self, srid, geom):
         if not geom.srid:
             geom.srid = srid
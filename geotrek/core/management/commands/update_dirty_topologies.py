@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from geotrek.core.deferred import BATCH_SIZE, topologies_update_status, update_dirty_topologies
+
+
+class Command(BaseCommand):
+    help = "Recompute geometries of topologies queued by path editions (see TOPOLOGY_DEFERRED_UPDATE setting)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help="Number of topologies updated per transaction")
+
+    def handle(self, *args, **options):
+        updated = update_dirty_topologies(options['batch_size'])
+        if options['verbosity'] >= 1:
+            self.stdout.write("Updated: {} / Pending: {}".format(updated, topologies_update_status()['pending']))
@@ -11,7 +11,7 @@ from django.contrib.gis.geos import Point, fromstr, LineString, GEOSGeometry
 from django.contrib.postgres.indexes import GistIndex
 from django.core.mail import mail_managers
 from django.db import connection, connections, DEFAULT_DB_ALIAS
-from django.db.models import ProtectedError
+from django.db.models import ProtectedError, Q
 from django.db.models.query import QuerySet
 from django.db.models.signals import pre_delete
 from django.dispatch import receiver
@@ -27,6 +27,7 @@ from geotrek.core.managers import PathManager, PathInvisibleManager, TopologyMan
 from geotrek.common.mixins.models import (TimeStampedModelMixin, NoDeleteMixin, AddPropertyMixin,
                                           CheckBoxActionMixin, GeotrekMapEntityMixin)
 from geotrek.common.utils import classproperty, simplify_coords, sqlfunction, uniquify
+from geotrek.core.deferred import deferred_topologies_update
 from geotrek.zoning.mixins import ZoningPropertiesMixin
 from mapentity.serializers import plain_text
 
@@ -155,6 +156,10 @@ class Path(CheckBoxActionMixin, ZoningPropertiesMixin, AddPropertyMixin, Geotrek
         disjoint = sqlfunction('SELECT * FROM check_path_not_overlap', str(pk), wkt)
         return disjoint[0]
 
+    def get_elevation_dependants(self):
+        """ Topologies are draped again by triggers when their paths change """
+        return self.topology_set.all()
+
     def reverse(self):
         """
         Reverse the geometry.
@@ -234,7 +239,9 @@ class Path(CheckBoxActionMixin, ZoningPropertiesMixin, AddPropertyMixin, Geotrek
             except Exception as exc:
                 msg = f'Caught {exc.__class__.__name__}: {exc}'
                 logger.warning(f"Error mail managers didn't work ({msg})")
-        super().save(*args, **kwargs)
+        # Related topologies may be updated later (see TOPOLOGY_DEFERRED_UPDATE setting)
+        with deferred_topologies_update():
+            super().save(*args, **kwargs)
         self.reload()
 
     def delete(self, *args, **kwargs):
@@ -383,6 +390,8 @@ class Topology(ZoningPropertiesMixin, AddPropertyMixin, AltimetryMixin,
         indexes = [
             GistIndex(name='topology_geom_gist_idx', fields=['geom']),
             GistIndex(name='topology_geom_3d_gist_idx', fields=['geom_3d']),
+            # Topologies waiting for their geometry to be updated
+            models.Index(name='topology_geom_need_update_idx', fields=['id'], condition=Q(geom_need_update=True)),
         ]
 
     def __init__(self, *args, **kwargs):
@@ -439,55 +448,88 @@ class Topology(ZoningPropertiesMixin, AddPropertyMixin, AltimetryMixin,
         """
         if all_objects is None:
             all_objects = cls.objects.existing()
-        is_generic = all_objects.model.KIND == Topology.KIND
         single_input = isinstance(queryset, QuerySet)
 
         if single_input:
-            topology_pks = [str(pk) for pk in queryset.values_list('pk', flat=True)]
+            topology_pks = list(queryset.values_list('pk', flat=True))
         else:
-            topology_pks = [str(queryset.pk)]
+            topology_pks = [queryset.pk]
 
         if len(topology_pks) == 0:
             return all_objects.filter(pk__in=[])
 
+        sql, params = cls._overlapping_sql(topology_pks, all_objects)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            pk_list = uniquify([row[1] for row in cursor.fetchall()])
+
+        if not pk_list:
+            return all_objects.filter(pk__in=[])
+        # Return a QuerySet and preserve pk list order
+        return cls._ordered_by_pks(all_objects, pk_list)
+
+    @classmethod
+    def overlapping_many(cls, topologies, all_objects=None):
+        """ Return a mapping of each specified topology pk to the ordered list of
+        pks of topologies overlapping it, computed with a single query.
+        """
+        if all_objects is None:
+            all_objects = cls.objects.existing()
+        if isinstance(topologies, QuerySet):
+            topology_pks = list(topologies.values_list('pk', flat=True))
+        else:
+            topology_pks = [getattr(topology, 'pk', topology) for topology in topologies]
+        result = {pk: [] for pk in topology_pks}
+        if not topology_pks:
+            return result
+
+        sql, params = cls._overlapping_sql(topology_pks, all_objects)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            for source_pk, pk in cursor.fetchall():
+                result[source_pk].append(pk)
+        return {source_pk: uniquify(pks) for source_pk, pks in result.items()}
+
+    @classmethod
+    def _overlapping_sql(cls, topology_pks, all_objects):
+        """ SQL returning (source pk, overlapping pk) rows for the specified topologies,
+        ordered by source and by position along the source.
+        """
+        is_generic = all_objects.model.KIND == Topology.KIND
+        objects_sql, objects_params = all_objects.order_by().values('pk').query.sql_with_params()
         sql = """
-        WITH topologies AS (SELECT id FROM %(topology_table)s WHERE id IN (%(topology_list)s)),
-        -- Concerned aggregations
-             aggregations AS (SELECT * FROM %(aggregations_table)s a, topologies t
-                              WHERE a.topo_object_id = t.id),
-        -- Concerned paths along with (start, end)
-             paths_aggr AS (SELECT a.start_position AS start, a.end_position AS end, p.id, a.order AS order
-                            FROM %(paths_table)s p, aggregations a
-                            WHERE a.path_id = p.id
-                            ORDER BY a.order)
+        -- Concerned aggregations along with (start, end)
+        WITH paths_aggr AS (SELECT a.topo_object_id AS source_id, a.path_id AS id,
+                                   a.start_position AS start, a.end_position AS end, a.order AS order
+                            FROM %(aggregations_table)s a
+                            WHERE a.topo_object_id = ANY(%%s))
         -- Retrieve primary keys
-        SELECT t.id
+        SELECT pa.source_id, t.id
         FROM %(topology_table)s t, %(aggregations_table)s a, paths_aggr pa
         WHERE a.path_id = pa.id AND a.topo_object_id = t.id
           AND least(a.start_position, a.end_position) <= greatest(pa.start, pa.end)
           AND greatest(a.start_position, a.end_position) >= least(pa.start, pa.end)
           AND %(extra_condition)s
-        ORDER BY (pa.order + CASE WHEN pa.start > pa.end THEN (1 - a.start_position) ELSE a.start_position END);
+          AND t.id IN (%(objects_sql)s)
+        ORDER BY pa.source_id,
+                 (pa.order + CASE WHEN pa.start > pa.end THEN (1 - a.start_position) ELSE a.start_position END);
         """ % {
             'topology_table': Topology._meta.db_table,
             'aggregations_table': PathAggregation._meta.db_table,
-            'paths_table': Path._meta.db_table,
-            'topology_list': ','.join(topology_pks),
-            'extra_condition': 'true' if is_generic else "kind = '%s'" % all_objects.model.KIND
+            'extra_condition': 'true' if is_generic else 't.kind = %s',
+            'objects_sql': objects_sql,
         }
+        params = [list(topology_pks)]
+        if not is_generic:
+            params.append(all_objects.model.KIND)
+        return sql, params + list(objects_params)
 
-        cursor = connection.cursor()
-        cursor.execute(sql)
-        result = cursor.fetchall()
-        pk_list = uniquify([row[0] for row in result])
-
-        # Return a QuerySet and preserve pk list order
-        # http://stackoverflow.com/a/1310188/141895
-        ordering = 'CASE %s END' % ' '.join(['WHEN %s.id=%s THEN %s' % (Topology._meta.db_table, id_, i)
-                                             for i, id_ in enumerate(pk_list)])
-        queryset = all_objects.filter(pk__in=pk_list).extra(
-            select={'ordering': ordering}, order_by=('ordering',))
-        return queryset
+    @classmethod
+    def _ordered_by_pks(cls, queryset, pk_list):
+        """ Filter queryset on pk_list, preserving its order """
+        return queryset.filter(pk__in=pk_list).extra(
+            select={'ordering': 'array_position(%%s::integer[], %s.id)' % Topology._meta.db_table},
+            select_params=(pk_list,), order_by=('ordering',))
 
     def mutate(self, other):
         """
@@ -0,0 +1,147 @@
+import heapq
+import threading
+
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.utils.translation import gettext as _
+
+from .graph import CompactGraph, PathGraphStore
+from .models import Path
+
+
+class PathRouter:
+    """
+    Compute shortest routes on the paths network, through a list of steps.
+
+    The graph of non-draft paths is kept in memory (compact arrays, see ``CompactGraph``),
+    once per worker, and rebuilt as soon as a non-draft path is inserted, updated or deleted.
+    """
+    _lock = threading.Lock()
+    _graph = None
+    _graph_token = None
+
+    @classmethod
+    def get_graph(cls):
+        token = PathGraphStore.get_token()
+        with cls._lock:
+            if cls._graph is None or cls._graph_token != token:
+                # Release the previous graph before building the new one
+                cls._graph = None
+                cls._graph = CompactGraph.from_qs(Path.objects.exclude(draft=True))
+                cls._graph_token = token
+            return cls._graph
+
+    def __init__(self):
+        self.graph = self.get_graph()
+
+    def snap(self, lng, lat, snap=None):
+        """
+        Return ``(edge index, position)`` of the closest path to the point (lng, lat) in API_SRID,
+        or on path ``snap`` if given.
+        """
+        point = Point(lng, lat, srid=settings.API_SRID)
+        point.transform(settings.SRID)
+        if snap is None:
+            path = Path.closest(point)
+        else:
+            try:
+                path = Path.objects.exclude(draft=True).get(pk=snap)
+            except Path.DoesNotExist:
+                raise ValueError(_("Unknown path %s") % snap)
+        position, offset = path.interpolate(point)
+        index = self.graph.edge_index(path.pk)
+        if index is None:
+            raise ValueError(_("Unknown path %s") % path.pk)
+        return index, position
+
+    def route(self, steps):
+        """
+        Return the shortest route through ``steps``, a list of dicts with ``lat``, ``lng``
+        and optional ``snap`` (path id) keys, serialized as expected by ``Topology.deserialize``.
+        """
+        if len(steps) < 2:
+            raise ValueError(_("At least two steps are required"))
+        snapped = [self.snap(step['lng'], step['lat'], step.get('snap')) for step in steps]
+        serialized = []
+        for source, target in zip(snapped[:-1], snapped[1:]):
+            segments = self.shortest_path(source, target)
+            if segments is None:
+                raise ValueError(_("No route found between steps"))
+            serialized.append(self.serialize_segments(segments))
+        return serialized
+
+    def shortest_path(self, source, target):
+        """
+        Dijkstra between two points on edges, given as ``(edge index, position)``.
+        Return a list of ``(edge index, start position, end position)`` or ``None``.
+        """
+        graph = self.graph
+        lengths, starts, ends = graph.edge_lengths, graph.edge_starts, graph.edge_ends
+        offsets, neighbours, neighbour_edges = graph.offsets, graph.neighbours, graph.neighbour_edges
+        source_edge, source_position = source
+        target_edge, target_position = target
+
+        best_cost, best_segments = None, None
+        if source_edge == target_edge:
+            best_cost = abs(target_position - source_position) * lengths[source_edge]
+            best_segments = [(source_edge, source_position, target_position)]
+
+        # Remaining cost to the target from the extremities of its edge
+        exits = {}
+        for node, position in ((starts[target_edge], 0.0), (ends[target_edge], 1.0)):
+            cost = abs(target_position - position) * lengths[target_edge]
+            if node not in exits or cost < exits[node][0]:
+                exits[node] = (cost, position)
+
+        costs, previous, heap = {}, {}, []
+        for node, position in ((starts[source_edge], 0.0), (ends[source_edge], 1.0)):
+            cost = abs(source_position - position) * lengths[source_edge]
+            if node not in costs or cost < costs[node]:
+                costs[node] = cost
+                previous[node] = (None, source_edge, position)
+                heapq.heappush(heap, (cost, node))
+
+        while heap:
+            cost, node = heapq.heappop(heap)
+            if best_cost is not None and cost >= best_cost:
+                break
+            if cost > costs[node]:
+                continue
+            if node in exits:
+                exit_cost, exit_position = exits[node]
+                if best_cost is None or cost + exit_cost < best_cost:
+                    best_cost = cost + exit_cost
+                    best_segments = self._segments(previous, node, source, target, exit_position)
+            for i in range(offsets[node], offsets[node + 1]):
+                other, edge = neighbours[i], neighbour_edges[i]
+                other_cost = cost + lengths[edge]
+                if other not in costs or other_cost < costs[other]:
+                    costs[other] = other_cost
+                    previous[other] = (node, edge, None)
+                    heapq.heappush(heap, (other_cost, other))
+        return best_segments
+
+    def _segments(self, previous, node, source, target, exit_position):
+        starts = self.graph.edge_starts
+        segments = [(target[0], exit_position, target[1])]
+        while True:
+            from_node, edge, position = previous[node]
+            if from_node is None:
+                segments.append((source[0], source[1], position))
+                break
+            forward = starts[edge] == from_node
+            segments.append((edge, 0.0 if forward else 1.0, 1.0 if forward else 0.0))
+            node = from_node
+        segments.reverse()
+        return segments
+
+    def serialize_segments(self, segments):
+        """ Serialize a route between two steps as a sub-topology, dropping zero-length segments """
+        kept = [segment for segment in segments if segment[1] != segment[2]] or segments[:1]
+        edge_ids = self.graph.edge_ids
+        return {
+            'offset': 0,
+            'paths': [edge_ids[edge] for edge, start, end in kept],
+            # Javascript hash keys are strings
+            'positions': {str(i): [start, end] for i, (edge, start, end) in enumerate(kept)},
+        }
@@ -0,0 +1,11 @@
+from celery import shared_task
+
+from .deferred import update_dirty_topologies
+
+
+@shared_task(name='geotrek.core.update-dirty-topologies')
+def update_dirty_topologies_task():
+    """
+    celery shared task - recompute geometries of topologies queued by path editions
+    """
+    return update_dirty_topologies()
@@ -149,6 +149,51 @@ END;
 $$ LANGUAGE plpgsql;
 
 
+-------------------------------------------------------------------------------
+-- Deferred update of geometries (queued with geom_need_update flag)
+-------------------------------------------------------------------------------
+
+CREATE FUNCTION {{ schema_geotrek }}.topology_geom_update_mode() RETURNS text AS $$
+    -- '' (immediate), 'commit' or 'worker', set for current transaction by geotrek.core.deferred
+    SELECT COALESCE(current_setting('geotrek.topology_geom_update', TRUE), '');
+$$ LANGUAGE sql STABLE;
+
+
+CREATE FUNCTION {{ schema_geotrek }}.update_dirty_topologies(batch_size integer) RETURNS integer AS $$
+DECLARE
+    topology_id integer;
+    updated integer := 0;
+BEGIN
+    -- Topologies locked by another worker are left to it
+    FOR topology_id IN SELECT id FROM core_topology WHERE geom_need_update
+                       ORDER BY id LIMIT batch_size FOR UPDATE SKIP LOCKED
+    LOOP
+        PERFORM update_geometry_of_topology(topology_id);
+        updated := updated + 1;
+    END LOOP;
+    RETURN updated;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE FUNCTION {{ schema_geotrek }}.update_topology_geom_at_commit() RETURNS trigger SECURITY DEFINER AS $$
+BEGIN
+    -- Queued several times or already updated since
+    IF (SELECT geom_need_update FROM core_topology WHERE id = NEW.id) THEN
+        PERFORM update_geometry_of_topology(NEW.id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE CONSTRAINT TRIGGER core_topology_geom_commit_tgr
+AFTER UPDATE OF geom_need_update ON core_topology
+DEFERRABLE INITIALLY DEFERRED
+FOR EACH ROW
+WHEN (NEW.geom_need_update AND topology_geom_update_mode() = 'commit')
+EXECUTE PROCEDURE update_topology_geom_at_commit();
+
+
 -------------------------------------------------------------------------------
 -- Update geometry when offset change
 -------------------------------------------------------------------------------
@@ -161,6 +206,11 @@ BEGIN
     -- Since the topology to be modified is available in NEW, we could improve
     -- performance with some refactoring.
 
+    IF topology_geom_update_mode() != '' THEN
+        UPDATE core_topology SET geom_need_update = TRUE WHERE id = NEW.id AND NOT geom_need_update;
+        RETURN NULL;
+    END IF;
+
     PERFORM update_geometry_of_topology(NEW.id);
 
     RETURN NULL;
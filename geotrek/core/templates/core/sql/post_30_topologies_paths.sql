@@ -71,9 +71,25 @@ DROP FUNCTION IF EXISTS ft_topologies_paths_geometry_statement() CASCADE;
 
 CREATE FUNCTION {{ schema_geotrek }}.ft_topologies_paths_geometry_statement() RETURNS trigger SECURITY DEFINER AS $$
 DECLARE
+    topology_ids integer[];
     rec record;
 BEGIN
-    FOR rec IN SELECT * FROM core_topology WHERE geom_need_update = TRUE LOOP
+    IF topology_geom_update_mode() != '' THEN
+        -- Queued topologies are updated at commit or by a worker
+        RETURN NULL;
+    END IF;
+
+    -- Only topologies of aggregations changed by this statement: others may be queued for a worker
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(topo_object_id) INTO topology_ids FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(topo_object_id) INTO topology_ids FROM old_rows;
+    ELSE
+        SELECT array_agg(topo_object_id) INTO topology_ids
+        FROM (SELECT topo_object_id FROM new_rows UNION SELECT topo_object_id FROM old_rows) AS changed;
+    END IF;
+
+    FOR rec IN SELECT id FROM core_topology WHERE geom_need_update = TRUE AND id = ANY(topology_ids) LOOP
         PERFORM update_geometry_of_topology(rec.id);
     END LOOP;
 
@@ -81,8 +97,20 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
-CREATE TRIGGER core_pathaggregation_geometry_statement_tgr
-AFTER INSERT OR UPDATE OR DELETE ON core_pathaggregation
+-- Transition tables can only be declared by triggers of a single event
+CREATE TRIGGER core_pathaggregation_geometry_statement_i_tgr
+AFTER INSERT ON core_pathaggregation
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE PROCEDURE ft_topologies_paths_geometry_statement();
+
+CREATE TRIGGER core_pathaggregation_geometry_statement_u_tgr
+AFTER UPDATE ON core_pathaggregation
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE PROCEDURE ft_topologies_paths_geometry_statement();
+
+CREATE TRIGGER core_pathaggregation_geometry_statement_d_tgr
+AFTER DELETE ON core_pathaggregation
+REFERENCING OLD TABLE AS old_rows
 FOR EACH STATEMENT EXECUTE PROCEDURE ft_topologies_paths_geometry_statement();
 
 
@@ -45,14 +45,26 @@ DECLARE
 BEGIN
     -- Geometry of linear topologies are always updated
     -- Geometry of point topologies are updated if offset = 0
-    FOR eid IN SELECT e.id
-               FROM core_pathaggregation et, core_topology e
-               WHERE et.path_id = NEW.id AND et.topo_object_id = e.id
-               GROUP BY e.id, e."offset"
-               HAVING BOOL_OR(et.start_position != et.end_position) OR e."offset" = 0.0
-    LOOP
-        PERFORM update_geometry_of_topology(eid);
-    END LOOP;
+    IF topology_geom_update_mode() != '' THEN
+        -- Queue them, to be updated once at commit or by a worker
+        UPDATE core_topology SET geom_need_update = TRUE
+        WHERE NOT geom_need_update AND id IN (
+            SELECT e.id
+            FROM core_pathaggregation et, core_topology e
+            WHERE et.path_id = NEW.id AND et.topo_object_id = e.id
+            GROUP BY e.id, e."offset"
+            HAVING BOOL_OR(et.start_position != et.end_position) OR e."offset" = 0.0
+        );
+    ELSE
+        FOR eid IN SELECT e.id
+                   FROM core_pathaggregation et, core_topology e
+                   WHERE et.path_id = NEW.id AND et.topo_object_id = e.id
+                   GROUP BY e.id, e."offset"
+                   HAVING BOOL_OR(et.start_position != et.end_position) OR e."offset" = 0.0
+        LOOP
+            PERFORM update_geometry_of_topology(eid);
+        END LOOP;
+    END IF;
 
     -- Special case of point geometries with offset != 0
     FOR eid, egeom IN SELECT e.id, e.geom
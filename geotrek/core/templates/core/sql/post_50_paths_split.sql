@@ -10,6 +10,11 @@ DECLARE
 
     DISTANCE float8;
 BEGIN
+    -- Paths loaded in bulk are already snapped (see loadpaths command)
+    IF current_setting('geotrek.path_bulk_load', TRUE) = 'on' THEN
+        RETURN NEW;
+    END IF;
+
     DISTANCE := {{ PATH_SNAPPING_DISTANCE }};
 
     linestart := ST_StartPoint(NEW.geom);
@@ -103,6 +108,10 @@ DECLARE
     intersections_on_new float8[];
     intersections_on_current float8[];
 BEGIN
+    -- Paths loaded in bulk are already split on each other, and only touch existing paths by extremities
+    IF current_setting('geotrek.path_bulk_load', TRUE) = 'on' THEN
+        RETURN NULL;
+    END IF;
 
     -- Copy original geometry
     newgeom := NEW.geom;
@@ -16,6 +16,10 @@ DROP FUNCTION IF EXISTS topology_latest_updated_d() CASCADE;
 DROP FUNCTION IF EXISTS update_geometry_of_evenement(integer) CASCADE;
 DROP FUNCTION IF EXISTS update_geometry_of_topology(integer) CASCADE;
 
+DROP FUNCTION IF EXISTS topology_geom_update_mode() CASCADE;
+DROP FUNCTION IF EXISTS update_dirty_topologies(integer) CASCADE;
+DROP FUNCTION IF EXISTS update_topology_geom_at_commit() CASCADE;
+
 DROP FUNCTION IF EXISTS update_evenement_geom_when_offset_changes() CASCADE;
 DROP FUNCTION IF EXISTS update_topology_geom_when_offset_changes() CASCADE;
 
@@ -29,6 +33,7 @@ DROP FUNCTION IF EXISTS ft_path_interpolate(integer, geometry) CASCADE;
 
 DROP FUNCTION IF EXISTS ft_evenements_troncons_geometry() CASCADE;
 DROP FUNCTION IF EXISTS ft_topologies_paths_geometry() CASCADE;
+DROP FUNCTION IF EXISTS ft_topologies_paths_geometry_statement() CASCADE;
 
 DROP FUNCTION IF EXISTS ft_evenements_troncons_junction_point_iu() CASCADE;
 DROP FUNCTION IF EXISTS ft_topologies_paths_junction_point_iu() CASCADE;
@@ -231,6 +231,61 @@ class LoadPathsCommandTest(TestCase):
         self.assertEqual(value.name, 'lulu')
         self.assertEqual(value.structure, self.structure)
 
+    @override_settings(SRID=4326, SPATIAL_EXTENT=(-1, 0, 4, 2))
+    def test_load_paths_bulk(self):
+        output = StringIO()
+        call_command('loadpaths', self.filename, '-i', bulk=True, srid=4326, verbosity=2, stdout=output)
+        output = output.getvalue()
+        self.assertEqual(Path.objects.count(), 2)
+        for path in Path.objects.all():
+            self.assertIn('Create path with pk : %s' % path.pk, output)
+            self.assertEqual(path.structure, self.structure)
+        self.assertIn('2 objects created, 0 objects failed', output)
+        self.assertEqual(Path.objects.filter(name='lulu').count(), 1)
+
+    @override_settings(SRID=4326, SPATIAL_EXTENT=(-1, -1, 5, 3))
+    def test_load_paths_bulk_split_loaded_paths(self):
+        filename = os.path.join(os.path.dirname(__file__), 'data', 'crossing_paths.geojson')
+        output = StringIO()
+        call_command('loadpaths', filename, bulk=True, srid=4326, verbosity=2, stdout=output)
+        self.assertIn('2 objects created, 0 objects failed', output.getvalue())
+        self.assertEqual(Path.objects.count(), 4)
+        self.assertEqual(Path.objects.filter(name='horizontal').count(), 2)
+        self.assertEqual(Path.objects.filter(name='vertical').count(), 2)
+        # Every piece ends at the crossing
+        extremities = [{path.geom.coords[0], path.geom.coords[-1]} for path in Path.objects.all()]
+        self.assertEqual(len(set.intersection(*extremities)), 1)
+
+    @override_settings(SRID=4326, SPATIAL_EXTENT=(-1, -1, 5, 3))
+    def test_load_paths_bulk_split_existing_paths(self):
+        path = Path.objects.create(name='existing', geom=LineString((1, 0.5), (1, 1.5), srid=4326))
+        topology = TopologyFactory(paths=[path])
+        filename = os.path.join(os.path.dirname(__file__), 'data', 'crossing_paths.geojson')
+        call_command('loadpaths', filename, bulk=True, srid=4326, verbosity=0)
+        self.assertEqual(Path.objects.filter(name='existing').count(), 2)
+        self.assertEqual(Path.objects.filter(name='horizontal').count(), 3)
+        self.assertEqual(Path.objects.filter(name='vertical').count(), 2)
+        # Run deferred triggers, as done at commit
+        connection.check_constraints()
+        topology.reload()
+        self.assertEqual(topology.paths.count(), 2)
+        self.assertAlmostEqual(topology.geom.length, sum(p.geom.length for p in Path.objects.filter(name='existing')))
+
+    @override_settings(SRID=4326, SPATIAL_EXTENT=(-1, 0, 4, 2))
+    def test_load_paths_bulk_dry(self):
+        output = StringIO()
+        call_command('loadpaths', self.filename, '-i', bulk=True, dry=True, verbosity=2, stdout=output)
+        self.assertIn('2 objects will be create, 0 objects failed;', output.getvalue())
+        self.assertEqual(Path.objects.count(), 0)
+
+    @override_settings(SRID=4326, SPATIAL_EXTENT=(-1, 0, 4, 2))
+    def test_load_paths_bulk_fail_with_dry(self):
+        filename = os.path.join(os.path.dirname(__file__), 'data', 'bad_path.geojson')
+        output = StringIO()
+        call_command('loadpaths', filename, '-i', bulk=True, dry=True, verbosity=2, stdout=output)
+        self.assertIn('0 objects will be create, 1 objects failed;', output.getvalue())
+        self.assertEqual(Path.objects.count(), 0)
+
 
 @skipIf(not settings.TREKKING_TOPOLOGY_ENABLED, 'Test with dynamic segmentation only')
 class ReorderTopologiesPathAggregationTest(TestCase):
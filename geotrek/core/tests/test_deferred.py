@@ -0,0 +1,80 @@
+from unittest import mock, skipIf
+
+from django.conf import settings
+from django.contrib.gis.geos import LineString
+from django.db import connection
+from django.test import TestCase
+
+from geotrek.core.deferred import deferred_topologies_update, topologies_update_status, update_dirty_topologies
+from geotrek.core.tests.factories import PathFactory, TopologyFactory
+
+
+@skipIf(not settings.TREKKING_TOPOLOGY_ENABLED, 'Test with dynamic segmentation only')
+class DeferredTopologiesUpdateTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.path = PathFactory(geom=LineString((0, 0), (10, 0), srid=settings.SRID))
+        cls.topology = TopologyFactory(paths=[cls.path])
+        cls.moved = LineString((0, 0), (20, 0), srid=settings.SRID)
+
+    def move_path(self, mode):
+        with deferred_topologies_update(mode):
+            self.path.geom = self.moved
+            self.path.save()
+        self.topology.reload()
+
+    def test_immediate_update(self):
+        self.move_path(None)
+        self.assertEqual(self.topology.geom, self.moved)
+        self.assertEqual(topologies_update_status()['pending'], 0)
+
+    def test_update_at_commit(self):
+        self.move_path('commit')
+        self.assertNotEqual(self.topology.geom, self.moved)
+        self.assertEqual(topologies_update_status()['pending'], 1)
+        # Run deferred triggers, as done at commit
+        connection.check_constraints()
+        self.topology.reload()
+        self.assertEqual(self.topology.geom, self.moved)
+        self.assertEqual(topologies_update_status()['pending'], 0)
+
+    def test_update_by_worker(self):
+        with mock.patch('geotrek.core.tasks.update_dirty_topologies_task.delay') as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.move_path('worker')
+        delay.assert_called_once_with()
+        self.assertNotEqual(self.topology.geom, self.moved)
+        self.assertEqual(topologies_update_status()['pending'], 1)
+        self.assertEqual(update_dirty_topologies(), 1)
+        self.topology.reload()
+        self.assertEqual(self.topology.geom, self.moved)
+        self.assertEqual(topologies_update_status()['pending'], 0)
+
+    def test_mode_is_reset_after_block(self):
+        self.move_path('worker')
+        self.path.geom = LineString((0, 0), (30, 0), srid=settings.SRID)
+        self.path.save()
+        self.topology.reload()
+        self.assertEqual(self.topology.geom, self.path.geom)
+
+    def test_queue_left_to_worker_by_immediate_updates(self):
+        self.move_path('worker')
+        other_path = PathFactory(geom=LineString((0, 10), (10, 10), srid=settings.SRID))
+        other_topology = TopologyFactory(paths=[other_path])
+        other_topology.reload()
+        self.assertEqual(other_topology.geom, other_path.geom)
+        # Only topologies changed by the statement are updated, not those queued for the worker
+        self.topology.reload()
+        self.assertNotEqual(self.topology.geom, self.moved)
+        self.assertEqual(topologies_update_status()['pending'], 1)
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            with deferred_topologies_update('later'):
+                pass
+
+    def test_status_api(self):
+        self.move_path('worker')
+        response = self.client.get('/api/path/drf/paths/topologies_status.json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'mode': None, 'pending': 1})
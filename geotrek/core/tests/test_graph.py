@@ -1,12 +1,14 @@
-from unittest import skipIf
+from datetime import timedelta
+from unittest import mock, skipIf
 
 from django.conf import settings
 from django.contrib.gis.geos import LineString
-from django.test import TestCase
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase
 from django.urls import reverse
 from mapentity.tests.factories import UserFactory
 
-from geotrek.core.graph import graph_edges_nodes_of_qs
+from geotrek.core.graph import CompactGraph, PathGraphStore, graph_edges_nodes_of_qs
 from geotrek.core.models import Path
 from geotrek.core.tests.factories import PathFactory
 
@@ -96,3 +98,150 @@ class SimpleGraph(TestCase):
         PathFactory(geom=LineString((0, 0), (1, 1)))
         response = self.client.get(self.url)
         self.assertNotEqual(response['Cache-Control'], None)
+
+
+class CompactGraphTest(SimpleTestCase):
+    def test_serialize(self):
+        graph = CompactGraph([
+            (10, 1.0, 1., 1., 2., 2.),
+            (11, float('nan'), 2., 2., 3., 3.),
+            (12, None, 1., 1., 2., 2.),
+        ])
+        self.assertEqual(graph.node_count, 3)
+        self.assertEqual(graph.node_key(2), (3., 3.))
+        self.assertDictEqual(graph.serialize(), {
+            'nodes': {
+                1: {2: 12},
+                2: {1: 12, 3: 11},
+                3: {2: 11},
+            },
+            'edges': {
+                10: {'id': 10, 'length': 1.0, 'nodes_id': [1, 2]},
+                11: {'id': 11, 'length': 0.0, 'nodes_id': [2, 3]},
+                12: {'id': 12, 'length': 0.0, 'nodes_id': [1, 2]},
+            }
+        })
+
+    def test_serialize_empty(self):
+        self.assertDictEqual(CompactGraph([]).serialize(), {'edges': {}, 'nodes': {}})
+
+
+@skipIf(not settings.TREKKING_TOPOLOGY_ENABLED, 'Test with dynamic segmentation only')
+class GraphStoreTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.url = reverse('core:path-drf-graph')
+
+    def setUp(self):
+        caches['fat'].clear()
+        self.client.force_login(user=self.user)
+
+    def test_graph_version_header(self):
+        PathFactory(geom=LineString((0, 0), (1, 1)))
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('X-Graph-Version', response)
+
+    def test_graph_patched_when_path_added(self):
+        path_1 = PathFactory(geom=LineString((0, 0), (1, 1)))
+        version_1, graph = PathGraphStore().get_graph()
+        self.assertEqual(list(graph['edges']), [path_1.pk])
+        path_2 = PathFactory(geom=LineString((1, 1), (2, 2)))
+        version_2, graph = PathGraphStore().get_graph()
+        self.assertEqual(version_2, version_1 + 1)
+        self.assertEqual(graph['edges'][path_2.pk]['nodes_id'], [2, 3])
+        self.assertDictEqual(graph['nodes'][2], {1: path_1.pk, 3: path_2.pk})
+
+    def test_graph_patched_when_path_deleted(self):
+        path_1 = PathFactory(geom=LineString((0, 0), (1, 1)))
+        path_2 = PathFactory(geom=LineString((1, 1), (2, 2)))
+        PathGraphStore().get_graph()
+        path_2.delete()
+        version, graph = PathGraphStore().get_graph()
+        self.assertEqual(list(graph['edges']), [path_1.pk])
+        self.assertDictEqual(graph['nodes'], {1: {2: path_1.pk}, 2: {1: path_1.pk}})
+
+    def test_graph_parallel_edge_restored(self):
+        path_1 = PathFactory(geom=LineString((0, 0), (1, 1)))
+        path_2 = PathFactory(geom=LineString((0, 0), (0, 1), (1, 1)))
+        PathGraphStore().get_graph()
+        path_2.delete()
+        version, graph = PathGraphStore().get_graph()
+        self.assertDictEqual(graph['nodes'], {1: {2: path_1.pk}, 2: {1: path_1.pk}})
+
+    def test_graph_patched_when_path_committed_late(self):
+        PathFactory(geom=LineString((0, 0), (1, 1)))
+        path_2 = PathFactory(geom=LineString((1, 1), (2, 2)))
+        store = PathGraphStore()
+        store.get_graph()
+        # path_2 committed by a longer transaction, dated before the cached state
+        state = store.cache.get(store.cache_key)
+        store._remove_edge(state, path_2.pk)
+        state['token']['last_update'] += timedelta(minutes=1)
+        store.cache.set(store.cache_key, state)
+        PathFactory(geom=LineString((2, 2), (3, 3)))
+        version, graph = store.get_graph()
+        self.assertIn(path_2.pk, graph['edges'])
+
+    def test_graph_not_patched_while_locked(self):
+        PathFactory(geom=LineString((0, 0), (1, 1)))
+        store = PathGraphStore()
+        version_1, graph = store.get_graph()
+        PathFactory(geom=LineString((1, 1), (2, 2)))
+        store.cache.add('path_graph_store_lock', True)
+        with mock.patch('geotrek.core.graph.time.sleep', side_effect=lambda delay: store.cache.delete('path_graph_store_lock')) as sleep, \
+                mock.patch.object(store, 'patch', wraps=store.patch) as patch:
+            version_2, graph = store.get_graph()
+        sleep.assert_called_once()
+        patch.assert_called_once()
+        self.assertEqual(version_2, version_1 + 1)
+
+    def test_paths_not_queried_while_locked(self):
+        PathFactory(geom=LineString((0, 0), (1, 1)))
+        store = PathGraphStore()
+        store.get_graph()
+        PathFactory(geom=LineString((1, 1), (2, 2)))
+        store.cache.add('path_graph_store_lock', True)
+        polls = []
+
+        def sleep(delay):
+            polls.append(delay)
+            if len(polls) == 3:
+                store.cache.delete('path_graph_store_lock')
+
+        with mock.patch('geotrek.core.graph.time.sleep', side_effect=sleep), \
+                mock.patch.object(store, 'get_token', wraps=store.get_token) as get_token:
+            store.get_graph()
+        self.assertEqual(len(polls), 3)
+        # Once before waiting, once after the lock is released
+        self.assertEqual(get_token.call_count, 2)
+
+    def test_json_graph_delta(self):
+        path_1 = PathFactory(geom=LineString((0, 0), (1, 1)))
+        response = self.client.get(self.url)
+        version = response['X-Graph-Version']
+        path_2 = PathFactory(geom=LineString((1, 1), (2, 2)))
+        path_1.draft = True
+        path_1.save()
+        response = self.client.get(self.url, {'since': version})
+        self.assertEqual(response.status_code, 200)
+        delta = response.json()
+        self.assertFalse(delta['full'])
+        self.assertEqual(delta['version'], int(version) + 1)
+        self.assertEqual(list(delta['edges']), [str(path_2.pk)])
+        self.assertEqual(delta['deleted_edges'], [path_1.pk])
+        self.assertEqual(delta['deleted_nodes'], [1])
+        self.assertDictEqual(delta['nodes'], {'2': {'3': path_2.pk}, '3': {'2': path_2.pk}})
+
+    def test_json_graph_delta_unknown_version(self):
+        path = PathFactory(geom=LineString((0, 0), (1, 1)))
+        response = self.client.get(self.url, {'since': 0})
+        self.assertEqual(response.status_code, 200)
+        delta = response.json()
+        self.assertTrue(delta['full'])
+        self.assertEqual(list(delta['edges']), [str(path.pk)])
+
+    def test_json_graph_delta_invalid_version(self):
+        response = self.client.get(self.url, {'since': 'foo'})
+        self.assertEqual(response.status_code, 400)
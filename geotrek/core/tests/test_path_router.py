@@ -0,0 +1,93 @@
+import json
+from unittest import skipIf
+
+from django.conf import settings
+from django.contrib.gis.geos import LineString, Point
+from django.test import TestCase
+from django.urls import reverse
+from mapentity.tests.factories import UserFactory
+
+from geotrek.core.models import Topology
+from geotrek.core.path_router import PathRouter
+from geotrek.core.tests.factories import PathFactory
+
+
+def step(x, y):
+    point = Point(x, y, srid=settings.SRID).transform(settings.API_SRID, clone=True)
+    return {'lng': point.x, 'lat': point.y}
+
+
+@skipIf(not settings.TREKKING_TOPOLOGY_ENABLED, 'Test with dynamic segmentation only')
+class PathRouterTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.path_1 = PathFactory(geom=LineString((0, 0), (100, 0)))
+        cls.path_2 = PathFactory(geom=LineString((100, 0), (200, 0)))
+        cls.path_3 = PathFactory(geom=LineString((200, 0), (300, 0)))
+        cls.detour = PathFactory(geom=LineString((0, 0), (0, 500), (200, 500), (200, 0)))
+
+    def test_route_two_steps(self):
+        serialized = PathRouter().route([step(50, 0), step(250, 0)])
+        self.assertEqual(len(serialized), 1)
+        self.assertEqual(serialized[0]['paths'], [self.path_1.pk, self.path_2.pk, self.path_3.pk])
+        positions = serialized[0]['positions']
+        self.assertAlmostEqual(positions['0'][0], 0.5)
+        self.assertEqual(positions['0'][1], 1.0)
+        self.assertEqual(positions['1'], [0.0, 1.0])
+        self.assertEqual(positions['2'][0], 0.0)
+        self.assertAlmostEqual(positions['2'][1], 0.5)
+
+    def test_route_backwards(self):
+        serialized = PathRouter().route([step(150, 0), step(50, 0)])
+        self.assertEqual(serialized[0]['paths'], [self.path_2.pk, self.path_1.pk])
+        positions = serialized[0]['positions']
+        self.assertEqual(positions['0'][1], 0.0)
+        self.assertEqual(positions['1'][0], 1.0)
+
+    def test_route_same_path(self):
+        serialized = PathRouter().route([step(80, 0), step(20, 0)])
+        self.assertEqual(serialized[0]['paths'], [self.path_1.pk])
+        self.assertAlmostEqual(serialized[0]['positions']['0'][0], 0.8)
+        self.assertAlmostEqual(serialized[0]['positions']['0'][1], 0.2)
+
+    def test_route_via_step_deserialized(self):
+        serialized = PathRouter().route([step(50, 0), step(150, 0), step(250, 0)])
+        self.assertEqual(len(serialized), 2)
+        self.assertEqual(serialized[0]['paths'], [self.path_1.pk, self.path_2.pk])
+        self.assertEqual(serialized[1]['paths'], [self.path_2.pk, self.path_3.pk])
+        topology = Topology.deserialize(json.dumps(serialized))
+        self.assertEqual(topology.kind, 'TMP')
+
+    def test_graph_rebuilt_when_path_changes(self):
+        graph = PathRouter.get_graph()
+        self.assertIs(PathRouter.get_graph(), graph)
+        PathFactory(geom=LineString((300, 0), (400, 0)))
+        self.assertIsNot(PathRouter.get_graph(), graph)
+
+    def test_route_needs_two_steps(self):
+        with self.assertRaises(ValueError):
+            PathRouter().route([step(50, 0)])
+
+
+@skipIf(not settings.TREKKING_TOPOLOGY_ENABLED, 'Test with dynamic segmentation only')
+class PathRouteViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.path = PathFactory(geom=LineString((0, 0), (100, 0)))
+        cls.url = reverse('core:path-drf-route')
+
+    def test_route_requires_login(self):
+        response = self.client.post(self.url, {'steps': [step(20, 0), step(80, 0)]}, content_type='application/json')
+        self.assertIn(response.status_code, (401, 403))
+
+    def test_route(self):
+        self.client.force_login(self.user)
+        response = self.client.post(self.url, {'steps': [step(20, 0), step(80, 0)]}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['paths'], [self.path.pk])
+
+    def test_route_invalid_steps(self):
+        self.client.force_login(self.user)
+        response = self.client.post(self.url, {'steps': [{'lat': 'foo'}]}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
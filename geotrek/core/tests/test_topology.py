@@ -902,3 +902,22 @@ class TopologyOverlappingTest(TestCase):
         from geotrek.trekking.models import Trek
         overlaps = Topology.overlapping(Trek.objects.all())
         self.assertEqual(list(overlaps), [])
+
+    def test_overlapping_many(self):
+        overlaps = Topology.overlapping_many([self.topo1, self.topo2])
+        self.assertEqual(overlaps, {
+            self.topo1.pk: [self.topo1.pk, self.point2.pk, self.point3.pk, self.point1.pk, self.topo2.pk],
+            self.topo2.pk: [self.topo2.pk, self.point1.pk, self.point3.pk, self.point2.pk, self.topo1.pk],
+        })
+
+    def test_overlapping_many_filtered_by_all_objects(self):
+        overlaps = Topology.overlapping_many(
+            Topology.objects.filter(pk=self.topo2.pk),
+            all_objects=Topology.objects.exclude(pk=self.point3.pk)
+        )
+        self.assertEqual(overlaps, {
+            self.topo2.pk: [self.topo2.pk, self.point1.pk, self.point2.pk, self.topo1.pk],
+        })
+
+    def test_overlapping_many_empty(self):
+        self.assertEqual(Topology.overlapping_many([]), {})
@@ -15,6 +15,7 @@ from mapentity.tests.factories import UserFactory
 from geotrek.authent.tests.base import AuthentFixturesTest
 from geotrek.authent.tests.factories import PathManagerFactory, StructureFactory
 from geotrek.common.tests import CommonTest
+from geotrek.common.viewsets import GeotrekMapentityViewSet
 from geotrek.core.models import Path, PathSource, Trail
 from geotrek.core.tests.factories import (
     ComfortFactory,
@@ -565,6 +566,35 @@ class PathViewsTest(CommonTest):
         response = self.client.get(obj.get_layer_url(), {"_no_draft": "true"})
         self.assertEqual(len(response.json()['features']), 2)
 
+    def test_path_layer_tiles(self):
+        obj = self.modelfactory(draft=False)
+        url = obj.get_layer_url().replace('.geojson', '/tiles/0/0/0.mvt')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/vnd.mapbox-vector-tile')
+        self.assertTrue(response.content)
+        # Served from cache until layer changes
+        with mock.patch.object(GeotrekMapentityViewSet, 'get_tile') as get_tile:
+            self.assertEqual(self.client.get(url).content, response.content)
+        get_tile.assert_not_called()
+        self.modelfactory(draft=False)
+        with mock.patch.object(GeotrekMapentityViewSet, 'get_tile', return_value=b'tile') as get_tile:
+            self.assertEqual(self.client.get(url).content, b'tile')
+        get_tile.assert_called_once_with(0, 0, 0)
+        self.assertEqual(self.client.get(obj.get_layer_url().replace('.geojson', '/tiles/1/2/0.mvt')).status_code, 404)
+
+    def test_draft_path_layer_tiles(self):
+        obj = self.modelfactory(draft=True)
+        url = obj.get_layer_url().replace('.geojson', '/tiles/0/0/0.mvt')
+        self.assertTrue(self.client.get(url).content)
+        self.assertEqual(self.client.get(url, {"_no_draft": "true"}).content, b'')
+
+    def test_path_layer_tiles_permission(self):
+        obj = self.modelfactory()
+        self.client.logout()
+        response = self.client.get(obj.get_layer_url().replace('.geojson', '/tiles/0/0/0.mvt'))
+        self.assertEqual(response.status_code, 403)
+
     def test_draft_path_layer_cache(self):
         """
 
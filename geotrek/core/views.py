@@ -5,7 +5,6 @@ from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import permission_required
 from django.contrib.gis.db.models.functions import Transform
-from django.core.cache import caches
 from django.db.models import Sum, Prefetch
 from django.http import HttpResponseRedirect
 from django.http.response import HttpResponse
@@ -20,6 +19,7 @@ from django.views.generic.detail import BaseDetailView
 from mapentity.serializers import GPXSerializer
 from mapentity.views import (MapEntityList, MapEntityDetail, MapEntityDocument, MapEntityCreate, MapEntityUpdate,
                              MapEntityDelete, MapEntityFormat, LastModifiedMixin)
+from rest_framework import permissions
 from rest_framework.decorators import action
 from rest_framework.renderers import JSONRenderer, BrowsableAPIRenderer
 from rest_framework.response import Response
@@ -30,10 +30,13 @@ from geotrek.common.mixins.views import CustomColumnsMixin
 from geotrek.common.mixins.forms import FormsetMixin
 from geotrek.common.permissions import PublicOrReadPermMixin
 from geotrek.common.viewsets import GeotrekMapentityViewSet
+from geotrek.zoning.views import ZoningFormatMixin
 from . import graph as graph_lib
+from .deferred import topologies_update_status
 from .filters import PathFilterSet, TrailFilterSet
 from .forms import PathForm, TrailForm, CertificationTrailFormSet
 from .models import AltimetryMixin, Path, Trail, Topology, CertificationTrail
+from .path_router import PathRouter
 from .serializers import PathSerializer, PathGeojsonSerializer, TrailSerializer, TrailGeojsonSerializer
 
 logger = logging.getLogger(__name__)
@@ -254,9 +257,9 @@ class PathViewSet(GeotrekMapentityViewSet):
 
     def get_queryset(self):
         qs = self.model.objects.all()
+        if self.format_kwarg in ('geojson', 'mvt') and self.request.GET.get('_no_draft'):
+            qs = qs.exclude(draft=True)
         if self.format_kwarg == 'geojson':
-            if self.request.GET.get('_no_draft'):
-                qs = qs.exclude(draft=True)
             # get display name if name is undefined to display tooltip on map feature hover
             # Can't use annotate because it doesn't allow to use a model field name
             # Can't use Case(When) in qs.extra
@@ -281,24 +284,45 @@ class PathViewSet(GeotrekMapentityViewSet):
     @method_decorator(cache_last_modified(lambda x: Path.no_draft_latest_updated()))
     @action(methods=['GET'], detail=False, url_path='graph.json', renderer_classes=[JSONRenderer, BrowsableAPIRenderer])
     def graph(self, request, *args, **kwargs):
-        """ Return a graph of the path. """
-        cache = caches['fat']
-        key = 'path_graph_json'
+        """ Return a graph of the path.
 
-        result = cache.get(key)
-        latest = Path.no_draft_latest_updated()
-
-        if result and latest:
-            cache_latest, graph = result
-            # Not empty and still valid
-            if cache_latest and cache_latest >= latest:
-                return Response(graph)
-
-        # cache does not exist or is not up-to-date, rebuild the graph and cache it
-        graph = graph_lib.graph_edges_nodes_of_qs(Path.objects.exclude(draft=True))
-
-        cache.set(key, (latest, graph))
-        return Response(graph)
+        With ``?since=<version>``, only return edges and nodes changed since this version.
+        """
+        store = graph_lib.PathGraphStore()
+        since = request.GET.get('since')
+        if since is not None:
+            try:
+                since = int(since)
+            except ValueError:
+                return Response({'since': _("Invalid graph version")}, status=400)
+            return Response(store.delta(since))
+
+        version, graph = store.get_graph()
+        return Response(graph, headers={'X-Graph-Version': version})
+
+    @action(methods=['GET'], detail=False, url_path='topologies_status', renderer_classes=[JSONRenderer])
+    def topologies_status(self, request, *args, **kwargs):
+        """ Return the number of topologies waiting for their geometry to be updated after path editions """
+        return Response(topologies_update_status())
+
+    @action(methods=['POST'], detail=False, url_path='route.json', renderer_classes=[JSONRenderer],
+            permission_classes=[permissions.IsAuthenticated])
+    def route(self, request, *args, **kwargs):
+        """ Return the shortest route through steps, serialized as a topology.
+
+        Expects ``{"steps": [{"lat": ..., "lng": ..., "snap": <optional path id>}, ...]}``.
+        """
+        try:
+            steps = [
+                {'lat': float(step['lat']), 'lng': float(step['lng']), 'snap': step.get('snap')}
+                for step in request.data['steps']
+            ]
+            topology = PathRouter().route(steps)
+        except IndexError:
+            return Response({'error': _("No path found")}, status=400)
+        except (KeyError, TypeError, ValueError) as exc:
+            return Response({'error': '%s' % exc}, status=400)
+        return Response(topology)
 
     @method_decorator(permission_required('core.change_path'))
     @action(methods=['POST'], detail=False, renderer_classes=[JSONRenderer])
@@ -349,7 +373,7 @@ class TrailList(CustomColumnsMixin, MapEntityList):
     searchable_columns = ['id', 'name', 'departure', 'arrival', ]
 
 
-class TrailFormatList(MapEntityFormat, TrailList):
+class TrailFormatList(ZoningFormatMixin, MapEntityFormat, TrailList):
     mandatory_columns = ['id']
     default_extra_columns = [
         'structure', 'name', 'comments',
@@ -9,6 +9,7 @@ from geotrek.common.mixins.views import CompletenessMixin, CustomColumnsMixin
 from geotrek.common.views import DocumentPublic, DocumentBookletPublic, MarkupPublic
 from geotrek.common.viewsets import GeotrekMapentityViewSet
 from geotrek.trekking.views import FlattenPicturesMixin
+from geotrek.zoning.views import ZoningFormatMixin
 from .filters import DiveFilterSet
 from .forms import DiveForm
 from .models import Dive
@@ -24,7 +25,7 @@ class DiveList(CustomColumnsMixin, FlattenPicturesMixin, MapEntityList):
     searchable_columns = ['id', 'name']
 
 
-class DiveFormatList(MapEntityFormat, DiveList):
+class DiveFormatList(ZoningFormatMixin, MapEntityFormat, DiveList):
     mandatory_columns = ['id']
     default_extra_columns = [
         'eid', 'structure', 'name', 'departure',
@@ -6,6 +6,7 @@ from hashlib import md5
 
 import requests
 from django.conf import settings
+from django.utils.functional import cached_property
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +23,15 @@ class SuricateRequestManager:
     USE_AUTH = None
     AUTH = None
 
+    @cached_property
+    def session(self):
+        """ HTTP session, keeping connections to Suricate alive between requests """
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(settings.SURICATE_DOCUMENTS_WORKERS, 1))
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
     def check_response_integrity(self, response):
         if response.status_code not in [200, 201]:
             raise Exception(
@@ -58,12 +68,12 @@ class SuricateRequestManager:
         encoded_url_params = urllib.parse.urlencode(all_url_params)
         # If HTTP Auth required, add to request
         if self.USE_AUTH:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.URL}{endpoint}?{encoded_url_params}",
                 auth=self.AUTH,
             )
         else:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.URL}{endpoint}?{encoded_url_params}",
             )
         return response
@@ -100,13 +110,13 @@ class SuricateRequestManager:
     def post_suricate(self, endpoint, params=None):
         # If HTTP Auth required, add to request
         if self.USE_AUTH:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.URL}{endpoint}",
                 params,
                 auth=self.AUTH,
             )
         else:
-            response = requests.post(f"{self.URL}{endpoint}", params)
+            response = self.session.post(f"{self.URL}{endpoint}", params)
         self.check_response_integrity(response)
 
     def post_or_retry_to_suricate(self, endpoint, params=None):
@@ -118,12 +128,12 @@ class SuricateRequestManager:
 
     def get_attachment_from_suricate(self, url):
         if self.USE_AUTH:
-            response = requests.get(
+            response = self.session.get(
                 url,
                 auth=self.AUTH,
             )
         else:
-            response = requests.get(
+            response = self.session.get(
                 url,
             )
         if response.status_code not in [200, 201]:
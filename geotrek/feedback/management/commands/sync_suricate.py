@@ -1,13 +1,18 @@
 import logging
+import zlib
 
 from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db import connection
 
 from geotrek.feedback.helpers import SuricateStandardRequestManager, SuricateGestionRequestManager
 from geotrek.feedback.parsers import SuricateParser
 
 logger = logging.getLogger(__name__)
 
+# Key of the PostgreSQL advisory lock preventing concurrent synchronizations
+LOCK_KEY = zlib.crc32(b"geotrek.feedback.sync_suricate")
+
 
 class Command(BaseCommand):
     leave_locale_alone = True
@@ -50,25 +55,39 @@ class Command(BaseCommand):
         )
 
     def handle(self, *args, **options):
+        if not settings.SURICATE_WORKFLOW_ENABLED:
+            logger.error("To use this command, please activate setting SURICATE_WORKFLOW_ENABLED.")
+            return
+        if options['test']:
+            self.test_suricate_connection()
+            return
+        # Runs started (by cron) while previous one is not finished are skipped
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", [LOCK_KEY])
+            if not cursor.fetchone()[0]:
+                logger.warning("Suricate synchronization is already running")
+                return
+        try:
+            self.synchronize(options)
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", [LOCK_KEY])
+
+    def synchronize(self, options):
         verbosity = options['verbosity']
-        if settings.SURICATE_WORKFLOW_ENABLED:
-            parser = SuricateParser()
-            has_no_params = not (options["statuses"] | options["activities"] | options["test"])
-            report = options["report"]
-            no_notification = options["no_notif"]
-            if options['test']:
-                self.test_suricate_connection()
-            elif report is not None:
-                parser.get_alert(verbosity, report)
-            else:
-                if options["activities"] or has_no_params:
-                    parser.get_activities()
-                if options["statuses"] or has_no_params:
-                    parser.get_statuses()
-                if has_no_params:
-                    parser.get_alerts(verbosity=verbosity, should_notify=not (no_notification))
+        parser = SuricateParser()
+        has_no_params = not (options["statuses"] | options["activities"])
+        report = options["report"]
+        no_notification = options["no_notif"]
+        if report is not None:
+            parser.get_alert(verbosity, report)
         else:
-            logger.error("To use this command, please activate setting SURICATE_WORKFLOW_ENABLED.")
+            if options["activities"] or has_no_params:
+                parser.get_activities()
+            if options["statuses"] or has_no_params:
+                parser.get_statuses()
+            if has_no_params:
+                parser.get_alerts(verbosity=verbosity, should_notify=not (no_notification))
 
     def test_suricate_connection(self):
         self.stdout.write("API Standard :")
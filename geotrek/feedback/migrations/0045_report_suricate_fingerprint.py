@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback', '0044_auto_20240619_0810'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='suricate_fingerprint',
+            field=models.CharField(blank=True, default='', editable=False, max_length=32),
+        ),
+    ]
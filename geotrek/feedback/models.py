@@ -191,6 +191,8 @@ class Report(GeotrekMapEntityMixin, PicturesMixin, TimeStampedModelMixin, NoDele
     sync_errors = models.IntegerField(verbose_name=_("Synchronisation error"), default=0, help_text=_("Synchronisation with Suricate is currently pending due to connection problems"))
     mail_errors = models.IntegerField(verbose_name=_("Mail error"), default=0, help_text=_("A notification email could not be sent. Please contact an administrator"))
     provider = models.CharField(verbose_name=_("Provider"), db_index=True, max_length=1024, blank=True)
+    # Fingerprint of report data in Suricate when last synchronized, to skip unchanged reports
+    suricate_fingerprint = models.CharField(max_length=32, blank=True, default="", editable=False)
 
     objects = ReportManager()
 
@@ -1,8 +1,11 @@
+import json
 import logging
 import os
 import traceback
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from hashlib import md5
 from urllib.parse import urlparse
 
 from django.conf import settings
@@ -31,6 +34,9 @@ class SuricateParser(SuricateGestionRequestManager):
         self.bbox = Polygon.from_bbox(settings.SPATIAL_EXTENT)
         self.filetype, created = FileType.objects.get_or_create(type="Photographie", structure=None)
         self.creator, created = get_user_model().objects.get_or_create(username='import', defaults={'is_active': False})
+        self.fingerprints = {}
+        self.new_fingerprints = {}
+        self.documents = {}
 
     def parse_date(self, date):
         """Parse datetime string from Suricate Rest API"""
@@ -77,6 +83,13 @@ class SuricateParser(SuricateGestionRequestManager):
         Parse a JSON report from Suricate API
         :return: returns True if and only if this report is imported (it is in bbox) and is new
         """
+        # Skip reports unchanged since last synchronization
+        fingerprint = md5(json.dumps(report, sort_keys=True).encode()).hexdigest()
+        pk, last_fingerprint = self.fingerprints.get(report["uid"], (None, None))
+        if fingerprint == last_fingerprint:
+            self.to_delete.discard(pk)
+            return 0
+
         # Parse geom
         rep_gps = Point(report["gpslongitude"], report["gpslatitude"], srid=4326)
         rep_srid = rep_gps.transform(settings.SRID, clone=True)
@@ -145,6 +158,8 @@ class SuricateParser(SuricateGestionRequestManager):
                 )
             else:
                 self.to_delete.discard(report_obj.pk)
+            # Saved once its documents are downloaded
+            self.new_fingerprints[report_obj.pk] = fingerprint
 
             # Parse documents attached to report
             self.create_documents(report["documents"], report_obj)
@@ -155,14 +170,17 @@ class SuricateParser(SuricateGestionRequestManager):
             return report_obj.pk if created else 0
 
     def before_get_alerts(self, verbosity=1):
-        pk_and_uuid = Report.objects.values_list('pk', 'external_uuid')
+        pk_and_uuid = Report.objects.values_list('pk', 'external_uuid', 'suricate_fingerprint')
         if pk_and_uuid:
-            pks, uuids = zip(*pk_and_uuid)
+            pks, uuids, fingerprints = zip(*pk_and_uuid)
             self.existing_uuids = list(map(lambda x: "".join(str(x).upper().rsplit("-", 1)), uuids))  # Format UUIDs as they are found in Suricate
             self.to_delete = set(pks)
+            self.fingerprints = {uuid: (pk, fingerprint)
+                                 for pk, uuid, fingerprint in zip(pks, self.existing_uuids, fingerprints) if fingerprint}
         else:
             self.existing_uuids = []
             self.to_delete = set()
+            self.fingerprints = {}
         if verbosity >= 1:
             logger.info("Starting reports parsing from Suricate\n")
 
@@ -187,7 +205,9 @@ class SuricateParser(SuricateGestionRequestManager):
             logger.info(f"Processing report {report['uid']}\n")
         self.before_get_alerts(verbosity)
         self.to_delete = set()
+        self.fingerprints = {}
         report_created = self.parse_report(report)
+        self.download_documents()
         if verbosity >= 1:
             logger.info(f"Created : {report_created}")
 
@@ -209,6 +229,7 @@ class SuricateParser(SuricateGestionRequestManager):
             if report_created:
                 reports_created.add(report_created)
             current_report += 1
+        self.download_documents()
         if verbosity >= 1:
             logger.info(f"Parsed {total_reports} reports from Suricate\n")
         if settings.SURICATE_WORKFLOW_SETTINGS.get("SKIP_MANAGER_MODERATION"):
@@ -216,7 +237,7 @@ class SuricateParser(SuricateGestionRequestManager):
         self.after_get_alerts(reports_created, should_notify)
 
     def create_documents(self, documents, parent):
-        """Parse documents list from Suricate Rest API"""
+        """Parse documents list from Suricate Rest API, their files are downloaded by ``download_documents``"""
         for document in documents:
 
             file_id = document["id"]
@@ -243,14 +264,42 @@ class SuricateParser(SuricateGestionRequestManager):
                 continue
 
             if parsed_url.scheme in ('http', 'https'):
-                response = self.get_attachment_from_suricate(file_url)
+                self.documents.setdefault(attachment.pk, (attachment, attachment_final_name, file_url, parent.pk))
+
+    def download_document(self, document):
+        """Download file of a parsed document, in a thread. Returns the response, or None on error"""
+        file_url = document[2]
+        try:
+            return self.get_attachment_from_suricate(file_url)
+        except Exception as e:
+            logger.error(f"Could not download image : {file_url} \n{e}\n{traceback.format_exc()}")
+            return None
+
+    def download_documents(self):
+        """Download files of parsed documents with a pool of ``SURICATE_DOCUMENTS_WORKERS`` threads"""
+        documents = list(self.documents.values())
+        self.documents = {}
+        workers = max(min(settings.SURICATE_DOCUMENTS_WORKERS, len(documents)), 1)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(self.download_document, document): document for document in documents}
+            for future in as_completed(futures):
+                # Each file is saved as soon as downloaded, then its response is released
+                attachment, attachment_final_name, file_url, report_pk = futures.pop(future)
+                response = future.result()
                 try:
-                    if response.status_code in [200, 201]:
+                    if response is not None and response.status_code in [200, 201]:
                         f = ContentFile(response.content)
                         attachment.attachment_file.save(attachment_final_name, f, save=False)
+                    else:
+                        # Download is tried again on next synchronization
+                        self.new_fingerprints.pop(report_pk, None)
                     attachment.save(**{'skip_file_save': True})
                 except Exception as e:
+                    self.new_fingerprints.pop(report_pk, None)
                     logger.error(f"Could not download image : {file_url} \n{e}\n{traceback.format_exc()}")
+        for pk, fingerprint in self.new_fingerprints.items():
+            Report.objects.filter(pk=pk).update(suricate_fingerprint=fingerprint)
+        self.new_fingerprints = {}
 
     def create_messages(self, messages, parent):
         """Parse messages list from Suricate Rest API"""
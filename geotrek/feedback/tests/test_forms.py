@@ -145,8 +145,8 @@ class TestSuricateForms(SuricateWorkflowTests):
         self.assertIsInstance(form.fields["uses_timers"].widget, CheckboxInput)
 
     @test_for_workflow_mode
-    @mock.patch("geotrek.feedback.helpers.requests.get")
-    @mock.patch("geotrek.feedback.helpers.requests.post")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.get")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.post")
     def test_workflow_assign_step(self, mocked_post, mocked_get):
         self.build_get_request_patch(mocked_get)
         self.build_post_request_patch(mocked_post)
@@ -192,8 +192,8 @@ class TestSuricateForms(SuricateWorkflowTests):
 
     @override_settings(SURICATE_WORKFLOW_ENABLED=True)
     @override_settings(SURICATE_WORKFLOW_SETTINGS=SURICATE_WORKFLOW_SETTINGS_NO_MODERATION)
-    @mock.patch("geotrek.feedback.helpers.requests.get")
-    @mock.patch("geotrek.feedback.helpers.requests.post")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.get")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.post")
     def test_workflow_self_assign_step(self, mocked_post, mocked_get):
         self.build_get_request_patch(mocked_get)
         self.build_post_request_patch(mocked_post)
@@ -268,7 +268,7 @@ class TestSuricateForms(SuricateWorkflowTests):
         self.assertEqual(self.waiting_report.status.identifier, "programmed")
 
     @test_for_workflow_mode
-    @mock.patch("geotrek.feedback.helpers.requests.post")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.post")
     def test_solving_report_intervention(self, mocked_post):
         mails_before = len(mail.outbox)
         self.build_post_request_patch(mocked_post)
@@ -345,8 +345,8 @@ class TestSuricateForms(SuricateWorkflowTests):
         self.assertIn("Add a new intervention", response.content.decode("utf-8"))
 
     @test_for_workflow_mode
-    @mock.patch("geotrek.feedback.helpers.requests.get")
-    @mock.patch("geotrek.feedback.helpers.requests.post")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.get")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.post")
     def test_workflow_resolve_step(self, mocked_post, mocked_get):
         self.build_get_request_patch(mocked_get)
         self.build_post_request_patch(mocked_post)
@@ -379,7 +379,7 @@ class TestSuricateForms(SuricateWorkflowTests):
         mocked_post.assert_has_calls([call1, call2], any_order=True)
 
     @test_for_workflow_mode
-    @mock.patch("geotrek.feedback.helpers.requests.get")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.get")
     def test_relocate_report_in_district(self, mocked_get):
         self.build_get_request_patch(mocked_get)
         # Relocate report inside of main district
@@ -403,8 +403,8 @@ class TestSuricateForms(SuricateWorkflowTests):
         )
 
     @test_for_workflow_mode
-    @mock.patch("geotrek.feedback.helpers.requests.get")
-    @mock.patch("geotrek.feedback.helpers.requests.post")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.get")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.post")
     def test_relocate_report_outside_district(self, mocked_post, mocked_get):
         self.build_get_request_patch(mocked_get)
         # Relocate report outside of main district
@@ -434,7 +434,7 @@ class TestSuricateForms(SuricateWorkflowTests):
         self.assertEqual(self.filed_report_1.status, self.rejected_status)
 
     @test_for_workflow_mode
-    @mock.patch("geotrek.feedback.helpers.requests.get")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.get")
     def test_reject_alert_unlocks_in_suricate_when_workflow_enabled(self, mocked_get):
         form = ReportForm(
             instance=self.filed_report_2,
@@ -457,7 +457,7 @@ class TestSuricateForms(SuricateWorkflowTests):
         self.assertEqual(self.filed_report_2.status, self.rejected_status)
 
     @test_for_report_and_basic_modes
-    @mock.patch("geotrek.feedback.helpers.requests.post")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.post")
     def test_timer_creation(self, mocked_post):
         # Relocate report inside of main district
         new_geom = Point(0, 0, srid=2154)
@@ -247,7 +247,7 @@ class TestPendingAPIRequests(SuricateTests):
         super().setUpTestData()
 
     @override_settings(SURICATE_WORKFLOW_ENABLED=True)
-    @mock.patch("geotrek.feedback.helpers.requests.get")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.get")
     def test_failed_get_on_management_api(self, mocked):
         uid = uuid.uuid4()
         report = ReportFactory.create(email='john.doe@nowhere.com',
@@ -277,7 +277,7 @@ class TestPendingAPIRequests(SuricateTests):
         self.assertEqual(PendingSuricateAPIRequest.objects.count(), 0)
 
     @override_settings(SURICATE_WORKFLOW_ENABLED=True)
-    @mock.patch("geotrek.feedback.helpers.requests.post")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.post")
     def test_failed_post_on_standard_api(self, mocked):
         # Report sent fails the first time
         self.build_timeout_request_patch(mocked)
@@ -326,7 +326,7 @@ class TestPendingAPIRequests(SuricateTests):
         self.assertEqual(PendingSuricateAPIRequest.objects.count(), 0)
 
     @override_settings(SURICATE_WORKFLOW_ENABLED=True)
-    @mock.patch("geotrek.feedback.helpers.requests.post")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.post")
     def test_failed_post_on_management_api(self, mocked):
         # Create a report with an UID - emulates report from Suricate
         uid = uuid.uuid4()
@@ -1,11 +1,13 @@
 import io
 import os
+import threading
 import uuid
 from unittest import mock
 from unittest.mock import MagicMock
 
 from django.core import mail
 from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections
 from django.test import TestCase
 from django.test.utils import override_settings
 from django.urls.base import reverse
@@ -17,6 +19,7 @@ from geotrek.common.models import Attachment
 from geotrek.common.tests import TranslationResetMixin
 from geotrek.feedback.forms import ReportForm
 from geotrek.feedback.helpers import SuricateMessenger, SuricateRequestManager
+from geotrek.feedback.management.commands.sync_suricate import LOCK_KEY
 from geotrek.feedback.models import (AttachedMessage, Report, ReportActivity,
                                      ReportProblemMagnitude, ReportStatus,
                                      WorkflowManager)
@@ -140,7 +143,7 @@ class SuricateAPITests(SuricateTests):
 
     @override_settings(SURICATE_WORKFLOW_ENABLED=True)
     @mock.patch("geotrek.feedback.parsers.logger")
-    @mock.patch("geotrek.feedback.helpers.requests.get")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.get")
     def test_get_statuses(self, mocked_get, mocked_logger):
         """Test GET requests on Statuses endpoint creates statuses objects"""
         self.build_get_request_patch(mocked_get)
@@ -150,7 +153,7 @@ class SuricateAPITests(SuricateTests):
 
     @override_settings(SURICATE_WORKFLOW_ENABLED=True)
     @mock.patch("geotrek.feedback.parsers.logger")
-    @mock.patch("geotrek.feedback.helpers.requests.get")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.get")
     def test_get_activities(self, mocked_get, mocked_logger):
         """Test GET requests on Activities endpoint creates statuses objects"""
         self.build_get_request_patch(mocked_get)
@@ -159,7 +162,7 @@ class SuricateAPITests(SuricateTests):
         mocked_logger.info.assert_called_with("New activity - id: 51, label: Roller, Skateboard")
 
     @override_settings(SURICATE_WORKFLOW_ENABLED=True)
-    @mock.patch("geotrek.feedback.helpers.requests.get")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.get")
     def test_get_activities_and_statuses(self, mocked):
         """Test GET requests on both Activities and Statuses endpoint creates objects"""
         self.build_get_request_patch(mocked)
@@ -176,7 +179,7 @@ class SuricateAPITests(SuricateTests):
 
     @override_settings(SURICATE_WORKFLOW_ENABLED=True)
     @mock.patch("geotrek.feedback.parsers.logger")
-    @mock.patch("geotrek.feedback.helpers.requests.get")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.get")
     def test_get_alerts_creates_alerts_and_send_mail(self, mocked_get, mocked_logger):
         """Test GET requests on Alerts endpoint creates alerts and related objects, and sends an email"""
         self.build_get_request_patch(mocked_get, cause_JPG_error=True)
@@ -225,7 +228,7 @@ class SuricateAPITests(SuricateTests):
     @override_settings(SURICATE_WORKFLOW_ENABLED=True)
     @override_settings(SURICATE_WORKFLOW_SETTINGS=SURICATE_WORKFLOW_SETTINGS_NO_MODERATION)
     @mock.patch("geotrek.feedback.parsers.logger")
-    @mock.patch("geotrek.feedback.helpers.requests.get")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.get")
     def test_get_alerts_creates_alerts_and_sends_no_mail(self, mocked_get, mocked_logger):
         """Test GET requests on Alerts endpoint creates alerts and related objects, but sends no email if moderation is disabled"""
         self.build_get_request_patch(mocked_get, cause_JPG_error=True)
@@ -240,7 +243,7 @@ class SuricateAPITests(SuricateTests):
 
     @override_settings(SURICATE_WORKFLOW_ENABLED=True)
     @mock.patch("geotrek.feedback.parsers.logger")
-    @mock.patch("geotrek.feedback.helpers.requests.get")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.get")
     def test_get_alerts_does_not_override_internal_status(self, mocked_get, mocked_logger):
         # Test sync last report does not override internal status
         self.build_get_request_patch(mocked_get, cause_JPG_error=True)
@@ -260,7 +263,7 @@ class SuricateAPITests(SuricateTests):
     @override_settings(SURICATE_WORKFLOW_ENABLED=True)
     @mock.patch("geotrek.feedback.parsers.ContentFile.__init__")
     @mock.patch("geotrek.feedback.parsers.logger")
-    @mock.patch("geotrek.feedback.helpers.requests.get")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.get")
     def test_sync_handles_malformed_images(self, mocked_get, mocked_logger, mocked_save):
         self.build_get_request_patch(mocked_get)
         """Test Suricate sync is not interupted by corruped images"""
@@ -269,7 +272,7 @@ class SuricateAPITests(SuricateTests):
         mocked_logger.error.assert_called()
 
     @override_settings(SURICATE_WORKFLOW_ENABLED=True)
-    @mock.patch("geotrek.feedback.helpers.requests.get")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.get")
     def test_get_alerts_creates_alerts_and_send_mail_and_assign(self, mocked_get):
         """Test GET requests on Alerts endpoint creates alerts and related objects, and sends an email"""
         self.build_get_request_patch(mocked_get, cause_JPG_error=True)
@@ -298,7 +301,7 @@ class SuricateAPITests(SuricateTests):
 
     @override_settings(SURICATE_WORKFLOW_ENABLED=True)
     @mock.patch("geotrek.feedback.parsers.logger")
-    @mock.patch("geotrek.feedback.helpers.requests.get")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.get")
     def test_failed_attachments_are_downloaded_on_next_sync(self, mocked_get, mocked_logger):
         """Test failed requests to download attachments are retried on next sync"""
         self.assertEqual(Attachment.objects.count(), 0)
@@ -323,6 +326,30 @@ class SuricateAPITests(SuricateTests):
             # No attachments are missing their image file
             self.assertTrue(atta.attachment_file.storage.exists(atta.attachment_file.name))
 
+    @override_settings(SURICATE_WORKFLOW_ENABLED=True)
+    @mock.patch("geotrek.feedback.parsers.logger")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.get")
+    def test_failed_attachment_does_not_abort_other_downloads(self, mocked_get, mocked_logger):
+        """Test an error while downloading an attachment does not prevent downloading the others"""
+        self.build_get_request_patch(mocked_get)
+        get_attachment = SuricateRequestManager.get_attachment_from_suricate
+        lock, failed = threading.Lock(), []
+
+        def fail_once(manager, url):
+            with lock:
+                fail = not failed
+                failed.append(url)
+            if fail:
+                raise ConnectionError("Connection refused")
+            return get_attachment(manager, url)
+
+        with mock.patch.object(SuricateRequestManager, 'get_attachment_from_suricate', autospec=True,
+                               side_effect=fail_once):
+            call_command("sync_suricate", verbosity=2)
+        self.assertEqual(Attachment.objects.count(), 6)
+        self.assertEqual(Attachment.objects.exclude(attachment_file='').count(), 5)
+        mocked_logger.error.assert_called_once()
+
     @override_settings(PAPERCLIP_ENABLE_LINK=False)
     @override_settings(SURICATE_WORKFLOW_ENABLED=True)
     def test_sync_needs_paperclip_enabled(self):
@@ -353,13 +380,13 @@ class SuricateAPITests(SuricateTests):
         post_report.assert_called_once_with(report)
 
     @override_settings(SURICATE_REPORT_ENABLED=False)
-    @mock.patch("geotrek.feedback.helpers.requests.get")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.get")
     def test_save_on_report_doesnt_post_to_suricate_in_no_suricate_mode(self, post_report):
         """Test save does not post to suricate on save Report in No Suricate Mode"""
         Report.objects.create(email="iam@test.email")
         post_report.assert_not_called()
 
-    @mock.patch("geotrek.feedback.helpers.requests.post")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.post")
     def test_post_request_to_suricate(self, mock_post):
         """Test post request itself
         Request post is mock
@@ -375,7 +402,7 @@ class SuricateAPITests(SuricateTests):
         self.assertEqual(result, None)
 
     @override_settings(SURICATE_REPORT_SETTINGS=SURICATE_REPORT_SETTINGS)
-    @mock.patch("geotrek.feedback.helpers.requests.get")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.get")
     def test_get_request_to_suricate_fails_1(self, mock_get):
         """Test get request itself fails
         """
@@ -386,7 +413,7 @@ class SuricateAPITests(SuricateTests):
             SuricateRequestManager().get_suricate(endpoint="wsGetStatusList")
 
     @override_settings(SURICATE_REPORT_SETTINGS=SURICATE_REPORT_SETTINGS)
-    @mock.patch("geotrek.feedback.helpers.requests.get")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.get")
     def test_get_request_to_suricate_fails_2(self, mock_get):
         """Test get request itself fails
         """
@@ -398,7 +425,7 @@ class SuricateAPITests(SuricateTests):
 
     @override_settings(SURICATE_WORKFLOW_ENABLED=True)
     @mock.patch("sys.stdout", new_callable=io.StringIO)
-    @mock.patch("geotrek.feedback.helpers.requests.get")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.get")
     def test_connection_test(self, mock_get, mocked_stdout):
         """Assert connection test command outputs OK
         """
@@ -410,7 +437,7 @@ class SuricateAPITests(SuricateTests):
 
     @override_settings(SURICATE_WORKFLOW_ENABLED=True)
     @mock.patch("sys.stdout", new_callable=io.StringIO)
-    @mock.patch("geotrek.feedback.helpers.requests.get")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.get")
     def test_connection_test_fails_API(self, mock_get, mocked_stdout):
         """Assert connection test command outputs error when it fails on Suricate API side
         """
@@ -422,7 +449,7 @@ class SuricateAPITests(SuricateTests):
 
     @override_settings(SURICATE_WORKFLOW_ENABLED=True)
     @mock.patch("sys.stdout", new_callable=io.StringIO)
-    @mock.patch("geotrek.feedback.helpers.requests.get")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.get")
     def test_connection_test_fails_HTTP(self, mock_get, mocked_stdout):
         """Assert connection test command outputs error when it fails on HTTP
         """
@@ -434,7 +461,7 @@ class SuricateAPITests(SuricateTests):
 
     @override_settings(SURICATE_WORKFLOW_ENABLED=True)
     @mock.patch("geotrek.feedback.parsers.logger")
-    @mock.patch("geotrek.feedback.helpers.requests.get")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.get")
     def test_relocated_report_is_deleted_on_next_sync(self, mocked_get, mocked_logger):
         """Test reports relocated outside of BBOX are deleted on next sync"""
         self.build_get_request_patch(mocked_get, remove_one_alert=False)
@@ -450,10 +477,51 @@ class SuricateAPITests(SuricateTests):
         self.assertEqual(Report.objects.filter(external_uuid="742CBF16-5056-AA2B-DD1FD403F72D6B9B").count(), 0)
         self.assertEqual(Report.objects.count(), 7)
 
+    @override_settings(SURICATE_WORKFLOW_ENABLED=True, SURICATE_DOCUMENTS_WORKERS=2)
+    @mock.patch("geotrek.feedback.parsers.logger")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.get")
+    def test_unchanged_reports_are_skipped_on_next_sync(self, mocked_get, mocked_logger):
+        """Test reports unchanged in Suricate since last sync are not parsed again"""
+        self.build_get_request_patch(mocked_get)
+        call_command("sync_suricate", verbosity=2)
+        self.assertEqual(Report.objects.count(), 8)
+        self.assertEqual(Report.objects.filter(suricate_fingerprint="").count(), 0)
+        for atta in Attachment.objects.all():
+            self.assertTrue(atta.attachment_file.storage.exists(atta.attachment_file.name), atta.attachment_file.name)
+        r = Report.objects.get(external_uuid="7EE5DF25-5056-AA2B-DDBEEFA5768CD53E")
+        Report.objects.filter(pk=r.pk).update(comment="Not synchronized again")
+        call_command("sync_suricate", verbosity=2)
+        self.assertEqual(Report.objects.count(), 8)
+        r.refresh_from_db()
+        self.assertEqual(r.comment, "Not synchronized again")
+        # Syncing a specific report always overwrites local info
+        call_command("sync_suricate", report=r.pk, verbosity=2)
+        r.refresh_from_db()
+        self.assertEqual(r.comment, "Lames cassées")
+
+    @override_settings(SURICATE_WORKFLOW_ENABLED=True)
+    @mock.patch("geotrek.feedback.management.commands.sync_suricate.logger")
+    @mock.patch("geotrek.feedback.parsers.SuricateParser.get_alerts")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.get")
+    def test_sync_is_skipped_while_running(self, mocked_get, mocked_get_alerts, mocked_logger):
+        """Test sync is not started while another one is running"""
+        self.build_get_request_patch(mocked_get)
+        other = connections.create_connection(DEFAULT_DB_ALIAS)
+        try:
+            with other.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_lock(%s)", [LOCK_KEY])
+            call_command("sync_suricate", verbosity=2)
+            mocked_logger.warning.assert_called_once_with("Suricate synchronization is already running")
+            mocked_get_alerts.assert_not_called()
+        finally:
+            other.close()
+        call_command("sync_suricate", verbosity=2)
+        mocked_get_alerts.assert_called_once()
+
 
 class SuricateInterfaceTests(SuricateTests):
 
-    @mock.patch("geotrek.feedback.helpers.requests.get")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.get")
     def test_import_from_interface_disabled(self, mocked):
         user = UserFactory.create(username='Slush', password='Puppy')
         self.client.force_login(user)
@@ -473,7 +541,7 @@ class SuricateInterfaceTests(SuricateTests):
 
     @override_settings(SURICATE_WORKFLOW_ENABLED=True)
     @mock.patch("geotrek.feedback.parsers.SuricateParser.get_alerts")
-    @mock.patch("geotrek.feedback.helpers.requests.get")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.get")
     def test_import_from_interface_enabled(self, mocked_get, mocked_parser):
         user = UserFactory.create(username='Slush', password='Puppy')
         self.client.force_login(user)
@@ -494,7 +562,7 @@ class SuricateInterfaceTests(SuricateTests):
         mocked_parser.assert_called_once()
 
     @override_settings(SURICATE_REPORT_SETTINGS=SURICATE_REPORT_SETTINGS)
-    @mock.patch("geotrek.feedback.helpers.requests.get")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.get")
     def test_get_request_to_suricate_fails_1(self, mock_get):
         """Test get request itself fails
         """
@@ -597,8 +665,8 @@ class TestWorkflowFirstSteps(SuricateWorkflowTests):
         cls.report_filed_2 = ReportFactory(status=cls.filed_status, external_uuid=uuid.uuid4(), assigned_user=cls.admin)
 
     @override_settings(SURICATE_WORKFLOW_ENABLED=True)
-    @mock.patch("geotrek.feedback.helpers.requests.get")
-    @mock.patch("geotrek.feedback.helpers.requests.post")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.get")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.post")
     @mock.patch("geotrek.feedback.helpers.SuricateMessenger.message_sentinel")
     @mock.patch("geotrek.feedback.helpers.SuricateMessenger.update_status")
     def test_classify_alert_notifies_suricate_when_workflow_enabled(self, mocked_notify_suricate_status, mocked_mail_sentinel, mocked_post, mocked_get):
@@ -618,8 +686,8 @@ class TestWorkflowFirstSteps(SuricateWorkflowTests):
         mocked_notify_suricate_status.assert_called_once_with(self.report_filed_1.formatted_external_uuid, self.classified_status.identifier, "Problème déjà réglé", "Je ne fais rien")
 
     @override_settings(SURICATE_WORKFLOW_ENABLED=False)
-    @mock.patch("geotrek.feedback.helpers.requests.get")
-    @mock.patch("geotrek.feedback.helpers.requests.post")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.get")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.post")
     @mock.patch("geotrek.feedback.helpers.SuricateMessenger.message_sentinel")
     @mock.patch("geotrek.feedback.helpers.SuricateMessenger.update_status")
     def test_classify_alert_does_not_notify_suricate_when_workflow_disabled(self, mocked_notify_suricate_status, mocked_mail_sentinel, mocked_post, mocked_get):
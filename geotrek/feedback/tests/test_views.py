@@ -32,7 +32,7 @@ class ReportViewsetMailSend(TestCase):
     @override_settings(SURICATE_REPORT_SETTINGS=SURICATE_REPORT_SETTINGS)
     @override_settings(SURICATE_REPORT_ENABLED=True)
     @override_settings(SURICATE_MANAGEMENTT_ENABLED=False)
-    @mock.patch("geotrek.feedback.helpers.requests.post")
+    @mock.patch("geotrek.feedback.helpers.requests.Session.post")
     def test_mail_send_on_request(self, mocked_post):
         mock_response = mock.Mock()
         mock_response.content = json.dumps({"code_ok": 'true'}).encode()
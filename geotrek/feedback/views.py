@@ -134,3 +134,10 @@ class ReportViewSet(GeotrekMapentityViewSet):
                 self.request.user.pk if settings.SURICATE_WORKFLOW_ENABLED else ''
             )
         return geojson_lookup
+
+    def get_tile_cache_key(self, z, x, y):
+        # Reports of the layer depend on user with workflow
+        key = super().get_tile_cache_key(z, x, y)
+        if settings.SURICATE_WORKFLOW_ENABLED:
+            key = '{}_{}'.format(key, self.request.user.pk)
+        return key
@@ -16,6 +16,7 @@ from geotrek.common.mixins.views import CustomColumnsMixin
 from geotrek.common.viewsets import GeotrekMapentityViewSet
 from geotrek.core.models import AltimetryMixin
 from geotrek.core.views import CreateFromTopologyMixin
+from geotrek.zoning.views import ZoningFormatMixin
 
 from .filters import InfrastructureFilterSet
 from .forms import InfrastructureForm
@@ -31,7 +32,7 @@ class InfrastructureList(CustomColumnsMixin, MapEntityList):
     searchable_columns = ['id', 'name']
 
 
-class InfrastructureFormatList(MapEntityFormat, InfrastructureList):
+class InfrastructureFormatList(ZoningFormatMixin, MapEntityFormat, InfrastructureList):
     mandatory_columns = ['id']
     default_extra_columns = [
         'id', 'name', 'type', 'conditions', 'description', 'accessibility',
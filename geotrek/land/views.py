@@ -7,6 +7,7 @@ from geotrek.common.mixins.views import CustomColumnsMixin
 from geotrek.common.viewsets import GeotrekMapentityViewSet
 from geotrek.core.models import AltimetryMixin
 from geotrek.core.views import CreateFromTopologyMixin
+from geotrek.zoning.views import ZoningFormatMixin
 from .filters import PhysicalEdgeFilterSet, LandEdgeFilterSet, CompetenceEdgeFilterSet, WorkManagementEdgeFilterSet, \
     SignageManagementEdgeFilterSet, CirculationEdgeFilterSet
 from .forms import PhysicalEdgeForm, LandEdgeForm, CompetenceEdgeForm, WorkManagementEdgeForm, SignageManagementEdgeForm, \
@@ -27,7 +28,7 @@ class PhysicalEdgeList(CustomColumnsMixin, CreateFromTopologyMixin, MapEntityLis
     default_extra_columns = ['length', 'length_2d']
 
 
-class PhysicalEdgeFormatList(MapEntityFormat, PhysicalEdgeList):
+class PhysicalEdgeFormatList(ZoningFormatMixin, MapEntityFormat, PhysicalEdgeList):
     mandatory_columns = ['id', 'physical_type']
     default_extra_columns = [
         'date_insert', 'date_update',
@@ -82,7 +83,7 @@ class LandEdgeList(CustomColumnsMixin, MapEntityList):
     default_extra_columns = ['length', 'length_2d']
 
 
-class LandEdgeFormatList(MapEntityFormat, LandEdgeList):
+class LandEdgeFormatList(ZoningFormatMixin, MapEntityFormat, LandEdgeList):
     mandatory_columns = ['id']
     default_extra_columns = [
         'land_type', 'owner', 'agreement', 'date_insert', 'date_update',
@@ -135,7 +136,7 @@ class CirculationEdgeList(CustomColumnsMixin, MapEntityList):
     default_extra_columns = ['length', 'length_2d']
 
 
-class CirculationEdgeFormatList(MapEntityFormat, CirculationEdgeList):
+class CirculationEdgeFormatList(ZoningFormatMixin, MapEntityFormat, CirculationEdgeList):
     mandatory_columns = ['id']
     default_extra_columns = [
         'circulation_type', 'authorization_type', 'date_insert', 'date_update',
@@ -188,7 +189,7 @@ class CompetenceEdgeList(CustomColumnsMixin, MapEntityList):
     default_extra_columns = ['length', 'length_2d']
 
 
-class CompetenceEdgeFormatList(MapEntityFormat, CompetenceEdgeList):
+class CompetenceEdgeFormatList(ZoningFormatMixin, MapEntityFormat, CompetenceEdgeList):
     mandatory_columns = ['id', 'organization']
     default_extra_columns = [
         'date_insert', 'date_update',
@@ -241,7 +242,7 @@ class WorkManagementEdgeList(CustomColumnsMixin, MapEntityList):
     default_extra_columns = ['length', 'length_2d']
 
 
-class WorkManagementEdgeFormatList(MapEntityFormat, WorkManagementEdgeList):
+class WorkManagementEdgeFormatList(ZoningFormatMixin, MapEntityFormat, WorkManagementEdgeList):
     mandatory_columns = ['id', 'organization']
     default_extra_columns = [
         'date_insert', 'date_update', 'cities', 'districts', 'areas', 'uuid', 'length_2d'
@@ -293,7 +294,7 @@ class SignageManagementEdgeList(CustomColumnsMixin, MapEntityList):
     default_extra_columns = ['length', 'length_2d']
 
 
-class SignageManagementEdgeFormatList(MapEntityFormat, SignageManagementEdgeList):
+class SignageManagementEdgeFormatList(ZoningFormatMixin, MapEntityFormat, SignageManagementEdgeList):
     mandatory_columns = ['id', 'organization']
     default_extra_columns = [
         'date_insert', 'date_update', 'cities', 'districts', 'areas', 'uuid', 'length_2d'
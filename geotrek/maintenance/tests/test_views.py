@@ -147,6 +147,22 @@ class InterventionViewsTest(CommonTest):
         self.assertEqual(response.status_code, 302)
         self.assertEqual(signa, Intervention.objects.get().target)
 
+    def test_intervention_layer_tiles(self):
+        url = Intervention.get_layer_url().replace('.geojson', '/tiles/1/1/0.mvt')
+        self.assertEqual(self.client.get(url).content, b'')
+        # Targets with their own geometry column
+        InterventionFactory.create()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content)
+        Intervention.objects.all().delete()
+        # Blades are located by their signage
+        InterventionFactory.create(target=BladeFactory.create())
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content)
+        self.assertEqual(self.client.get(url.replace('/1/1/0.mvt', '/1/0/1.mvt')).content, b'')
+
     def test_detail_target_objects(self):
         if settings.TREKKING_TOPOLOGY_ENABLED:
             path = PathFactory.create(geom=LineString((200, 200), (300, 300)))
@@ -509,6 +525,15 @@ class ProjectViewsTest(CommonTest):
             'name': self.obj.name
         }
 
+    def test_project_layer_tiles(self):
+        url = Project.get_layer_url().replace('.geojson', '/tiles/1/1/0.mvt')
+        # Projects are located by their interventions
+        ProjectWithInterventionFactory.create()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content)
+        self.assertEqual(self.client.get(url.replace('/1/1/0.mvt', '/1/0/1.mvt')).content, b'')
+
     def get_bad_data(self):
         return OrderedDict([
             ('begin_year', ''),
@@ -2,7 +2,9 @@ import logging
 import re
 
 from django.conf import settings
-from django.db.models import Subquery, OuterRef, Sum
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.gis.db.models import Collect, GeometryCollectionField, GeometryField
+from django.db.models import Case, Subquery, OuterRef, Sum, When
 from django.db.models.expressions import Value
 from django.utils.translation import gettext_lazy as _
 from mapentity.views import (MapEntityList, MapEntityFormat, MapEntityDetail, MapEntityDocument,
@@ -13,6 +15,7 @@ from geotrek.authent.decorators import same_structure_required
 from geotrek.common.mixins.forms import FormsetMixin
 from geotrek.common.mixins.views import CustomColumnsMixin
 from geotrek.common.viewsets import GeotrekMapentityViewSet
+from geotrek.core.models import Topology
 from geotrek.feedback.models import Report
 from .filters import InterventionFilterSet, ProjectFilterSet
 from .forms import (InterventionForm, ProjectForm,
@@ -21,6 +24,9 @@ from .models import Intervention, Project, ManDay
 from .serializers import (InterventionSerializer, ProjectSerializer,
                           InterventionGeojsonSerializer, ProjectGeojsonSerializer)
 
+if 'geotrek.signage' in settings.INSTALLED_APPS:
+    from geotrek.signage.models import Blade
+
 logger = logging.getLogger(__name__)
 
 
@@ -32,6 +38,23 @@ def _normalize_annotation_column_name(col_name):
     return ANNOTATION_FORBIDDEN_CHARS.sub(repl=REPLACEMENT_CHAR, string=col_name)
 
 
+def intervention_target_geom():
+    """ Geometry of interventions targets, as a database expression (``Intervention.geom`` is a property) """
+    targets = [(Report, 'geom')]
+    if 'geotrek.signage' in settings.INSTALLED_APPS:
+        targets.append((Blade, 'signage__geom'))
+    if 'geotrek.outdoor' in settings.INSTALLED_APPS:
+        from geotrek.outdoor.models import Course, Site
+        targets += [(Site, 'geom'), (Course, 'geom')]
+    whens = [
+        When(target_type=ContentType.objects.get_for_model(model),
+             then=Subquery(model.objects.filter(pk=OuterRef('target_id')).values(field)[:1]))
+        for model, field in targets
+    ]
+    return Case(*whens, default=Subquery(Topology.objects.filter(pk=OuterRef('target_id')).values('geom')[:1]),
+                output_field=GeometryField(srid=settings.SRID))
+
+
 class InterventionList(CustomColumnsMixin, MapEntityList):
     queryset = Intervention.objects.existing()
     filterform = InterventionFilterSet
@@ -178,6 +201,10 @@ class InterventionViewSet(GeotrekMapentityViewSet):
     geojson_serializer_class = InterventionGeojsonSerializer
     filterset_class = InterventionFilterSet
     mapentity_list_class = InterventionList
+    tile_geometry_field = 'tile_geom'
+
+    def get_tile_queryset(self):
+        return super().get_tile_queryset().annotate(tile_geom=intervention_target_geom())
 
     def get_queryset(self):
         qs = self.model.objects.existing()
@@ -255,6 +282,15 @@ class ProjectViewSet(GeotrekMapentityViewSet):
     geojson_serializer_class = ProjectGeojsonSerializer
     filterset_class = ProjectFilterSet
     mapentity_list_class = ProjectList
+    tile_geometry_field = 'tile_geom'
+
+    def get_tile_queryset(self):
+        # Collection of the project interventions geometries, like ``Project.geom``
+        geoms = Intervention.objects.existing().filter(project=OuterRef('pk')).annotate(target_geom=intervention_target_geom())
+        geoms = geoms.order_by().values('project').annotate(geom=Collect('target_geom'))
+        return super().get_tile_queryset().annotate(
+            tile_geom=Subquery(geoms.values('geom'), output_field=GeometryCollectionField(srid=settings.SRID))
+        )
 
     def get_queryset(self):
         qs = self.model.objects.existing()
@@ -100,6 +100,7 @@ class GeotrekSiteParser(GeotrekOutdoorParser):
         "eid": "uuid",
         "geom": "geometry",
     }
+    extra_api_fields = ['parent_uuid']
     init_url_categories = {
         "sector": "outdoor_sector",
         "practice": "outdoor_practice",
@@ -186,6 +187,7 @@ class GeotrekCourseParser(GeotrekOutdoorParser):
         "eid": "uuid",
         "geom": "geometry"
     }
+    extra_api_fields = ['children_uuids', 'sites_uuids']
     init_url_categories = {
         "sector": "outdoor_sector",
         "practice": "outdoor_practice",
@@ -342,6 +342,13 @@ CACHES = {
     }
 }
 
+# Versions of objects used in API cache keys are kept in memory for a few seconds
+OBJECT_VERSIONS_MEMORY_TIMEOUT = 2
+OBJECT_VERSIONS_MEMORY_SIZE = 100000
+# Listen to objects updated by SQL triggers (paths, topologies...) to invalidate their cache
+OBJECT_VERSIONS_LISTENER = True
+OBJECT_VERSIONS_LISTENER_TIMEOUT = 30
+
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 
 THUMBNAIL_ALIASES = {
@@ -358,6 +365,10 @@ THUMBNAIL_ALIASES = {
 }
 
 THUMBNAIL_PROCESSORS = easy_thumbnails_defaults.THUMBNAIL_PROCESSORS + ('geotrek.common.thumbnail_processors.add_watermark',)
+# Thumbnails rendered in background when image attachments are saved, then served from a manifest
+# ('watermark' is the 800px picture with copyright used by mobile apps)
+THUMBNAIL_PREGENERATED_ALIASES = ['apiv2', 'print', 'small-square', 'watermark']
+THUMBNAIL_WORKERS = 4  # number of threads rendering thumbnails
 
 FILE_UPLOAD_PERMISSIONS = 0o644
 
@@ -449,6 +460,10 @@ ALTIMETRIC_PROFILE_FONT = 'ubuntu'
 ALTIMETRIC_PROFILE_MIN_YSCALE = 1200  # Minimum y scale (in meters)
 ALTIMETRIC_AREA_MAX_RESOLUTION = 150  # Maximum number of points (by width/height)
 ALTIMETRIC_AREA_MARGIN = 0.15
+ALTIMETRIC_DEM_IN_PROCESS = False  # Sample DEM and compute profiles in process (requires NumPy)
+ALTIMETRIC_PRECOMPUTE = False  # Precompute elevation profiles and areas with Celery on each change
+ALTIMETRY_UPDATE_WORKERS = 4  # number of threads updating 3D geometries after DEM has changed
+ALTIMETRY_UPDATE_CHUNK_SIZE = 500  # number of objects updated per transaction
 
 # Let this be defined at instance-level
 LEAFLET_CONFIG = {
@@ -579,6 +594,8 @@ PATH_MODEL_ENABLED = True
 
 
 TREKKING_TOPOLOGY_ENABLED = True
+# Recompute geometries of topologies after path edition at commit ('commit') or by a Celery task ('worker')
+TOPOLOGY_DEFERRED_UPDATE = None
 FLATPAGES_ENABLED = True
 TOURISM_ENABLED = True
 
@@ -591,6 +608,7 @@ INTERVENTION_INTERSECTION_MARGIN = 500  # meters (used only if TREKKING_TOPOLOGY
 OUTDOOR_INTERSECTION_MARGIN = 500  # meters (always used)
 MAINTENANCE_INTERSECTION_MARGIN = 500  # meters (used for intersections with outdoor)
 REPORT_INTERSECTION_MARGIN = 500  # meters (always used)
+PROXIMITY_MARGIN = 500  # meters (treks, touristic contents and events, outdoor sites and courses closer are indexed)
 
 SIGNAGE_LINE_ENABLED = False
 
@@ -655,6 +673,9 @@ MOBILE_TILES_RADIUS_SMALL = 0.005  # ~500 m
 MOBILE_TILES_GLOBAL_ZOOMS = list(range(13))
 MOBILE_TILES_LOW_ZOOMS = list(range(13, 15))
 MOBILE_TILES_HIGH_ZOOMS = list(range(15, 17))
+MOBILE_TILES_WORKERS = 8  # Number of concurrent tiles downloads
+MOBILE_TILES_RETRIES = 2  # Retries of a failed tile download
+MOBILE_TILES_RETRY_DELAY = 1  # Delay before first retry (in seconds), doubled at each retry
 MOBILE_CATEGORY_PICTO_SIZE = 32
 MOBILE_POI_PICTO_SIZE = 32
 MOBILE_INFORMATIONDESKTYPE_PICTO_SIZE = 32
@@ -834,12 +855,15 @@ SURICATE_WORKFLOW_SETTINGS = {
     "SKIP_MANAGER_MODERATION": False
 }
 
+SURICATE_DOCUMENTS_WORKERS = 4  # number of threads downloading documents of reports synchronized from Suricate
+
 REPORT_FILETYPE = "Report"
 
 # Parser parameters for retries and error codes
 PARSER_RETRY_SLEEP_TIME = 60  # time of sleep between requests
 PARSER_NUMBER_OF_TRIES = 3  # number of requests to try before abandon
 PARSER_RETRY_HTTP_STATUS = [503]
+PARSER_ATTACHMENTS_WORKERS = 1  # number of threads downloading attachments while rows are parsed
 
 USE_BOOKLET_PDF = False
 HIDDEN_FORM_FIELDS = {'report': ['assigned_user']}
@@ -12,6 +12,9 @@ ALLOWED_HOSTS = ['localhost']
 
 CELERY_ALWAYS_EAGER = True
 
+# Listener thread would keep a connection to test database
+OBJECT_VERSIONS_LISTENER = False
+
 ALLOWED_HOSTS = ['localhost']
 
 INSTALLED_APPS += (
@@ -73,6 +76,7 @@ LOGGING['handlers']['log_file']['filename'] = os.path.join(TMP_DIR, 'geotrek.log
 MEDIA_ROOT = TemporaryDirectory(dir=TMP_DIR).name  # media files
 SYNC_MOBILE_ROOT = TemporaryDirectory(dir=TMP_DIR).name  # sync mobile root path
 MOBILE_TILES_PATH = TemporaryDirectory(dir=TMP_DIR).name  # sync mobile tile path
+MOBILE_TILES_RETRY_DELAY = 0
 DATA_TEMP_DIR = TemporaryDirectory(dir=TMP_DIR).name  # data temp dir use by django-large-image
 REDIS_URL = f"redis://{os.getenv('REDIS_HOST', 'localhost')}:{os.getenv('REDIS_PORT', '6379')}/1"  # celery broker url
 PASSWORD_HASHERS = [
@@ -102,6 +102,15 @@ class BladeViewsTest(CommonTest):
             'type': self.obj.type.label
         }
 
+    def test_blade_layer_tiles(self):
+        url = Blade.get_layer_url().replace('.geojson', '/tiles/1/1/0.mvt')
+        # Blades are located by their signage
+        BladeFactory.create()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content)
+        self.assertEqual(self.client.get(url.replace('/1/1/0.mvt', '/1/0/1.mvt')).content, b'')
+
     def get_bad_data(self):
         return OrderedDict([
             ('number', ''),
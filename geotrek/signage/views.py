@@ -12,6 +12,7 @@ from geotrek.common.mixins.forms import FormsetMixin
 from geotrek.common.mixins.views import CustomColumnsMixin
 from geotrek.common.viewsets import GeotrekMapentityViewSet
 from geotrek.core.models import AltimetryMixin
+from geotrek.zoning.views import ZoningFormatMixin
 from .filters import SignageFilterSet, BladeFilterSet
 from .forms import SignageForm, BladeForm, LineFormset
 from .models import Signage, Blade
@@ -34,7 +35,7 @@ class SignageList(CustomColumnsMixin, MapEntityList):
     searchable_columns = ['id', 'name', 'code']
 
 
-class SignageFormatList(MapEntityFormat, SignageList):
+class SignageFormatList(ZoningFormatMixin, MapEntityFormat, SignageList):
     mandatory_columns = ['id']
     default_extra_columns = [
         'structure', 'name', 'code', 'type', 'conditions', 'description',
@@ -217,6 +218,7 @@ class BladeViewSet(GeotrekMapentityViewSet):
     geojson_serializer_class = BladeGeojsonSerializer
     filterset_class = BladeFilterSet
     mapentity_list_class = BladeList
+    tile_geometry_field = 'signage__geom'
 
     def get_queryset(self):
         qs = self.model.objects.existing()
@@ -215,7 +215,7 @@ class TouristicEventViewsTests(CommonTest):
         total_count = sum(map(attrgetter('count'), counts))
         self.assertEqual(event.participants_total, total_count)
         self.assertEqual(event.participants_total_verbose_name, "Number of participants")
-        with self.assertNumQueries(17):
+        with self.assertNumQueries(14):
             response = self.client.get(event.get_format_list_url())
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.get('Content-Type'), 'text/csv')
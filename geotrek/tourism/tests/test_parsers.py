@@ -105,6 +105,10 @@ class HOT28v3withMedias(TouristicContentTourInSoftParserV3withMedias):
     portal = "Itinérance"
 
 
+class StreamingHOT28(HOT28):
+    streaming = True
+
+
 class FMA28(TouristicEventTourInSoftParser):
     url = "http://wcf.tourinsoft.com/Syndication/cdt28/xxx/Objects"
     source = "CDT 28"
@@ -179,6 +183,10 @@ class RestaurantBLEIParser(LEITouristicContentParser):
         return result
 
 
+class StreamingRestaurantBLEIParser(RestaurantBLEIParser):
+    streaming = True
+
+
 class EventALEIParser(LEITouristicEventParser):
     url = "https://apps.tourisme-alsace.info/xml/exploitation/listeproduits.asp"
     non_fields = {
@@ -613,6 +621,28 @@ class ParserTests(TranslationResetMixin, TestCase):
         self.assertEqual(Attachment.objects.count(), 3)
         self.assertEqual(Attachment.objects.first().content_object, content)
 
+    @mock.patch('geotrek.common.parsers.requests.get')
+    def test_create_content_tourinsoft_streaming(self, mocked):
+        filename = os.path.join(os.path.dirname(__file__), 'data', 'tourinsoftContent.json')
+        with open(filename, 'rb') as f:
+            content = f.read()
+        mocked.return_value.status_code = 200
+        mocked.return_value.iter_content.side_effect = lambda chunk_size: (
+            content[i:i + 100] for i in range(0, len(content), 100)
+        )
+        mocked.return_value.content = b'Fake image'
+        TouristicContentCategoryFactory(label="Où dormir")
+        RecordSourceFactory(name="CDT 28")
+        TargetPortalFactory(name="Itinérance")
+        output = io.StringIO()
+        call_command('import', 'geotrek.tourism.tests.test_parsers.StreamingHOT28', verbosity=2, stdout=output)
+        self.assertFalse(mocked.return_value.json.called)
+        self.assertEqual(TouristicContent.objects.count(), 1)
+        content = TouristicContent.objects.get()
+        self.assertEqual(content.eid, "HOTCEN0280010001")
+        self.assertEqual(content.name, "Hôtel du Perche")
+        self.assertEqual(Attachment.objects.count(), 3)
+
     @mock.patch('geotrek.common.parsers.requests.get')
     def test_create_content_tourinsoft_v3(self, mocked):
         def mocked_json():
@@ -844,6 +874,27 @@ class LEIParserTest(TranslationResetMixin, TestCase):
         content_b = TouristicContent.objects.get(name="Restaurant B")
         self.assertEqual(content_b.eid, "LEI219006400")
 
+    @mock.patch('requests.get')
+    def test_create_content_kv_critere_lei_streaming(self, mocked):
+
+        def mocked_requests_get(*args, **kwargs):
+            response = requests.Response()
+            response.status_code = 200
+            filename = os.path.join(os.path.dirname(__file__), 'data', 'LEIContent.xml')
+            with open(filename, 'rb') as f:
+                response._content = f.read()
+            response._content_consumed = True
+            return response
+
+        mocked.side_effect = mocked_requests_get
+
+        call_command('import', 'geotrek.tourism.tests.test_parsers.StreamingRestaurantBLEIParser', verbosity=0)
+        self.assertTrue(mocked.call_args[1]['stream'])
+        self.assertEqual(TouristicContent.objects.count(), 2)
+        content_a = TouristicContent.objects.get(name="Restaurant A")
+        self.assertEqual(content_a.eid, "LEI219006399")
+        self.assertEqual("<p><strong>Tox</strong> : Foo : Bar</p>", content_a.practical_info)
+
     @mock.patch('requests.get')
     def test_create_event_lei(self, mocked):
         self.x_time = 0
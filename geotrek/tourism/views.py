@@ -20,6 +20,7 @@ from geotrek.common.models import RecordSource, TargetPortal
 from geotrek.common.views import DocumentPublic, DocumentBookletPublic, MarkupPublic
 from geotrek.common.viewsets import GeotrekMapentityViewSet
 from geotrek.trekking.models import Trek
+from geotrek.zoning.views import ZoningFormatMixin
 from .filters import TouristicContentFilterSet, TouristicEventFilterSet
 from .forms import TouristicContentForm, TouristicEventForm, TouristicEventOrganizerFormPopup
 from .models import (TouristicContent, TouristicEvent, TouristicContentCategory, TouristicEventOrganizer,
@@ -45,7 +46,7 @@ class TouristicContentList(CustomColumnsMixin, MapEntityList):
         return TouristicContentCategory.objects.filter(pk__in=used)
 
 
-class TouristicContentFormatList(MapEntityFormat, TouristicContentList):
+class TouristicContentFormatList(ZoningFormatMixin, MapEntityFormat, TouristicContentList):
     mandatory_columns = ['id']
     default_extra_columns = [
         'structure', 'eid', 'name', 'category', 'type1', 'type2', 'description_teaser',
@@ -164,7 +165,7 @@ class TouristicEventList(CustomColumnsMixin, MapEntityList):
     searchable_columns = ['id', 'name']
 
 
-class TouristicEventFormatList(MapEntityFormat, TouristicEventList):
+class TouristicEventFormatList(ZoningFormatMixin, MapEntityFormat, TouristicEventList):
     mandatory_columns = ['id']
     default_extra_columns = [
         'structure', 'eid', 'name', 'type', 'description_teaser', 'description', 'themes',
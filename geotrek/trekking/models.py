@@ -1,5 +1,6 @@
 import logging
 import os
+from collections import defaultdict
 
 import simplekml
 from colorfield.fields import ColorField
@@ -724,6 +725,31 @@ class POI(StructureRelated, PicturesMixin, PublishableMixin, GeotrekMapEntityMix
     def published_topology_pois(cls, topology):
         return cls.topology_pois(topology).filter(published=True)
 
+    @classmethod
+    def topologies_pois(cls, topologies, queryset=None):
+        """ Return a mapping topology pk -> list of POIs, as ``topology_pois``
+        but with a single overlapping query for all topologies.
+        """
+        topologies = list(topologies)
+        if not settings.TREKKING_TOPOLOGY_ENABLED:
+            return {topology.pk: list(cls.topology_pois(topology, queryset)) for topology in topologies}
+        all_objects = queryset_or_all_objects(queryset, cls)
+        overlapping = cls.overlapping_many(topologies, all_objects=all_objects)
+        excluded = defaultdict(set)
+        trek_pois_excluded = Trek.pois_excluded.through.objects.filter(trek__in=[topology.pk for topology in topologies])
+        for trek_pk, poi_pk in trek_pois_excluded.values_list('trek_id', 'poi_id'):
+            excluded[trek_pk].add(poi_pk)
+        pk_list = {pk for pks in overlapping.values() for pk in pks}
+        pois = all_objects.filter(pk__in=pk_list).select_related('type').in_bulk()
+        return {
+            topology_pk: [pois[pk] for pk in pks if pk in pois and pk not in excluded[topology_pk]]
+            for topology_pk, pks in overlapping.items()
+        }
+
+    @classmethod
+    def published_topologies_pois(cls, topologies):
+        return cls.topologies_pois(topologies, queryset=cls.objects.existing().filter(published=True))
+
     def distance(self, to_cls):
         return settings.TOURISM_INTERSECTION_MARGIN
 
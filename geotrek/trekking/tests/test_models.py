@@ -17,7 +17,7 @@ from geotrek.common.tests.factories import LabelFactory, AttachmentImageFactory,
 
 from geotrek.common.tests import TranslationResetMixin
 from geotrek.core.tests.factories import PathFactory
-from geotrek.trekking.models import (OrderedTrekChild, Rating, RatingScale,
+from geotrek.trekking.models import (POI, OrderedTrekChild, Rating, RatingScale,
                                      Trek)
 from geotrek.trekking.tests.factories import (POIFactory, PracticeFactory,
                                               RatingFactory,
@@ -257,6 +257,23 @@ class RelatedObjectsTest(TranslationResetMixin, TestCase):
             Polygon(((3, 3), (9, 3), (9, 9), (3, 9), (3, 3)))))
         self.assertCountEqual(trek.districts, [d1, d2])
 
+    @skipIf(not settings.TREKKING_TOPOLOGY_ENABLED, 'Test with dynamic segmentation only')
+    def test_topologies_pois(self):
+        p1 = PathFactory.create(geom=LineString((0, 0), (4, 4)))
+        p2 = PathFactory.create(geom=LineString((4, 4), (8, 8)))
+        trek1 = TrekFactory.create(paths=[(p1, 0, 1)])
+        trek2 = TrekFactory.create(paths=[(p1, 0, 1), (p2, 0, 1)])
+        poi1 = POIFactory.create(paths=[(p1, 0.6, 0.6)])
+        poi2 = POIFactory.create(paths=[(p1, 0.3, 0.3)])
+        poi3 = POIFactory.create(paths=[(p2, 0.5, 0.5)], published=False)
+        trek2.pois_excluded.add(poi1.pk)
+
+        with self.assertNumQueries(3):
+            pois = POI.topologies_pois([trek1, trek2])
+        self.assertEqual(pois, {trek1.pk: [poi2, poi1], trek2.pk: [poi2, poi3]})
+        self.assertEqual(pois[trek1.pk], list(trek1.pois))
+        self.assertEqual(POI.published_topologies_pois([trek1, trek2]), {trek1.pk: [poi2, poi1], trek2.pk: [poi2]})
+
     @skipIf(settings.TREKKING_TOPOLOGY_ENABLED, 'Test without dynamic segmentation only')
     def test_helpers_nds(self):
         trek = TrekFactory.create(geom=LineString((2, 2), (8, 8)))
@@ -27,7 +27,8 @@ from geotrek.infrastructure.models import Infrastructure
 from geotrek.infrastructure.serializers import InfrastructureAPIGeojsonSerializer
 from geotrek.signage.models import Signage
 from geotrek.signage.serializers import SignageAPIGeojsonSerializer
-from geotrek.zoning.models import District, City, RestrictedArea
+from geotrek.zoning.mixins import prefetch_zoning
+from geotrek.zoning.views import ZoningFormatMixin
 
 from .filters import TrekFilterSet, POIFilterSet, ServiceFilterSet
 from .forms import TrekForm, POIForm, WebLinkCreateFormPopup, ServiceForm
@@ -60,7 +61,7 @@ class TrekList(CustomColumnsMixin, FlattenPicturesMixin, MapEntityList):
     searchable_columns = ['id', 'name', 'departure', 'arrival']
 
 
-class TrekFormatList(MapEntityFormat, TrekList):
+class TrekFormatList(ZoningFormatMixin, MapEntityFormat, TrekList):
     mandatory_columns = ['id', 'name']
     default_extra_columns = [
         'eid', 'eid2', 'structure', 'departure', 'arrival', 'duration', 'duration_pretty', 'description',
@@ -264,24 +265,18 @@ class POIFormatList(MapEntityFormat, POIList):
 
         denormalized = {}
 
-        # Since Land layers should have less records, start by them.
-        land_layers = [('districts', District),
-                       ('cities', City),
-                       ('areas', RestrictedArea)]
-        for attrname, land_layer in land_layers:
-            denormalized[attrname] = {}
-            for d in land_layer.objects.all():
-                overlapping = POI.objects.existing().filter(geom__within=d.geom)
-                for pid in overlapping.values_list('id', flat=True):
-                    denormalized[attrname].setdefault(pid, []).append(str(d))
+        # Land layers are read from zoning links of all POIs at once
+        land_layers = ['districts', 'cities', 'areas']
 
         # Same for treks
         denormalized['treks'] = {}
         for d in Trek.objects.existing():
             for pid in d.pois.all():
                 denormalized['treks'].setdefault(pid, []).append(d)
-        for poi in qs:
+        for poi in prefetch_zoning(qs):
             # Put denormalized in specific attribute used in serializers
+            for attrname in land_layers:
+                setattr(poi, '%s_csv_display' % attrname, ', '.join(str(zone) for zone in getattr(poi, attrname)))
             for attrname in denormalized.keys():
                 overlapping = denormalized[attrname].get(poi.id, [])
                 setattr(poi, '%s_csv_display' % attrname, ', '.join(overlapping))
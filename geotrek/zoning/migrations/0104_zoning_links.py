@@ -0,0 +1,56 @@
+# Generated by Django 4.2.13 on 2024-10-21 10:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('zoning', '0103_alter_restrictedarea_area_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CityLink',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_table', models.CharField(max_length=64)),
+                ('object_id', models.IntegerField()),
+                ('position', models.FloatField(null=True)),
+                ('zone', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='links', to='zoning.city')),
+            ],
+            options={
+                'abstract': False,
+                'indexes': [models.Index(fields=['object_table', 'object_id'], name='citylink_object_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DistrictLink',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_table', models.CharField(max_length=64)),
+                ('object_id', models.IntegerField()),
+                ('position', models.FloatField(null=True)),
+                ('zone', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='links', to='zoning.district')),
+            ],
+            options={
+                'abstract': False,
+                'indexes': [models.Index(fields=['object_table', 'object_id'], name='districtlink_object_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RestrictedAreaLink',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_table', models.CharField(max_length=64)),
+                ('object_id', models.IntegerField()),
+                ('position', models.FloatField(null=True)),
+                ('zone', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='links', to='zoning.restrictedarea')),
+            ],
+            options={
+                'abstract': False,
+                'indexes': [models.Index(fields=['object_table', 'object_id'], name='restrictedarealink_object_idx')],
+            },
+        ),
+    ]
@@ -1,10 +1,11 @@
 import hashlib
+from collections import defaultdict
 
 from django.core.cache import cache
 from django.utils.translation import gettext_lazy as _
 
 from geotrek.common.utils import intersecting, uniquify
-from .models import RestrictedArea, District, City
+from .models import RestrictedArea, District, City, CityLink, DistrictLink, RestrictedAreaLink
 
 
 class ZoningPropertiesMixin:
@@ -14,7 +15,21 @@ class ZoningPropertiesMixin:
     def zoning_property(self):
         return self
 
+    def get_linked_zones(self, link_model):
+        """ Zones read from links maintained in database, or None if links of this object are not """
+        obj = self.zoning_property
+        table = link_model.linked_table(type(obj))
+        if table is None or obj.pk is None:
+            return None
+        return uniquify(link.zone for link in link_model.for_objects(table, [obj.pk]))
+
+    def get_prefetched_zones(self, name):
+        return self.__dict__.get('_prefetched_zoning', {}).get(name)
+
     def get_areas(self):
+        areas = self.get_linked_zones(RestrictedAreaLink)
+        if areas is not None:
+            return areas
         return uniquify(intersecting(RestrictedArea,
                                      self.zoning_property,
                                      distance=0,
@@ -22,6 +37,9 @@ class ZoningPropertiesMixin:
 
     @property
     def areas(self):
+        prefetched = self.get_prefetched_zones('areas')
+        if prefetched is not None:
+            return prefetched
         last_update_and_count = RestrictedArea.last_update_and_count
         last_update_iso_format = last_update_and_count['last_update'].isoformat() if last_update_and_count[
             'last_update'] else 'no-data'
@@ -35,10 +53,16 @@ class ZoningPropertiesMixin:
         return areas
 
     def get_districts(self):
+        districts = self.get_linked_zones(DistrictLink)
+        if districts is not None:
+            return districts
         return uniquify(intersecting(District, self.zoning_property, distance=0, defer=('geom',)))
 
     @property
     def districts(self):
+        prefetched = self.get_prefetched_zones('districts')
+        if prefetched is not None:
+            return prefetched
         last_update_and_count = District.last_update_and_count
         last_update_iso_format = last_update_and_count['last_update'].isoformat() if last_update_and_count['last_update'] else 'no-data'
         count = last_update_and_count['count']
@@ -51,10 +75,16 @@ class ZoningPropertiesMixin:
         return districts
 
     def get_cities(self):
+        cities = self.get_linked_zones(CityLink)
+        if cities is not None:
+            return cities
         return uniquify(intersecting(City, self.zoning_property, distance=0, defer=('geom',)))
 
     @property
     def cities(self):
+        prefetched = self.get_prefetched_zones('cities')
+        if prefetched is not None:
+            return prefetched
         last_update_and_count = City.last_update_and_count
         last_update_iso_format = last_update_and_count['last_update'].isoformat() if last_update_and_count[
             'last_update'] else 'no-data'
@@ -86,3 +116,31 @@ class ZoningPropertiesMixin:
         if not hasattr(self, 'published'):
             return self.cities
         return [city for city in self.cities if city.published]
+
+
+def prefetch_zoning(objects):
+    """
+    Read cities, districts and restricted areas of many objects from links maintained in database,
+    with one query by kind of zone instead of a spatial query by object and kind of zone.
+    Returns objects as a list.
+    """
+    objects = list(objects)
+    linked = defaultdict(list)
+    for obj in objects:
+        if not isinstance(obj, ZoningPropertiesMixin):
+            continue
+        target = obj.zoning_property
+        table = CityLink.linked_table(type(target))
+        if table is not None and target.pk is not None:
+            linked[(table, target.pk)].append(obj)
+    tables = {table for table, pk in linked}
+    for name, link_model in (('cities', CityLink), ('districts', DistrictLink), ('areas', RestrictedAreaLink)):
+        zones = defaultdict(list)
+        for table in tables:
+            object_ids = [pk for linked_table, pk in linked if linked_table == table]
+            for link in link_model.for_objects(table, object_ids):
+                zones[(table, link.object_id)].append(link.zone)
+        for key, linked_objects in linked.items():
+            for obj in linked_objects:
+                obj.__dict__.setdefault('_prefetched_zoning', {})[name] = uniquify(zones[key])
+    return objects
@@ -10,6 +10,7 @@ from django.contrib.postgres.indexes import GistIndex
 from django.utils.translation import gettext_lazy as _
 
 from geotrek.common.mixins.models import TimeStampedModelMixin
+from geotrek.common.utils.cache import root_model
 
 
 class RestrictedAreaType(models.Model):
@@ -73,3 +74,53 @@ class District(TimeStampedModelMixin, models.Model):
 
     def __str__(self):
         return self.name
+
+
+class ZoningLink(models.Model):
+    """
+    Intersection of an object with a zone, maintained by SQL triggers on objects and zones
+    (see ``post_30_links.sql``), so that zones of many objects are read without spatial query.
+    """
+    # Tables of objects which links are maintained
+    LINKED_TABLES = ('core_path', 'core_topology', 'tourism_touristiccontent', 'tourism_touristicevent',
+                     'outdoor_site', 'outdoor_course', 'diving_dive', 'feedback_report')
+
+    object_table = models.CharField(max_length=64)
+    object_id = models.IntegerField()
+    # Location of zone along linear objects, null otherwise
+    position = models.FloatField(null=True)
+
+    class Meta:
+        abstract = True
+        indexes = [
+            models.Index(name='%(class)s_object_idx', fields=['object_table', 'object_id']),
+        ]
+
+    @classmethod
+    def linked_table(cls, model):
+        """ Table of model objects in links, or None if their links are not maintained """
+        table = root_model(model)._meta.db_table
+        return table if table in cls.LINKED_TABLES else None
+
+    @classmethod
+    def for_objects(cls, table, object_ids):
+        """ Links of objects, with their zones, ordered like ``intersecting()`` results """
+        zone_model = cls._meta.get_field('zone').related_model
+        ordering = ['zone__{}'.format(field) for field in zone_model._meta.ordering]
+        links = cls.objects.filter(object_table=table, object_id__in=object_ids) \
+            .select_related('zone').defer('zone__geom').order_by('position', *ordering)
+        if zone_model is RestrictedArea:
+            links = links.select_related('zone__area_type')
+        return links
+
+
+class CityLink(ZoningLink):
+    zone = models.ForeignKey(City, related_name='links', on_delete=models.DO_NOTHING)
+
+
+class DistrictLink(ZoningLink):
+    zone = models.ForeignKey(District, related_name='links', on_delete=models.DO_NOTHING)
+
+
+class RestrictedAreaLink(ZoningLink):
+    zone = models.ForeignKey(RestrictedArea, related_name='links', on_delete=models.DO_NOTHING)
@@ -0,0 +1,190 @@
+-------------------------------------------------------------------------------
+-- Materialized intersections of objects with cities, districts and restricted areas
+-------------------------------------------------------------------------------
+
+CREATE FUNCTION {{ schema_geotrek }}.zoning_linked_tables() RETURNS SETOF text AS $$
+    -- Tables of optional applications may be missing
+    SELECT t FROM unnest(ARRAY['core_path', 'core_topology', 'tourism_touristiccontent', 'tourism_touristicevent',
+                               'outdoor_site', 'outdoor_course', 'diving_dive', 'feedback_report']) AS t
+    WHERE to_regclass(t) IS NOT NULL;
+$$ LANGUAGE sql STABLE;
+
+
+CREATE FUNCTION {{ schema_geotrek }}.zoning_link_position(object_geom geometry, zone_geom geometry) RETURNS float AS $$
+BEGIN
+    -- Zones are ordered along linear objects
+    IF GeometryType(object_geom) <> 'LINESTRING' THEN
+        RETURN NULL;
+    END IF;
+    RETURN (SELECT MIN(ST_LineLocatePoint(object_geom, ST_StartPoint(dumped.geom)))
+            FROM ST_Dump(ST_Intersection(object_geom, zone_geom)) AS dumped);
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+
+CREATE FUNCTION {{ schema_geotrek }}.zoning_links_update(obj_table text, obj_id integer, obj_geom geometry) RETURNS void AS $$
+BEGIN
+    DELETE FROM zoning_citylink WHERE object_table = obj_table AND object_id = obj_id;
+    DELETE FROM zoning_districtlink WHERE object_table = obj_table AND object_id = obj_id;
+    DELETE FROM zoning_restrictedarealink WHERE object_table = obj_table AND object_id = obj_id;
+    IF obj_geom IS NULL OR ST_IsEmpty(obj_geom) THEN
+        RETURN;
+    END IF;
+    INSERT INTO zoning_citylink (object_table, object_id, zone_id, position)
+        SELECT obj_table, obj_id, z.code, zoning_link_position(obj_geom, z.geom)
+        FROM zoning_city z WHERE ST_Intersects(z.geom, obj_geom);
+    INSERT INTO zoning_districtlink (object_table, object_id, zone_id, position)
+        SELECT obj_table, obj_id, z.id, zoning_link_position(obj_geom, z.geom)
+        FROM zoning_district z WHERE ST_Intersects(z.geom, obj_geom);
+    INSERT INTO zoning_restrictedarealink (object_table, object_id, zone_id, position)
+        SELECT obj_table, obj_id, z.id, zoning_link_position(obj_geom, z.geom)
+        FROM zoning_restrictedarea z WHERE ST_Intersects(z.geom, obj_geom);
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE FUNCTION {{ schema_geotrek }}.zoning_links_refresh(obj_table text) RETURNS void AS $$
+DECLARE
+    zone record;
+BEGIN
+    -- Recompute links of every object of a table
+    FOR zone IN SELECT * FROM (VALUES ('zoning_citylink', 'zoning_city', 'code'),
+                                      ('zoning_districtlink', 'zoning_district', 'id'),
+                                      ('zoning_restrictedarealink', 'zoning_restrictedarea', 'id'))
+                AS z (link_table, zone_table, zone_pk)
+    LOOP
+        EXECUTE format('DELETE FROM %I WHERE object_table = %L', zone.link_table, obj_table);
+        EXECUTE format('INSERT INTO %I (object_table, object_id, zone_id, position)
+                        SELECT %L, o.id, z.%I, zoning_link_position(o.geom, z.geom)
+                        FROM %I o JOIN %I z ON ST_Intersects(z.geom, o.geom)',
+                       zone.link_table, obj_table, zone.zone_pk, obj_table, zone.zone_table);
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-------------------------------------------------------------------------------
+-- Keep links up-to-date when objects change
+-------------------------------------------------------------------------------
+
+CREATE FUNCTION {{ schema_geotrek }}.zoning_links_iu() RETURNS trigger SECURITY DEFINER AS $$
+BEGIN
+    PERFORM zoning_links_update(TG_TABLE_NAME::text, NEW.id, NEW.geom);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE FUNCTION {{ schema_geotrek }}.zoning_links_d() RETURNS trigger SECURITY DEFINER AS $$
+BEGIN
+    PERFORM zoning_links_update(TG_TABLE_NAME::text, OLD.id, NULL);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+DO $$
+DECLARE
+    obj_table text;
+BEGIN
+    FOR obj_table IN SELECT zoning_linked_tables() LOOP
+        EXECUTE format('CREATE TRIGGER %I AFTER INSERT ON %I
+                        FOR EACH ROW EXECUTE PROCEDURE zoning_links_iu()',
+                       obj_table || '_zoning_links_i_tgr', obj_table);
+        EXECUTE format('CREATE TRIGGER %I AFTER UPDATE OF geom ON %I
+                        FOR EACH ROW WHEN (OLD.geom IS DISTINCT FROM NEW.geom) EXECUTE PROCEDURE zoning_links_iu()',
+                       obj_table || '_zoning_links_u_tgr', obj_table);
+        EXECUTE format('CREATE TRIGGER %I AFTER DELETE ON %I
+                        FOR EACH ROW EXECUTE PROCEDURE zoning_links_d()',
+                       obj_table || '_zoning_links_d_tgr', obj_table);
+    END LOOP;
+END;
+$$;
+
+
+-------------------------------------------------------------------------------
+-- Keep links up-to-date when zones change
+-------------------------------------------------------------------------------
+
+CREATE FUNCTION {{ schema_geotrek }}.zoning_links_zone_iud() RETURNS trigger SECURITY DEFINER AS $$
+DECLARE
+    -- Trigger arguments: table of links and primary key column of zones
+    link_table text := TG_ARGV[0];
+    zone_id text;
+    obj_table text;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        EXECUTE format('SELECT ($1).%I::text', TG_ARGV[1]) INTO zone_id USING OLD;
+    ELSE
+        EXECUTE format('SELECT ($1).%I::text', TG_ARGV[1]) INTO zone_id USING NEW;
+    END IF;
+    EXECUTE format('DELETE FROM %I WHERE zone_id = %L', link_table, zone_id);
+    IF TG_OP = 'DELETE' THEN
+        RETURN OLD;
+    END IF;
+    FOR obj_table IN SELECT zoning_linked_tables() LOOP
+        EXECUTE format('INSERT INTO %I (object_table, object_id, zone_id, position)
+                        SELECT %L, o.id, %L, zoning_link_position(o.geom, $1)
+                        FROM %I o WHERE ST_Intersects($1, o.geom)',
+                       link_table, obj_table, zone_id, obj_table) USING NEW.geom;
+    END LOOP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER zoning_city_links_i_tgr
+AFTER INSERT ON zoning_city
+FOR EACH ROW EXECUTE PROCEDURE zoning_links_zone_iud('zoning_citylink', 'code');
+
+CREATE TRIGGER zoning_city_links_u_tgr
+AFTER UPDATE OF geom ON zoning_city
+FOR EACH ROW WHEN (OLD.geom IS DISTINCT FROM NEW.geom) EXECUTE PROCEDURE zoning_links_zone_iud('zoning_citylink', 'code');
+
+CREATE TRIGGER zoning_city_links_d_tgr
+BEFORE DELETE ON zoning_city
+FOR EACH ROW EXECUTE PROCEDURE zoning_links_zone_iud('zoning_citylink', 'code');
+
+CREATE TRIGGER zoning_district_links_i_tgr
+AFTER INSERT ON zoning_district
+FOR EACH ROW EXECUTE PROCEDURE zoning_links_zone_iud('zoning_districtlink', 'id');
+
+CREATE TRIGGER zoning_district_links_u_tgr
+AFTER UPDATE OF geom ON zoning_district
+FOR EACH ROW WHEN (OLD.geom IS DISTINCT FROM NEW.geom) EXECUTE PROCEDURE zoning_links_zone_iud('zoning_districtlink', 'id');
+
+CREATE TRIGGER zoning_district_links_d_tgr
+BEFORE DELETE ON zoning_district
+FOR EACH ROW EXECUTE PROCEDURE zoning_links_zone_iud('zoning_districtlink', 'id');
+
+CREATE TRIGGER zoning_restrictedarea_links_i_tgr
+AFTER INSERT ON zoning_restrictedarea
+FOR EACH ROW EXECUTE PROCEDURE zoning_links_zone_iud('zoning_restrictedarealink', 'id');
+
+CREATE TRIGGER zoning_restrictedarea_links_u_tgr
+AFTER UPDATE OF geom ON zoning_restrictedarea
+FOR EACH ROW WHEN (OLD.geom IS DISTINCT FROM NEW.geom) EXECUTE PROCEDURE zoning_links_zone_iud('zoning_restrictedarealink', 'id');
+
+CREATE TRIGGER zoning_restrictedarea_links_d_tgr
+BEFORE DELETE ON zoning_restrictedarea
+FOR EACH ROW EXECUTE PROCEDURE zoning_links_zone_iud('zoning_restrictedarealink', 'id');
+
+
+-------------------------------------------------------------------------------
+-- Compute links of existing objects of tables not refreshed yet (first install, new application)
+-------------------------------------------------------------------------------
+
+DO $$
+DECLARE
+    refreshed text[] := string_to_array(obj_description('zoning_citylink'::regclass, 'pg_class'), ',');
+    obj_table text;
+BEGIN
+    FOR obj_table IN SELECT zoning_linked_tables() LOOP
+        IF refreshed IS NULL OR NOT obj_table = ANY(refreshed) THEN
+            PERFORM zoning_links_refresh(obj_table);
+            refreshed := array_append(refreshed, obj_table);
+        END IF;
+    END LOOP;
+    -- Tables whose links have been computed are recorded in the comment of zoning_citylink
+    EXECUTE format('COMMENT ON TABLE zoning_citylink IS %L', array_to_string(refreshed, ','));
+END;
+$$;
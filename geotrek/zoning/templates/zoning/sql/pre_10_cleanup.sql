@@ -19,3 +19,13 @@ DROP VIEW IF EXISTS f_v_secteur CASCADE;
 DROP VIEW IF EXISTS v_districts CASCADE;
 DROP VIEW IF EXISTS f_v_zonage CASCADE;
 DROP VIEW IF EXISTS v_restrictedareas CASCADE;
+
+-- 30
+
+DROP FUNCTION IF EXISTS zoning_links_iu() CASCADE;
+DROP FUNCTION IF EXISTS zoning_links_d() CASCADE;
+DROP FUNCTION IF EXISTS zoning_links_zone_iud() CASCADE;
+DROP FUNCTION IF EXISTS zoning_links_refresh(text) CASCADE;
+DROP FUNCTION IF EXISTS zoning_links_update(text, integer, geometry) CASCADE;
+DROP FUNCTION IF EXISTS zoning_link_position(geometry, geometry) CASCADE;
+DROP FUNCTION IF EXISTS zoning_linked_tables() CASCADE;
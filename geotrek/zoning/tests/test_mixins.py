@@ -1,8 +1,11 @@
 from django.conf import settings
 from django.test import TestCase
 
+from geotrek.core.models import Path
 from geotrek.core.tests.factories import PathFactory
+from geotrek.trekking.models import Trek
 from geotrek.trekking.tests.factories import TrekFactory
+from geotrek.zoning.mixins import prefetch_zoning
 from geotrek.zoning.tests.factories import CityFactory, DistrictFactory, RestrictedAreaFactory
 
 
@@ -103,3 +106,19 @@ class ZoningPropertiesMixinTest(TestCase):
         self.assertEqual(len(self.path.areas), 2)
         self.assertListEqual([a.pk for a in self.path.published_areas], [area.pk, self.area.pk])
         self.assertEqual(len(self.path.published_areas), 2)
+
+    def test_prefetch_zoning(self):
+        city = CityFactory.create(geom=self.geom_2_wkt)
+        other_path = PathFactory.create(geom='SRID=2154;LINESTRING(950000 400000, 1000000 500000)')
+        objects = [Path.objects.get(pk=self.path.pk), Path.objects.get(pk=other_path.pk), Trek.objects.get(pk=self.trek.pk)]
+
+        # One query by kind of zone
+        with self.assertNumQueries(3):
+            objects = prefetch_zoning(objects)
+        with self.assertNumQueries(0):
+            self.assertListEqual([c.name for c in objects[0].cities], [self.city.name, city.name])
+            self.assertListEqual([c.name for c in objects[1].cities], [city.name])
+            self.assertListEqual([c.name for c in objects[2].published_cities], [self.city.name, city.name])
+            self.assertListEqual([d.name for d in objects[0].districts], [self.district.name])
+            self.assertListEqual([a.pk for a in objects[2].areas], [self.area.pk])
+        self.assertListEqual(objects[0].cities, self.path.get_cities())
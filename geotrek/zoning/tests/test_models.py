@@ -1,11 +1,14 @@
 from unittest import skipIf
+from django.apps import apps
 from django.test import TestCase
 from django.conf import settings
+from django.db import connection
 from django.contrib.gis.geos import LineString, Polygon, Point, MultiPolygon
 
+from geotrek.common.utils.postgresql import load_sql_files
 from geotrek.core.tests.factories import PathFactory
 from geotrek.signage.tests.factories import SignageFactory
-from geotrek.zoning.models import City
+from geotrek.zoning.models import City, CityLink
 from geotrek.zoning.tests.factories import CityFactory, DistrictFactory, RestrictedAreaFactory, RestrictedAreaTypeFactory
 
 
@@ -63,6 +66,39 @@ class ZoningLayersUpdateTest(TestCase):
         self.assertEqual(len(p3.cities), 1)
         self.assertEqual(len(p4.cities), 1)
 
+    def test_links_follow_objects_and_zones(self):
+        path = PathFactory.create(geom=LineString((0, 0), (1, 1)))
+        city = City.objects.create(code='005180', name='Trifouillis-les-canards',
+                                   geom=MultiPolygon(Polygon(((0, 0), (2, 0), (2, 2), (0, 2), (0, 0)),
+                                                             srid=settings.SRID)))
+        links = CityLink.objects.filter(object_table='core_path', object_id=path.pk)
+        self.assertEqual([link.zone_id for link in links], [city.pk])
+
+        path.geom = LineString((3, 3), (4, 4), srid=settings.SRID)
+        path.save()
+        self.assertFalse(links.exists())
+
+        path.geom = LineString((1, 1), (3, 3), srid=settings.SRID)
+        path.save()
+        self.assertTrue(links.exists())
+        city.delete()
+        self.assertFalse(links.exists())
+
+    def test_links_backfilled_for_tables_not_refreshed(self):
+        path = PathFactory.create(geom=LineString((0, 0), (1, 1)))
+        city = City.objects.create(code='005181', name='Trifouillis-les-lapins',
+                                   geom=MultiPolygon(Polygon(((0, 0), (2, 0), (2, 2), (0, 2), (0, 0)),
+                                                             srid=settings.SRID)))
+        links = CityLink.objects.filter(object_table='core_path', object_id=path.pk)
+        # Links of other tables exist, but core_path has never been refreshed
+        links.delete()
+        with connection.cursor() as cursor:
+            cursor.execute("COMMENT ON TABLE zoning_citylink IS 'core_topology'")
+        zoning = apps.get_app_config('zoning')
+        load_sql_files(zoning, 'pre')
+        load_sql_files(zoning, 'post')
+        self.assertEqual([link.zone_id for link in links], [city.pk])
+
     def test_city_with_path_ends_on_border(self):
         """
                  |    |
@@ -1,16 +1,30 @@
 from django.contrib.gis.db.models.functions import Transform
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
 from django.views.decorators.cache import cache_page
 from django.conf import settings
 from django.utils.decorators import method_decorator
+from mapentity.serializers.commasv import CSVSerializer
 from rest_framework import permissions
 from rest_framework.generics import ListAPIView
 
+from .mixins import prefetch_zoning
 from .models import City, RestrictedArea, RestrictedAreaType, District
 from .serializers import CitySerializer, RestrictedAreaSerializer, DistrictSerializer
 from ..common.functions import SimplifyPreserveTopology
 
 
+class ZoningFormatMixin:
+    """ Read zones of objects exported as CSV in bulk, see ``prefetch_zoning()`` """
+
+    def csv_view(self, request, context, **kwargs):
+        serializer = CSVSerializer()
+        response = HttpResponse(content_type='text/csv')
+        serializer.serialize(queryset=prefetch_zoning(self.get_queryset()), stream=response,
+                             model=self.get_model(), fields=self.get_columns(), ensure_ascii=True)
+        return response
+
+
 class LandGeoJSONAPIViewMixin(ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
 